@@ -0,0 +1,308 @@
+"""
+Time the hot paths against synthetic data of realistic sizes and write
+the results, with the memory each one allocates, to JSON so that runs can
+be compared between commits.
+
+    python -m benchmarks.hot_paths [--output results.json] [--repeat 3]
+    python -m benchmarks.hot_paths --compare before.json after.json
+
+Data is generated into --data-dir, by default a directory under the
+system temp dir, and reused by later runs of the same sizes.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import ujson
+
+DEFAULT_SIZES = {
+    "ppr": 700000,
+    "listings": 500000,
+    "bus_stops": 10000,
+    "schools": 4000,
+}
+
+DEFAULT_DATA_DIR = os.path.join(
+    tempfile.gettempdir(), "irish_property_analysis_benchmark"
+)
+
+# Address substrings and county of the queries each case runs
+QUERIES = [
+    (["main street"], None),
+    (["12", "oak avenue"], "dublin"),
+    (["town 5"], None),
+    (["grand canal"], "cork"),
+]
+
+# (lat, lng) of the get_near cases
+POINTS = [(53.35 + i * 0.01, -6.26 - i * 0.01) for i in range(50)]
+
+# A case slower than this many times its time in the baseline is reported
+# as a regression by --compare
+REGRESSION_RATIO = 1.2
+
+# Cases that must stay at least ratio times faster than a reference case of
+# the same run, (reference, ratio). The csv loader is held to the per row
+# path it replaced, 5.5x slower at the default sizes.
+MIN_SPEEDUPS = {"Sales.load csv": ("Sales rows csv", 4.0)}
+
+
+def cases():
+    """
+    Yield (name, fn) of each case in the order they run. Later cases use
+    what earlier ones loaded.
+    """
+    from irish_property_analysis.settings import PPR_LOCATION, PPR_CACHE_LOCATION
+    from irish_property_analysis.constants import PPR_REPLACEMENT_HEADERS
+    from irish_property_analysis.ppr_sale import Sales
+    from irish_property_analysis.utils import read_csv_to_dict
+    from irish_property_analysis.sales import get_sale_db
+    from irish_property_analysis.bus_stops import BusStops
+    from irish_property_analysis.schools import Schools
+
+    loaded = {}
+
+    def load_ppr_csv():
+        loaded["ppr"] = Sales.load(PPR_LOCATION)
+
+    def load_ppr_rows():
+        # A Sale per row, as the csv was loaded before Sales.read_csv
+        Sales(data=read_csv_to_dict(PPR_LOCATION, headers=PPR_REPLACEMENT_HEADERS))
+
+    def save_ppr_cache():
+        loaded["ppr"].save_cache(PPR_CACHE_LOCATION)
+
+    def load_ppr_cache():
+        loaded["ppr"] = Sales.load(PPR_LOCATION, cache_location=PPR_CACHE_LOCATION)
+
+    def filter_ppr():
+        for address_substrs, county in QUERIES:
+            len(
+                loaded["ppr"].filter(
+                    address_substrs=address_substrs, county=county, partial=True
+                )
+            )
+
+    def filter_sale_db():
+        for address_substrs, county in QUERIES:
+            list(
+                get_sale_db().filter(
+                    address_substrs=address_substrs, county=county, partial=True
+                )
+            )
+
+    def load_bus_stops():
+        loaded["bus_stops"] = BusStops()
+
+    def bus_stops_near():
+        for lat, lng in POINTS:
+            loaded["bus_stops"].get_near(lat, lng, radius_km=1)
+
+    def load_schools():
+        loaded["schools"] = Schools()
+
+    def schools_near():
+        for lat, lng in POINTS:
+            loaded["schools"].get_near(lat, lng, radius_km=1)
+
+    yield "Sales.load csv", load_ppr_csv
+    yield "Sales rows csv", load_ppr_rows
+    yield "Sales.save_cache", save_ppr_cache
+    yield "Sales.load cache", load_ppr_cache
+    yield "Sales.filter", filter_ppr
+    yield "SaleDB.filter", filter_sale_db
+    yield "BusStops load", load_bus_stops
+    yield "BusStops.get_near", bus_stops_near
+    yield "Schools load", load_schools
+    yield "Schools.get_near", schools_near
+
+    try:
+        from scripts.get_property_details import run_sections
+    except ImportError as e:
+        print(f"Skipping get_property_details: {e}")
+        return
+
+    def get_property_details():
+        # With the data loaded, as every query after the first finds it
+        for address_substrs, county in QUERIES:
+            list(
+                run_sections(
+                    argparse.Namespace(
+                        address_substr_csv=address_substrs,
+                        county=county,
+                        school_radius_km=1,
+                        bus_stop_radius_km=1,
+                    )
+                )
+            )
+
+    yield "get_property_details", get_property_details
+
+
+def measure(fn, repeat):
+    """
+    Time repeat calls of fn, then make one more call tracing allocations,
+    as tracing slows it down too much to time
+    """
+    seconds = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            seconds.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "repeat": repeat,
+        "min_seconds": min(seconds),
+        "median_seconds": statistics.median(seconds),
+        "peak_allocated_mb": peak / 1024 / 1024,
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat, seed=0):
+    from benchmarks.synthetic_data import populate
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        generated = populate(sizes, seed)
+    if generated:
+        print(f"Generated data in {time.perf_counter() - start:.0f}s")
+
+    results = {}
+    for name, fn in cases():
+        results[name] = measure(fn, repeat)
+        print(
+            f"{name:<24}{results[name]['min_seconds'] * 1000:10.1f}ms"
+            f"{results[name]['peak_allocated_mb']:10.1f}MB"
+        )
+
+    return {
+        "commit": commit(),
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sizes": sizes,
+        "seed": seed,
+        "cases": results,
+        # ru_maxrss is in KB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def check_speedups(results, min_speedups=MIN_SPEEDUPS):
+    """
+    Print the speedup of each case of min_speedups over its reference in
+    results, returning the names of those below their minimum
+    """
+    failures = []
+    for name, (reference, minimum) in min_speedups.items():
+        if name not in results["cases"] or reference not in results["cases"]:
+            continue
+        speedup = (
+            results["cases"][reference]["min_seconds"]
+            / results["cases"][name]["min_seconds"]
+        )
+        flag = ""
+        if speedup < minimum:
+            flag = f"  BELOW {minimum:.1f}x"
+            failures.append(name)
+        print(f"{name:<24}{speedup:8.2f}x {reference}{flag}")
+    return failures
+
+
+def compare(baseline, current, ratio=REGRESSION_RATIO):
+    """
+    Print the change in the fastest time of each case from baseline to
+    current, returning the names of those that got slower than ratio allows
+    """
+    regressions = []
+    if baseline["sizes"] != current["sizes"]:
+        print(f"Sizes differ: {baseline['sizes']} and {current['sizes']}")
+
+    print(f"{baseline['commit']} -> {current['commit']}")
+    for name, result in current["cases"].items():
+        if name not in baseline["cases"]:
+            print(f"{name:<24}new")
+            continue
+        before = baseline["cases"][name]["min_seconds"]
+        after = result["min_seconds"]
+        change = after / before if before else float("inf")
+        flag = ""
+        if change > ratio:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:<24}{before * 1000:10.1f}ms{after * 1000:10.1f}ms"
+            f"{change:8.2f}x{flag}"
+        )
+    return regressions + check_speedups(current)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    for name, rows in DEFAULT_SIZES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}-rows", type=int, default=rows)
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CURRENT"),
+        help="Compare two results files instead of running",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        baseline, current = [
+            ujson.loads(open(filepath).read()) for filepath in args.compare
+        ]
+        return 1 if compare(baseline, current) else 0
+
+    # Read by settings on import, so before anything imports it
+    os.environ["PROPERTY_ANALYSIS_DATA_LOCATION"] = args.data_dir
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    sizes = {name: getattr(args, f"{name}_rows") for name in DEFAULT_SIZES}
+    results = run(sizes, args.repeat, args.seed)
+    failures = check_speedups(results)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(ujson.dumps(results, indent=2))
+        print(f"Wrote to: {args.output}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+Measure how long each package module takes to import in a fresh
+interpreter. Importing should not load any data, so these should stay
+small.
+
+    python -m benchmarks.import_time [repeat]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+MODULES = [
+    "irish_property_analysis",
+    "irish_property_analysis.settings",
+    "irish_property_analysis.utils",
+    "irish_property_analysis.ppr_sale",
+    "irish_property_analysis.schools",
+    "irish_property_analysis.bus_stops",
+    "irish_property_analysis.sales",
+    "irish_property_analysis.rentals",
+    "irish_property_analysis.shares",
+]
+
+
+def import_time(module):
+    """
+    Get the cumulative import time of module in seconds, as reported by
+    python -X importtime
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env={
+            **os.environ,
+            "PROPERTY_ANALYSIS_DATA_LOCATION": os.environ.get(
+                "PROPERTY_ANALYSIS_DATA_LOCATION", tempfile.mkdtemp()
+            ),
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in result.stderr.splitlines():
+        _, _, cumulative, name = [
+            part.strip() for part in line.replace(":", "|").split("|")
+        ]
+        if name == module:
+            return int(cumulative) / 1e6
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    results = {}
+    for module in MODULES:
+        results[module] = statistics.median(import_time(module) for _ in range(repeat))
+        print(f"{module:<40}{results[module] * 1000:8.1f}ms")
+    return results
+
+
+if __name__ == "__main__":
+    main()
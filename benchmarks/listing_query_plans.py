@@ -0,0 +1,121 @@
+"""
+Compare query plans and timings of listing filters on a table without
+indexes, as existing databases are, against the same table after
+create_connection has migrated it and filters use where_equals.
+
+    python -m benchmarks.listing_query_plans [rows]
+
+Runs against a throwaway database unless PROPERTY_ANALYSIS_DATA_LOCATION
+is set.
+"""
+
+import os
+import sys
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("PROPERTY_ANALYSIS_DATA_LOCATION", tempfile.mkdtemp())
+
+from irish_property_analysis.sales import SaleObject, get_sale_db
+from irish_property_analysis.search_index import where_equals
+from irish_property_analysis.utils import chunks, to_searchable_address
+
+COUNTIES = ["dublin", "cork", "galway", "kerry", "meath", "kildare", "wicklow"]
+PROPERTY_TYPES = ["house", "apartment", "bungalow", "duplex", "site"]
+
+
+def populate(rows):
+    random.seed(0)
+    data = []
+    for i in range(rows):
+        address = f"{i} Some Street, Town {i % 1000}"
+        data.append(
+            {
+                "original_address": address,
+                "clean_address": address,
+                "searchable_address": to_searchable_address(address),
+                "county": random.choice(COUNTIES),
+                "eircode_routing_key": f"d{random.randint(1, 99):02d}",
+                "property_type": random.choice(PROPERTY_TYPES),
+                "price": float(random.randint(50, 2000) * 1000),
+                "published_date": datetime(2010, 1, 1)
+                + timedelta(days=random.randint(0, 5000)),
+                "lat": random.uniform(51.4, 55.4),
+                "lng": random.uniform(-10.5, -6.0),
+            }
+        )
+
+    get_sale_db().drop_data()
+    with SaleObject._meta.database.atomic():
+        for chunk in chunks(data, 5000):
+            SaleObject.insert_many(chunk).execute()
+
+
+def plan(query):
+    sql, params = query.sql()
+    return " | ".join(
+        row[-1]
+        for row in SaleObject._meta.database.execute_sql(
+            f"EXPLAIN QUERY PLAN {sql}", params
+        )
+    )
+
+
+def timed(query, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        list(query.tuples())
+    return (time.perf_counter() - start) / repeat
+
+
+def drop_indexes():
+    db = SaleObject._meta.database
+    for index in db.get_indexes(SaleObject._meta.table_name):
+        db.execute_sql(f'DROP INDEX "{index.name}"')
+
+
+def queries(indexed):
+    for field_name, value in [
+        ("county", "Kerry"),
+        ("eircode_routing_key", "D08"),
+        ("property_type", "Bungalow"),
+    ]:
+        field = getattr(SaleObject, field_name)
+        if indexed:
+            yield field_name, where_equals(SaleObject.select(), field, value)
+        else:
+            yield field_name, SaleObject.select().where(field.ilike(value))
+
+    yield "published_date range", SaleObject.select().where(
+        SaleObject.published_date.between(datetime(2020, 1, 1), datetime(2020, 2, 1))
+    )
+    yield "price range", SaleObject.select().where(SaleObject.price < 60000)
+    yield "lat/lng box", SaleObject.select().where(
+        SaleObject.lat.between(53.30, 53.31),
+        SaleObject.lng.between(-6.3, -6.2),
+    )
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    populate(rows)
+
+    drop_indexes()
+    before = {name: (timed(query), plan(query)) for name, query in queries(False)}
+
+    get_sale_db().create_connection()
+    after = {name: (timed(query), plan(query)) for name, query in queries(True)}
+
+    for name in before:
+        print(name)
+        for label, (seconds, query_plan) in [
+            ("before", before[name]),
+            ("after", after[name]),
+        ]:
+            print(f"  {label:<7}{seconds * 1000:8.2f}ms  {query_plan}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Time download_listings against a local stub of the listings API and
+report rows/sec and peak RSS of the ingesting process.
+
+    python -m benchmarks.listings_ingest [rows_per_dataset] [latency_seconds]
+
+latency_seconds delays every response from the stub, standing in for the
+round trip to the real API.
+
+The ingest runs in a child process so its peak RSS does not include the
+stub server, and writes to a throwaway database.
+"""
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+import ujson
+
+from benchmarks.stub_listings_api import StubListingsAPI
+
+
+def child(url):
+    from scripts import download_listings
+    from irish_property_analysis.sales import SaleObject
+    from irish_property_analysis.rentals import RentalObject
+    from irish_property_analysis.shares import ShareObject
+
+    start = time.perf_counter()
+    with patch.object(download_listings, "LISTINGS_BASE_URL", url):
+        download_listings.main([])
+    seconds = time.perf_counter() - start
+
+    rows = sum(
+        object_class.select().count()
+        for object_class in [SaleObject, RentalObject, ShareObject]
+    )
+    print(
+        ujson.dumps(
+            {
+                "rows": rows,
+                "seconds": seconds,
+                "rows_per_second": rows / seconds,
+                # ru_maxrss is in KB on Linux
+                "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                / 1024,
+            }
+        )
+    )
+
+
+def run(rows, latency=0):
+    with StubListingsAPI(rows=rows, latency=latency) as api:
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.listings_ingest", "--child", api.url],
+            env={
+                **os.environ,
+                "PYTHONPATH": os.pathsep.join(sys.path),
+                "PROPERTY_ANALYSIS_DATA_LOCATION": tempfile.mkdtemp(),
+            },
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    return ujson.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        return child(sys.argv[2])
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    result = run(rows, latency)
+    print(
+        f"{result['rows']} rows in {result['seconds']:.1f}s "
+        f"({result['rows_per_second']:.0f} rows/sec), "
+        f"peak RSS {result['peak_rss_mb']:.0f}MB"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    main()
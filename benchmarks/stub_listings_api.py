@@ -0,0 +1,150 @@
+"""
+Local stand in for the listings API, serving synthetic listings in the
+same shape and with the same page / next link pagination, for tests and
+benchmarks of download_listings.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import ujson
+
+from irish_property_analysis.constants import LISTINGS_SINCE_PARAM
+
+COUNTIES = ["dublin", "cork", "galway", "kerry", "meath", "kildare", "wicklow"]
+STREETS = ["Main Street", "Grand Canal Street", "Church Road", "Oak Avenue", "Quay"]
+PROPERTY_TYPES = ["house", "apartment", "bungalow", "duplex"]
+
+
+def make_listing(data_option, i):
+    rng = random.Random(f"{data_option}-{i}")
+    county = rng.choice(COUNTIES)
+    address = f"{rng.randint(1, 300)} {rng.choice(STREETS)}, Town {i % 997}, {county}"
+    return {
+        "_id": f"{data_option}-{i:08d}",
+        "original_address": address,
+        "clean_address": address.lower(),
+        "county": county,
+        "location": {
+            "type": "Point",
+            "coordinates": [rng.uniform(-10.5, -6.0), rng.uniform(51.4, 55.4)],
+        },
+        "price": float(rng.randint(50, 2000) * 1000),
+        "clean_agent": rng.choice(["agent a", "agent b", None]),
+        "ber": rng.choice(["A2", "B3", "C1", "D2", None]),
+        "eircode_routing_key": f"d{rng.randint(1, 24):02d}",
+        "m_squared": float(rng.randint(30, 250)),
+        "constructed_date": rng.randint(1900, 2024),
+        "beds": float(rng.randint(1, 6)),
+        "baths": float(rng.randint(1, 4)),
+        "property_type": rng.choice(PROPERTY_TYPES),
+        # Later rows are published later, like new listings appearing
+        "published_date": str(
+            datetime(2015, 1, 1) + timedelta(minutes=10 * i + rng.randint(0, 9))
+        ),
+    }
+
+
+class StubListingsAPI:
+    """
+    Serve rows listings per data option from a local HTTP server.
+
+        with StubListingsAPI(rows=1000) as api:
+            requests.get(f"{api.url}?pageSize=100&dataOption=rentals")
+
+    Listings can be changed by setting fields in updates, keyed by data
+    option and row number, and publishedAfter restricts the listings served
+    to those published after it. The next failures requests are answered
+    with a 503. Every response is delayed by latency seconds.
+    """
+
+    def __init__(self, rows=1000, rows_per_option=None, latency=0):
+        self.rows = rows
+        self.latency = latency
+        self.rows_per_option = rows_per_option or {}
+        self.updates = {}
+        self.failures = 0
+        self.requests = []
+        self.lock = threading.Lock()
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with api.lock:
+                    api.requests.append(self.path)
+                    fail = api.failures > 0
+                    api.failures -= fail
+                time.sleep(api.latency)
+                if fail:
+                    self.send_error(503)
+                    return
+
+                query = {
+                    k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()
+                }
+                body = api.page(
+                    query["dataOption"],
+                    int(query.get("pageSize", 100)),
+                    int(query.get("page", 0)),
+                    query.get(LISTINGS_SINCE_PARAM),
+                )
+                content = ujson.dumps(body).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def listing(self, data_option, i):
+        listing = make_listing(data_option, i)
+        listing.update(self.updates.get((data_option, i), {}))
+        return listing
+
+    def page(self, data_option, page_size, page, since=None):
+        total = self.rows_per_option.get(data_option, self.rows)
+        positions = range(total)
+        if since:
+            positions = [
+                i
+                for i in positions
+                if self.listing(data_option, i)["published_date"] > since
+            ]
+
+        start = page * page_size
+        end = min(start + page_size, len(positions))
+
+        next_url = None
+        if end < len(positions):
+            params = {
+                "pageSize": page_size,
+                "dataOption": data_option,
+                "page": page + 1,
+            }
+            if since:
+                params[LISTINGS_SINCE_PARAM] = since
+            next_url = self.url + "?" + urlencode(params)
+
+        return {
+            "data": [self.listing(data_option, i) for i in positions[start:end]],
+            "next": next_url,
+        }
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
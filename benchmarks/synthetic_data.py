@@ -0,0 +1,226 @@
+"""
+Synthetic data in the shape of each downloaded dataset, for benchmarks:
+the PPR csv, listings as the listings API returns them, the NaPTAN stop
+points sheet and the two school sheets. Generation is seeded so the same
+sizes always give the same data.
+"""
+
+import csv
+import os
+import random
+from datetime import date, timedelta
+
+import ujson
+
+from benchmarks.stub_listings_api import COUNTIES, STREETS, make_listing
+
+PPR_HEADER = [
+    "Date of Sale (dd/mm/yyyy)",
+    "Address",
+    "County",
+    "Eircode",
+    "Price (\x80)",
+    "Not Full Market Price",
+    "VAT Exclusive",
+    "Description of Property",
+    "Property Size Description",
+]
+
+PPR_DESCRIPTIONS = [
+    "Second-Hand Dwelling house /Apartment",
+    "New Dwelling house /Apartment",
+    "Teach/Árasán Cónaithe Atháimhe",
+]
+
+PPR_SIZES = [
+    "",
+    "greater than or equal to 38 sq metres and less than 125 sq metres",
+    "greater than 125 sq metres",
+    "less than 38 sq metres",
+]
+
+# Share of PPR rows that repeat an earlier row, as the register does
+PPR_DUPLICATE_RATE = 0.01
+
+# Share of PPR rows with an eircode, which older sales do not have
+PPR_EIRCODE_RATE = 0.4
+
+# Listing datasets and the share of the listings in each
+LISTING_SHARES = {"sale": 0.5, "rental": 0.3, "share": 0.2}
+
+# Roughly the bounds of Ireland
+LATITUDES = (51.4, 55.4)
+LONGITUDES = (-10.5, -6.0)
+
+META_FILENAME = "synthetic.json"
+
+
+def ppr_address(rng, i):
+    county = rng.choice(COUNTIES)
+    address = f"{rng.randint(1, 300)} {rng.choice(STREETS)}, Town {i % 997}"
+    return f"{address}, Co. {county.title()}", county
+
+
+def write_ppr_csv(filepath, rows, seed=0):
+    """
+    Write a PPR csv of rows sales: latin-1 with the euro sign as \\x80,
+    dd/mm/yyyy dates, formatted prices, some descriptions in Irish and a
+    share of repeated rows
+    """
+    rng = random.Random(seed)
+    written = []
+    with open(filepath, "w", newline="", encoding="ISO-8859-1") as fh:
+        writer = csv.writer(fh, quoting=csv.QUOTE_ALL)
+        writer.writerow(PPR_HEADER)
+        for i in range(rows):
+            if written and rng.random() < PPR_DUPLICATE_RATE:
+                writer.writerow(rng.choice(written))
+                continue
+
+            address, county = ppr_address(rng, i)
+            sold = date(2010, 1, 1) + timedelta(days=rng.randint(0, 15 * 365))
+            eircode = (
+                f"{rng.choice('DTHKA')}{rng.randint(1, 99):02d}"
+                f"{rng.choice('ACDEFHKNPRTVWXY')}{rng.randint(100, 999)}"
+                if rng.random() < PPR_EIRCODE_RATE
+                else ""
+            )
+            row = [
+                sold.strftime("%d/%m/%Y"),
+                address,
+                county.title(),
+                eircode,
+                f"\x80{rng.randint(50, 2000) * 1000:,}.00",
+                rng.choice(["No"] * 19 + ["Yes"]),
+                rng.choice(["No"] * 9 + ["Yes"]),
+                rng.choice(PPR_DESCRIPTIONS),
+                rng.choice(PPR_SIZES),
+            ]
+            writer.writerow(row)
+            # Only remember a sample, enough to repeat from
+            if len(written) < 10000:
+                written.append(row)
+
+
+def listings(data_option, rows):
+    """
+    Listings of data_option as the listings API returns them
+    """
+    return (make_listing(data_option, i) for i in range(rows))
+
+
+def write_bus_stops_csv(filepath, rows, seed=0):
+    """
+    Write the StopPoints sheet of NaPTAN as download_bus_data saves it
+    """
+    rng = random.Random(seed)
+    with open(filepath, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(
+            [
+                "AtcoCode",
+                "PlateCode",
+                "CommonName",
+                "Street",
+                "Latitude",
+                "Longitude",
+                "StopType",
+                "BusStopType",
+            ]
+        )
+        for i in range(rows):
+            writer.writerow(
+                [
+                    f"8{i:011d}",
+                    i,
+                    f"{rng.choice(STREETS)} {i}",
+                    rng.choice(STREETS),
+                    rng.uniform(*LATITUDES),
+                    rng.uniform(*LONGITUDES),
+                    "BCT",
+                    rng.choice(["MKD", "CUS", "HAR"]),
+                ]
+            )
+
+
+def write_schools_csvs(primary_filepath, secondary_filepath, rows, seed=0):
+    """
+    Write the primary and secondary school sheets as download_school_data
+    saves them, the secondary sheet having its headers a row down. rows is
+    split between them as the real lists are, mostly primary schools.
+    """
+    rng = random.Random(seed)
+    secondary_rows = rows // 5
+
+    def school(i):
+        return [
+            f"{i:05d}X",
+            f"Scoil {rng.choice(STREETS)} {i}",
+            rng.choice(COUNTIES).title(),
+            rng.uniform(*LATITUDES),
+            rng.uniform(*LONGITUDES),
+            rng.randint(20, 1200),
+        ]
+
+    header = [
+        "Roll Number",
+        "Official School Name",
+        "County Description",
+        "School Latitude",
+        "School Longitude",
+    ]
+
+    with open(primary_filepath, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(header + ["Total Pupils"])
+        for i in range(rows - secondary_rows):
+            writer.writerow(school(i))
+
+    with open(secondary_filepath, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow([f"Unnamed: {i}" for i in range(len(header) + 1)])
+        writer.writerow(header + ["Total Enrolment"])
+        for i in range(secondary_rows):
+            writer.writerow(school(i))
+
+
+def populate(sizes, seed=0):
+    """
+    Write datasets of sizes to where settings expects them, unless data of
+    the same sizes was written there already. sizes has the rows of "ppr",
+    "listings", "bus_stops" and "schools".
+    """
+    from scripts.download_listings import transform_listing
+    from irish_property_analysis import settings
+    from irish_property_analysis.sales import get_sale_db
+    from irish_property_analysis.rentals import get_rental_db
+    from irish_property_analysis.shares import get_share_db
+
+    meta_location = os.path.join(settings.LISTINGS_DATA_LOCATION, META_FILENAME)
+    meta = {"sizes": sizes, "seed": seed}
+    if os.path.exists(meta_location):
+        with open(meta_location) as fh:
+            if ujson.loads(fh.read()) == meta:
+                return False
+
+    settings.ensure_data_dirs()
+
+    write_ppr_csv(settings.PPR_LOCATION, sizes["ppr"], seed)
+    write_bus_stops_csv(settings.BUS_STOP_DATA_LOCATION, sizes["bus_stops"], seed)
+    write_schools_csvs(
+        settings.PRIMARY_SCHOOLS_DATA_LOCATION,
+        settings.SECONDARY_SCHOOLS_DATA_LOCATION,
+        sizes["schools"],
+        seed,
+    )
+
+    for (name, share), get_db in zip(
+        LISTING_SHARES.items(), [get_sale_db, get_rental_db, get_share_db]
+    ):
+        get_db().refresh(
+            map(transform_listing, listings(name, int(sizes["listings"] * share)))
+        )
+
+    with open(meta_location, "w") as fh:
+        fh.write(ujson.dumps(meta))
+    return True
@@ -3,10 +3,12 @@ from io import BytesIO
 import requests
 import pandas as pd
 
-from irish_property_analysis.settings import BUS_STOP_DATA_LOCATION
+from irish_property_analysis.settings import BUS_STOP_DATA_LOCATION, ensure_data_dirs
 
 
 def main():
+    ensure_data_dirs()
+
     url = "https://www.transportforireland.ie/transitData/Data/NaPTAN.xlsx"
 
     print(f"Downloading: {url}")
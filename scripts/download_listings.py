@@ -1,54 +1,277 @@
+import argparse
+import hashlib
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from irish_property_analysis.constants import (
+    LISTINGS_BASE_URL,
+    LISTINGS_DATA_OPTIONS,
+    LISTINGS_SINCE_PARAM,
+)
+from irish_property_analysis.utils import to_searchable_address
+from irish_property_analysis.rentals import get_rental_db
+from irish_property_analysis.shares import get_share_db
+from irish_property_analysis.sales import get_sale_db
+from irish_property_analysis.listing_sync import get_sync_state_db
+from irish_property_analysis.price_index import get_price_index_db, listing_prices
+
+PAGE_SIZE = 10000
+
+# Datasets fetched at once
+FETCH_WORKERS = 3
+
+# Pages fetched but not yet inserted, across every dataset, bounding the
+# memory the download takes however many datasets are fetched at once
+PREFETCH_PAGES = 2
+
+RETRIES = 5
+RETRY_BACKOFF_FACTOR = 1.0
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+_DONE = object()
+
+
+def listings_url(data_option, since=None):
+    params = {"pageSize": PAGE_SIZE, "dataOption": data_option}
+    if since:
+        params[LISTINGS_SINCE_PARAM] = since
+    return f"{LISTINGS_BASE_URL}?{urlencode(params)}"
+
+
+def make_session():
+    """
+    Session keeping a connection open per fetch worker, retrying failed
+    requests with exponential backoff
+    """
+    retry = Retry(
+        total=RETRIES,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=["GET"],
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry, pool_connections=FETCH_WORKERS, pool_maxsize=FETCH_WORKERS
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_pages(url, session=None):
+    """
+    Yield the listings of each page from the API, following next links
+    """
+    get = session.get if session else requests.get
+    while url:
+        response = get(url)
+        response.raise_for_status()
+        r = response.json()
+        yield r["data"]
+        url = r.get("next")
+
+
+def fetch_listings(url, session=None):
+    """
+    Yield listings from the API a page at a time, following next links
+    """
+    for page in fetch_pages(url, session):
+        yield from page
+
+
+class PageBudget:
+    """
+    Slots for the pages held in memory, from before each is fetched until
+    its listings have been consumed, shared by the datasets being fetched.
+    Only the dataset being consumed may take the last slot, so that it can
+    always make progress while the others wait their turn.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.held = 0
+        self.active = None
+        self._condition = threading.Condition()
+
+    def acquire(self, owner, stop):
+        """
+        Take a slot for owner, returning False if stop is set first
+        """
+        with self._condition:
+            while not stop.is_set():
+                reserved = 0 if owner is self.active else 1
+                if self.held < self.pages - reserved:
+                    self.held += 1
+                    return True
+                self._condition.wait(0.1)
+        return False
+
+    def release(self):
+        with self._condition:
+            self.held -= 1
+            self._condition.notify_all()
+
+    def activate(self, owner):
+        with self._condition:
+            self.active = owner
+            self._condition.notify_all()
+
+
+def prefetch(executor, pages, stop, budget):
+    """
+    Pull pages in a worker of executor while budget has slots for them and
+    yield their listings. Errors fetching are raised to the consumer. The
+    worker gives up once stop is set.
+    """
+    q = queue.Queue()
+
+    def produce():
+        while budget.acquire(q, stop):
+            try:
+                page = next(pages)
+            except StopIteration:
+                budget.release()
+                q.put(_DONE)
+                return
+            except Exception as e:
+                budget.release()
+                q.put(e)
+                return
+            q.put(page)
 
-from irish_property_analysis.constants import LISTINGS_BASE_URL, LISTINGS_DATA_OPTIONS
-from irish_property_analysis.utils import chunks
-from irish_property_analysis.rentals import rental_db, RentalObject
-from irish_property_analysis.shares import share_db, ShareObject
-from irish_property_analysis.sales import sale_db, SaleObject
-
-
-def main():
-    page_size = 10000
-    for name, data_option in LISTINGS_DATA_OPTIONS.items():
-        url = f"{LISTINGS_BASE_URL}?pageSize={page_size}&dataOption={data_option}"
-        data = []
-        print(f"Fetching data for: {name}")
-        while url:
-            r = requests.get(url).json()
-            data.extend(r["data"])
-            url = r.get("next")
-
-        if name in {"all_rentals", "all_sales", "all_shares"}:
-            match name:
-                case "all_rentals":
-                    object_class = RentalObject
-                    rental_db.drop_data()
-                case "all_sales":
-                    object_class = SaleObject
-                    sale_db.drop_data()
-                case "all_shares":
-                    object_class = ShareObject
-                    share_db.drop_data()
-
-            insert_data = []
-            for obj in data:
-                obj.pop("_id")
-
-                obj["lat"] = obj["location"]["coordinates"][1]
-                obj["lng"] = obj["location"]["coordinates"][0]
-                obj.pop("location")
-
-                obj["searchable_address"] = (
-                    obj["original_address"].replace(" ", "").replace(",", "").lower()
+    executor.submit(produce)
+
+    def consume():
+        budget.activate(q)
+        while True:
+            page = q.get()
+            if page is _DONE:
+                return
+            if isinstance(page, Exception):
+                raise page
+            yield from page
+            page = None
+            budget.release()
+
+    return consume()
+
+
+def listing_id(obj):
+    """
+    Stable key of a listing, its _id or failing that a hash of what
+    identifies it
+    """
+    if obj.get("_id"):
+        return str(obj["_id"])
+    key = (
+        f'{obj.get("original_address")}|{obj.get("published_date")}|{obj.get("price")}'
+    )
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def transform_listing(obj):
+    obj["listing_id"] = listing_id(obj)
+    obj.pop("_id", None)
+
+    obj["lat"] = obj["location"]["coordinates"][1]
+    obj["lng"] = obj["location"]["coordinates"][0]
+    obj.pop("location")
+
+    obj["searchable_address"] = to_searchable_address(obj["original_address"])
+
+    return obj
+
+
+class HighWaterMark:
+    """
+    Latest published_date of the listings passed through track
+    """
+
+    def __init__(self, value=None):
+        self.value = value
+
+    def track(self, listings):
+        for listing in listings:
+            published_date = listing.get("published_date")
+            if published_date and (self.value is None or published_date > self.value):
+                self.value = published_date
+            yield listing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download listings from the API")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch listings published since the last sync and update the stored listings in place",
+    )
+    args = parser.parse_args(argv)
+
+    sync_state = get_sync_state_db()
+    session = make_session()
+    stop = threading.Event()
+    budget = PageBudget(PREFETCH_PAGES)
+
+    # Every dataset is fetched at once while the listings are written to
+    # SQLite from this thread, a dataset at a time
+    with ThreadPoolExecutor(FETCH_WORKERS) as executor:
+        try:
+            syncs = []
+            for name, data_option in LISTINGS_DATA_OPTIONS.items():
+                print(f"Fetching data for: {name}")
+
+                if name not in {"all_rentals", "all_sales", "all_shares"}:
+                    print(f'Not sure how to deal with data of type "{name}"')
+                    continue
+
+                match name:
+                    case "all_rentals":
+                        db = get_rental_db()
+                    case "all_sales":
+                        db = get_sale_db()
+                    case "all_shares":
+                        db = get_share_db()
+
+                since = (
+                    sync_state.get_high_water_mark(data_option)
+                    if args.incremental
+                    else None
+                )
+                pages = fetch_pages(listings_url(data_option, since), session)
+                syncs.append(
+                    (
+                        data_option,
+                        db,
+                        HighWaterMark(since),
+                        prefetch(executor, pages, stop, budget),
+                    )
                 )
 
-                insert_data.append(obj)
-            for chunk in chunks(insert_data, 10000):
-                object_class.insert_many(chunk).execute()
-        else:
-            print(f'Not sure how to deal with data of type "{name}"')
+            for data_option, db, high_water_mark, listings in syncs:
+                listings = map(transform_listing, high_water_mark.track(listings))
+
+                if args.incremental:
+                    changed = db.upsert(listings)
+                    print(f"{changed} new or changed listings")
+                else:
+                    # Loaded alongside the current listings and swapped in at
+                    # the end, the old listings stay readable until then
+                    db.refresh(listings)
+
+                sync_state.set_high_water_mark(data_option, high_water_mark.value)
+
+                print(f"Saved {data_option}")
+        finally:
+            stop.set()
 
-        print(f"Saved {data_option}")
+    months = get_price_index_db().update("listings", listing_prices())
+    print(f"Updated listing price indexes of {len(months)} months")
 
 
 if __name__ == "__main__":
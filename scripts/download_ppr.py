@@ -1,9 +1,17 @@
 from irish_property_analysis.ppr_sale import Sales
+from irish_property_analysis.ppr_aggregates import get_price_aggregate_db
+from irish_property_analysis.price_index import get_price_index_db, ppr_prices
 from irish_property_analysis.utils import download_ppr_zip, extract_ppr_zip
-from irish_property_analysis.settings import PPR_LOCATION
+from irish_property_analysis.settings import (
+    PPR_LOCATION,
+    PPR_CACHE_LOCATION,
+    ensure_data_dirs,
+)
 
 
 def main():
+    ensure_data_dirs()
+
     zip_location = PPR_LOCATION + ".dl.zip"
 
     download_ppr_zip(zip_location)
@@ -11,6 +19,13 @@ def main():
 
     sales = Sales.load(PPR_LOCATION)
     sales.save(PPR_LOCATION)
+    sales.save_cache(PPR_CACHE_LOCATION)
+
+    months = get_price_aggregate_db().update(sales)
+    print(f"Updated price aggregates of {len(months)} months")
+
+    months = get_price_index_db().update("ppr", ppr_prices(sales))
+    print(f"Updated price indexes of {len(months)} months")
 
 
 if __name__ == "__main__":
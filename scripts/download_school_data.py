@@ -6,10 +6,15 @@ import pandas as pd
 from irish_property_analysis.settings import (
     PRIMARY_SCHOOLS_DATA_LOCATION,
     SECONDARY_SCHOOLS_DATA_LOCATION,
+    SCHOOLS_CACHE_LOCATION,
+    ensure_data_dirs,
 )
+from irish_property_analysis.schools import read_schools, write_schools_cache
 
 
 def main():
+    ensure_data_dirs()
+
     configs = [
         {
             "url": "https://assets.gov.ie/static/documents/Data_on_Individual_Schools_PPOD_2024_25.xlsx",
@@ -36,6 +41,9 @@ def main():
                 df.to_csv(config["data_location"], index=False)
                 print(f"Wrote to: {config['data_location']}")
 
+    write_schools_cache(read_schools())
+    print(f"Wrote to: {SCHOOLS_CACHE_LOCATION}")
+
 
 if __name__ == "__main__":
     main()
@@ -1,144 +1,58 @@
 # TODO: at some point min / max (date, bed, bath, price)
 
 import argparse
-from datetime import datetime
-
-from tabulate import tabulate
+import time
 
 from rtb_scraper.register import register
 from rtb_scraper.tribunal import tribunals
 from rtb_scraper.determination import determinations
 
-from irish_property_analysis.settings import PPR_LOCATION
+from irish_property_analysis.settings import PPR_LOCATION, PPR_CACHE_LOCATION
 from irish_property_analysis.utils import (
     get_all_historical_listings,
     get_shares,
     get_rentals,
     clean_address_for_comparison,
-    minimize_str,
-    none_to_str,
+    LazySingleton,
 )
 from irish_property_analysis.ppr_sale import Sales
-from irish_property_analysis.schools import schools
-from irish_property_analysis.bus_stops import bus_stops
-from irish_property_analysis.sales import sale_db
-from irish_property_analysis.rentals import rental_db
-from irish_property_analysis.shares import share_db
+from irish_property_analysis.schools import get_schools
+from irish_property_analysis.bus_stops import get_bus_stops
+from irish_property_analysis.sales import get_sale_db
+from irish_property_analysis.rentals import get_rental_db
+from irish_property_analysis.shares import get_share_db
+from irish_property_analysis.rental_yields import get_rental_yield_db
 
+from scripts.property_details import add_query_arguments, print_sections
 
-def for_print_tabulate(objects, truncate=False):
-    if not objects:
-        print("Nothing to show...")
-        return
 
-    keys = list(objects[0].keys())
-    keys_to_remove = []
-    for key in keys:
-        if all(not obj.get(key) for obj in objects):
-            keys_to_remove.append(key)
+def load_ppr_sales():
+    return Sales.load(PPR_LOCATION, cache_location=PPR_CACHE_LOCATION)
 
-    # Comes from rtb db
-    for obj in objects:
-        obj.pop("searchable_address", None)
 
-    if keys_to_remove:
-        print(f"Removing keys: {keys_to_remove} as they are all empty")
+get_ppr_sales = LazySingleton(
+    load_ppr_sales, sources=[PPR_LOCATION, PPR_CACHE_LOCATION]
+)
 
-    filtered_objects = [
-        {k: v for k, v in obj.items() if k not in keys_to_remove} for obj in objects
-    ]
 
-    # Don't want price in scientific notation so put to str
-    for obj in filtered_objects:
-        if "price" in obj:
-            obj["price"] = f"{obj['price']:,.0f}"
-
-    if truncate:
-        for obj in filtered_objects:
-            if obj.get("lat"):
-                obj["lat"] = round(obj["lat"], 4)
-            if obj.get("lng"):
-                obj["lng"] = round(obj["lng"], 4)
-
-    if truncate:
-        for obj in filtered_objects:
-            for k, v in obj.items():
-                if isinstance(v, datetime):
-                    obj[k] = v.date()
-                    continue
-
-                if not isinstance(v, str):
-                    continue
-
-                timestamp = None
-                for fmt in ["%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"]:
-                    try:
-                        timestamp = datetime.strptime(v, fmt)
-                        break
-                    except ValueError:
-                        continue
-
-                if timestamp:
-                    obj[k] = timestamp.date()
-
-    return tabulate(
-        [
-            list(
-                [
-                    minimize_str(none_to_str(o)) if truncate else none_to_str(o)
-                    for o in obj.values()
-                ]
-            )
-            for obj in filtered_objects
-        ],
-        headers=list(filtered_objects[0].keys()) if filtered_objects else [],
-        tablefmt="fancy_grid",
-    )
+def ppr_section(args):
+    if not args.address_substr_csv:
+        return []
 
-
-def address_substr_csv(value: str):
-    return (
-        [clean_address_for_comparison(addr).lower() for addr in value.split(",")]
-        if value
-        else []
+    ppr_results = get_ppr_sales().filter(
+        address_substrs=args.address_substr_csv, county=args.county, partial=True
     )
 
-
-def print_ppr(args):
-    ppr_sales = Sales.load(PPR_LOCATION)
-
-    ppr_results = []
-    for address_substr in args.address_substr_csv:
-        # TODO: add feature to have a list of address substrings
-        ppr_results = ppr_sales.filter(
-            address=address_substr, county=args.county, partial=True
-        )
-
+    # The same sale can be in the PPR more than once
     final_ppr_results = []
-    ppr_results_by_date = {}
+    seen = set()
     for ppr_item in ppr_results:
-        if all(
-            [
-                i in clean_address_for_comparison(ppr_item.address)
-                for i in args.address_substr_csv
-            ]
-        ):
-            if ppr_item.address not in ppr_results_by_date:
-                final_ppr_results.append(ppr_item)
-                ppr_results_by_date[ppr_item.address] = [ppr_item.date]
-            elif (
-                ppr_item.address in ppr_results_by_date
-                and ppr_item.date not in ppr_results_by_date[ppr_item.address]
-            ):
-                final_ppr_results.append(ppr_item)
-                ppr_results_by_date[ppr_item.address].append(ppr_item.date)
-
-    print("\nPPR:")
-    print(
-        for_print_tabulate(
-            [i.serialise() for i in final_ppr_results], truncate=not args.all
-        )
-    )
+        key = (ppr_item.address, ppr_item.date)
+        if key not in seen:
+            seen.add(key)
+            final_ppr_results.append(ppr_item)
+
+    return [i.serialise() for i in final_ppr_results]
 
 
 def passes_listing_filter(args, listing):
@@ -167,78 +81,112 @@ def serialise_listing_for_print(listing: dict) -> dict:
     return listing
 
 
-def add_school_score(listing_data, radius_km=1):
-    if listing_data["lat"] and listing_data["lng"]:
-        listing_data["school_score"] = schools.get_score(
-            listing_data["lat"], listing_data["lng"], radius_km=radius_km
-        )
-    else:
-        listing_data["school_score"] = 0
-    return listing_data
+def add_scores(listings, school_radius_km=1, bus_stop_radius_km=1):
+    """
+    Add school and bus stop scores to all listings in one batch query each
+    """
+    lats = [
+        listing["lat"] if listing["lat"] and listing["lng"] else float("nan")
+        for listing in listings
+    ]
+    lngs = [
+        listing["lng"] if listing["lat"] and listing["lng"] else float("nan")
+        for listing in listings
+    ]
 
+    school_scores = get_schools().get_scores(lats, lngs, radius_km=school_radius_km)
+    bus_stop_scores = get_bus_stops().get_scores(
+        lats, lngs, radius_km=bus_stop_radius_km
+    )
 
-def add_bus_stop_score(listing_data, radius_km=1):
-    if listing_data["lat"] and listing_data["lng"]:
-        listing_data["bus_stop_score"] = bus_stops.get_score(
-            listing_data["lat"], listing_data["lng"], radius_km=radius_km
+    for listing, school_score, bus_stop_score in zip(
+        listings, school_scores, bus_stop_scores
+    ):
+        listing["school_score"] = int(school_score)
+        listing["bus_stop_score"] = int(bus_stop_score)
+    return listings
+
+
+def add_yields(listings):
+    """
+    Add the gross rental yield of each listing's area, for its number of
+    beds and property type where there are enough of those
+    """
+    db = get_rental_yield_db()
+    yields = db.yields()
+    for listing in listings:
+        area_yield = db.get(
+            listing["eircode_routing_key"],
+            listing["beds"],
+            listing["property_type"],
+            yields=yields,
+        )
+        listing["area_gross_yield"] = (
+            f"{area_yield.gross_yield:.1%}" if area_yield else None
         )
-    else:
-        listing_data["bus_stop_score"] = 0
-    return listing_data
+    return listings
 
 
-def print_listing_sales(args):
+def listing_sales_section(args):
     objects = []
 
-    print("\nHistorical listing sales:")
-    for sale_obj in sale_db.filter(
+    for sale_obj in get_sale_db().filter(
         address_substrs=args.address_substr_csv, county=args.county, partial=True
     ):
         sale_dict = sale_obj.serialise()
-
-        sale_dict = add_school_score(sale_dict, radius_km=args.school_radius_km)
-        sale_dict = add_bus_stop_score(sale_dict, radius_km=args.bus_stop_radius_km)
         sale_dict.pop("clean_address")
         objects.append(sale_dict)
 
-    print(for_print_tabulate(objects, truncate=not args.all))
+    objects = add_scores(
+        objects,
+        school_radius_km=args.school_radius_km,
+        bus_stop_radius_km=args.bus_stop_radius_km,
+    )
+    objects = add_yields(objects)
 
+    return objects
 
-def print_listing_shares(args):
+
+def listing_shares_section(args):
     objects = []
 
-    print("\nHistorical listing shares:")
-    for share_obj in share_db.filter(
+    for share_obj in get_share_db().filter(
         address_substrs=args.address_substr_csv, county=args.county, partial=True
     ):
         share_dict = share_obj.serialise()
-
-        share_dict = add_school_score(share_dict, radius_km=args.school_radius_km)
-        share_dict = add_bus_stop_score(share_dict, radius_km=args.bus_stop_radius_km)
         share_dict.pop("clean_address")
         objects.append(share_dict)
 
-    print(for_print_tabulate(objects, truncate=not args.all))
+    objects = add_scores(
+        objects,
+        school_radius_km=args.school_radius_km,
+        bus_stop_radius_km=args.bus_stop_radius_km,
+    )
 
+    return objects
 
-def print_listing_rentals(args):
+
+def listing_rentals_section(args):
     objects = []
 
-    print("\nHistorical listing rentals:")
-    for rental_obj in rental_db.filter(
+    for rental_obj in get_rental_db().filter(
         address_substrs=args.address_substr_csv, county=args.county, partial=True
     ):
         rental_dict = rental_obj.serialise()
-
-        rental_dict = add_school_score(rental_dict, radius_km=args.school_radius_km)
-        rental_dict = add_bus_stop_score(rental_dict, radius_km=args.bus_stop_radius_km)
         rental_dict.pop("clean_address")
         objects.append(rental_dict)
 
-    print(for_print_tabulate(objects, truncate=not args.all))
+    objects = add_scores(
+        objects,
+        school_radius_km=args.school_radius_km,
+        bus_stop_radius_km=args.bus_stop_radius_km,
+    )
+    objects = add_yields(objects)
+
+    return objects
 
 
-def print_rtb_registrations(args):
+def rtb_registrations_section(args):
     register_accum = []
 
     for address_substr in args.address_substr_csv:
@@ -265,11 +213,10 @@ def print_rtb_registrations(args):
         temp_item.pop("id")
         print_data.append(temp_item)
 
-    print("\nRTB register results:")
-    print(for_print_tabulate([d for d in print_data], truncate=not args.all))
+    return print_data
 
 
-def print_rtb_determinations(args):
+def rtb_determinations_section(args):
     determination_accum = []
 
     for address_substr in args.address_substr_csv:
@@ -298,11 +245,10 @@ def print_rtb_determinations(args):
             dp.pop("id")
             determination_results.append(dp)
 
-    print("\nRTB determination results:")
-    print(for_print_tabulate([d for d in determination_results], truncate=not args.all))
+    return determination_results
 
 
-def print_rtb_tribunals(args):
+def rtb_tribunals_section(args):
     tribunal_accum = []
 
     for address_substr in args.address_substr_csv:
@@ -327,61 +273,43 @@ def print_rtb_tribunals(args):
         temp_item.pop("id")
         print_data.append(temp_item)
 
-    print("\nRTB tribunal results:")
-    print(for_print_tabulate([d for d in print_data], truncate=not args.all))
+    return print_data
+
+
+# In the order they are printed
+SECTIONS = [
+    ("Historical listing sales", listing_sales_section),
+    ("Historical listing shares", listing_shares_section),
+    ("Historical listing rentals", listing_rentals_section),
+    ("RTB tribunal results", rtb_tribunals_section),
+    ("RTB determination results", rtb_determinations_section),
+    ("RTB register results", rtb_registrations_section),
+    ("PPR", ppr_section),
+]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def run_sections(args):
+    """
+    Yield (title, records, seconds) for each of SECTIONS in order
+    """
+    for title, section in SECTIONS:
+        yield (title, *timed(section, args))
 
 
 def main():
     parser = argparse.ArgumentParser(
         description="Get all available details about an address"
     )
-    parser.add_argument(
-        "--address-substr-csv",
-        dest="address_substr_csv",
-        type=address_substr_csv,
-        help="CSV values of address substrings that must be within the found address (e.g. '13,dublin,grand canal')",
-        default=[],
-    )
-    parser.add_argument("--county", type=str, help="County to search in")
-    parser.add_argument(
-        "--school-radius-km",
-        type=float,
-        help="How wide around a property to search for schools",
-        default=1,
-    )
-    parser.add_argument(
-        "--bus-stop-radius-km",
-        type=float,
-        help="How wide around a property to search for bus stops",
-        default=1,
-    )
-    parser.add_argument(
-        "--all", action="store_true", help="Don't truncate long strings"
-    )
-
-    # TODO
-    # parser.add_argument(
-    #    "--exclude-address-substr-csv",
-    #    dest="exclude_address_substr_csv",
-    #    type=address_substr_csv,
-    #    help="CSV values of address substrings that must not be within the found address (e.g. '13,dublin,grand canal')",
-    #    default=[],
-    # )
-    # parser.add_argument(
-    #    "--eircode", type=str, help="eircode to search for, overides address-substr-csv"
-    # )
-
+    add_query_arguments(parser)
     args = parser.parse_args()
 
-    print_listing_sales(args)
-    print_listing_shares(args)
-    print_listing_rentals(args)
-
-    print_rtb_tribunals(args)
-    print_rtb_determinations(args)
-    print_rtb_registrations(args)
-
-    print_ppr(args)
+    print_sections(run_sections(args), args)
 
 
 if __name__ == "__main__":
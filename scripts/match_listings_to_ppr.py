@@ -0,0 +1,25 @@
+import argparse
+
+from irish_property_analysis.settings import PPR_LOCATION, PPR_CACHE_LOCATION
+from irish_property_analysis.ppr_sale import Sales
+from irish_property_analysis.ppr_matches import get_ppr_match_db
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Match historical sale listings to the PPR sales they could have become"
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Drop the existing matches and match every listing against every sale",
+    )
+    args = parser.parse_args(argv)
+
+    sales = Sales.load(PPR_LOCATION, cache_location=PPR_CACHE_LOCATION)
+    count = get_ppr_match_db().match(sales, full=args.full)
+    print(f"{count} new matches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+
+from irish_property_analysis.settings import PPR_LOCATION, PPR_CACHE_LOCATION
+from irish_property_analysis.ppr_sale import Sales, DESCRIPTION_OF_PROPERTY_SIZE
+from irish_property_analysis.ppr_aggregates import ALL, get_price_aggregate_db
+from irish_property_analysis.price_index import SOURCES, get_price_index_db, ppr_prices
+
+from scripts.property_details import for_print_tabulate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Print PPR prices by month for an eircode routing key or county"
+    )
+    area = parser.add_mutually_exclusive_group(required=True)
+    area.add_argument("--routing-key", help="Eircode routing key, e.g. D08")
+    area.add_argument("--county", help="County, e.g. dublin")
+    parser.add_argument(
+        "--description",
+        choices=[ALL, "second_hand", "new"],
+        default=ALL,
+        help="Only sales of second hand or new properties",
+    )
+    parser.add_argument(
+        "--size",
+        choices=[ALL] + list(DESCRIPTION_OF_PROPERTY_SIZE.values()),
+        default=ALL,
+        help="Only sales of a size band, which only new properties have",
+    )
+    parser.add_argument("--since", help="First month to show, as YYYY-MM")
+    parser.add_argument("--until", help="Last month to show, as YYYY-MM")
+    parser.add_argument(
+        "--index",
+        choices=SOURCES,
+        help="Print the repeat sales price index of PPR sales or listing asking prices instead",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Rebuild the aggregates and PPR price indexes from the PPR data first",
+    )
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        sales = Sales.load(PPR_LOCATION, cache_location=PPR_CACHE_LOCATION)
+        months = get_price_aggregate_db().update(sales, full=True)
+        print(f"Rebuilt {len(months)} months")
+        months = get_price_index_db().update("ppr", ppr_prices(sales), full=True)
+        print(f"Rebuilt price indexes of {len(months)} months")
+
+    if args.index:
+        indexes = get_price_index_db().series(
+            source=args.index,
+            routing_key=args.routing_key,
+            county=args.county,
+            since=args.since,
+            until=args.until,
+        )
+        records = []
+        for month in indexes:
+            record = month.serialise()
+            record["change"] = f"{record['change']:.4f}"
+            record["index"] = f"{record['index']:.1f}"
+            records.append(record)
+        print(for_print_tabulate(records))
+        return
+
+    trends = get_price_aggregate_db().trends(
+        routing_key=args.routing_key,
+        county=args.county,
+        description_of_property=args.description,
+        description_of_property_size=args.size,
+        since=args.since,
+        until=args.until,
+    )
+
+    records = []
+    for aggregate in trends:
+        record = aggregate.serialise()
+        for name in ["mean", "median", "p10", "p90"]:
+            record[name] = f"{record[name]:,.0f}"
+        records.append(record)
+    print(for_print_tabulate(records))
+
+
+if __name__ == "__main__":
+    main()
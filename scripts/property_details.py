@@ -0,0 +1,149 @@
+"""
+Arguments and output shared by get_property_details and the client of the
+property details server. Kept light to import so the client starts fast.
+"""
+
+from datetime import datetime
+
+from tabulate import tabulate
+
+from irish_property_analysis.utils import (
+    clean_address_for_comparison,
+    minimize_str,
+    none_to_str,
+)
+
+
+def for_print_tabulate(objects, truncate=False):
+    if not objects:
+        return "Nothing to show..."
+
+    keys = list(objects[0].keys())
+    keys_to_remove = []
+    for key in keys:
+        if all(not obj.get(key) for obj in objects):
+            keys_to_remove.append(key)
+
+    # Comes from rtb db
+    for obj in objects:
+        obj.pop("searchable_address", None)
+
+    notes = ""
+    if keys_to_remove:
+        notes = f"Removing keys: {keys_to_remove} as they are all empty\n"
+
+    filtered_objects = [
+        {k: v for k, v in obj.items() if k not in keys_to_remove} for obj in objects
+    ]
+
+    # Don't want price in scientific notation so put to str
+    for obj in filtered_objects:
+        if "price" in obj:
+            obj["price"] = f"{obj['price']:,.0f}"
+
+    if truncate:
+        for obj in filtered_objects:
+            if obj.get("lat"):
+                obj["lat"] = round(obj["lat"], 4)
+            if obj.get("lng"):
+                obj["lng"] = round(obj["lng"], 4)
+
+    if truncate:
+        for obj in filtered_objects:
+            for k, v in obj.items():
+                if isinstance(v, datetime):
+                    obj[k] = v.date()
+                    continue
+
+                if not isinstance(v, str):
+                    continue
+
+                timestamp = None
+                for fmt in ["%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"]:
+                    try:
+                        timestamp = datetime.strptime(v, fmt)
+                        break
+                    except ValueError:
+                        continue
+
+                if timestamp:
+                    obj[k] = timestamp.date()
+
+    return notes + tabulate(
+        [
+            list(
+                [
+                    minimize_str(none_to_str(o)) if truncate else none_to_str(o)
+                    for o in obj.values()
+                ]
+            )
+            for obj in filtered_objects
+        ],
+        headers=list(filtered_objects[0].keys()) if filtered_objects else [],
+        tablefmt="fancy_grid",
+    )
+
+
+def address_substr_csv(value: str):
+    return (
+        [clean_address_for_comparison(addr).lower() for addr in value.split(",")]
+        if value
+        else []
+    )
+
+
+def add_query_arguments(parser):
+    parser.add_argument(
+        "--address-substr-csv",
+        dest="address_substr_csv",
+        type=address_substr_csv,
+        help="CSV values of address substrings that must be within the found address (e.g. '13,dublin,grand canal')",
+        default=[],
+    )
+    parser.add_argument("--county", type=str, help="County to search in")
+    parser.add_argument(
+        "--school-radius-km",
+        type=float,
+        help="How wide around a property to search for schools",
+        default=1,
+    )
+    parser.add_argument(
+        "--bus-stop-radius-km",
+        type=float,
+        help="How wide around a property to search for bus stops",
+        default=1,
+    )
+    parser.add_argument(
+        "--all", action="store_true", help="Don't truncate long strings"
+    )
+    parser.add_argument(
+        "--timings", action="store_true", help="Print how long each section took"
+    )
+
+    # TODO
+    # parser.add_argument(
+    #    "--exclude-address-substr-csv",
+    #    dest="exclude_address_substr_csv",
+    #    type=address_substr_csv,
+    #    help="CSV values of address substrings that must not be within the found address (e.g. '13,dublin,grand canal')",
+    #    default=[],
+    # )
+    # parser.add_argument(
+    #    "--eircode", type=str, help="eircode to search for, overides address-substr-csv"
+    # )
+
+
+def print_sections(sections, args):
+    """
+    Print the records of each (title, records, seconds) of sections as a
+    table, followed by the timings if asked for
+    """
+    timings = []
+    for title, records, seconds in sections:
+        print(f"\n{title}:")
+        print(for_print_tabulate(records, truncate=not args.all))
+        timings.append([title, f"{seconds:.3f}"])
+
+    if args.timings:
+        print("\nSection timings:")
+        print(tabulate(timings, headers=["section", "seconds"], tablefmt="simple"))
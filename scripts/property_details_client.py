@@ -0,0 +1,64 @@
+"""
+get_property_details answered by a running property_details_server, which
+has the data already loaded.
+"""
+
+import argparse
+import json
+import sys
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from scripts.property_details import add_query_arguments, print_sections
+
+DEFAULT_SERVER_URL = "http://127.0.0.1:8765"
+
+
+def query_details(server_url, query):
+    request = Request(
+        f"{server_url}/details",
+        data=json.dumps(query).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Get all available details about an address from a running property_details_server"
+    )
+    add_query_arguments(parser)
+    parser.add_argument(
+        "--server-url",
+        default=DEFAULT_SERVER_URL,
+        help="URL of the property_details_server",
+    )
+    args = parser.parse_args()
+
+    query = {
+        # Already cleaned, which cleaning again on the server leaves as is
+        "address_substr_csv": ",".join(args.address_substr_csv),
+        "county": args.county,
+        "school_radius_km": args.school_radius_km,
+        "bus_stop_radius_km": args.bus_stop_radius_km,
+    }
+
+    try:
+        result = query_details(args.server_url, query)
+    except HTTPError as e:
+        sys.exit(f"Query failed: {e.read().decode()}")
+    except URLError as e:
+        sys.exit(f"Could not reach {args.server_url}: {e.reason}")
+
+    print_sections(
+        (
+            (section["title"], section["records"], section["seconds"])
+            for section in result["sections"]
+        ),
+        args,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Local server answering get_property_details queries with the PPR, school
+and bus stop data and the listing databases kept loaded, so that a query
+is not held up loading them. Data is reloaded when its files change.
+
+    POST /details {"address_substr_csv": "87,avenue", "county": "dublin"}
+
+answers with {"sections": [{"title": ..., "records": [...], "seconds": ...}]}
+in the order get_property_details prints them.
+"""
+
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from irish_property_analysis.schools import get_schools
+from irish_property_analysis.bus_stops import get_bus_stops
+from irish_property_analysis.sales import get_sale_db
+from irish_property_analysis.rentals import get_rental_db
+from irish_property_analysis.shares import get_share_db
+
+from scripts.get_property_details import get_ppr_sales, run_sections
+from scripts.property_details import add_query_arguments
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+DATASETS = [get_ppr_sales, get_schools, get_bus_stops]
+
+# Fields of a query, named as the get_property_details arguments
+QUERY_FIELDS = [
+    "address_substr_csv",
+    "county",
+    "school_radius_km",
+    "bus_stop_radius_km",
+]
+
+
+def query_args(query):
+    """
+    Namespace as get_property_details would parse it from its arguments,
+    from the JSON body of a query
+    """
+    argv = []
+    for name in QUERY_FIELDS:
+        if query.get(name) is not None:
+            argv += ["--" + name.replace("_", "-"), str(query[name])]
+
+    parser = argparse.ArgumentParser(exit_on_error=False)
+    add_query_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def details(args):
+    # Picks up any dataset that was downloaded again since it was loaded,
+    # the listing databases are always read as they are
+    for dataset in DATASETS:
+        dataset.reset_if_stale()
+
+    return {
+        "sections": [
+            {"title": title, "records": records, "seconds": seconds}
+            for title, records, seconds in run_sections(args)
+        ]
+    }
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/health":
+            return self.send_json(200, {"status": "ok"})
+        self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/details":
+            return self.send_json(404, {"error": "not found"})
+
+        try:
+            query = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            args = query_args(query)
+        except (TypeError, ValueError, AttributeError, argparse.ArgumentError) as e:
+            return self.send_json(400, {"error": f"bad query: {e}"})
+
+        try:
+            self.send_json(200, details(args))
+        except Exception as e:
+            self.send_json(500, {"error": repr(e)})
+            raise
+
+    def send_json(self, status, body):
+        content = json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve get_property_details queries with the data kept loaded"
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    print("Loading data")
+    for dataset in DATASETS:
+        dataset()
+    for get_db in [get_sale_db, get_rental_db, get_share_db]:
+        get_db()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import os
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+from irish_property_analysis.string_pool import StringPool
+
+TOKEN_RE = re.compile(r"\w+")
+
+# Sorts after any character, so prefix + MAX_CHAR bounds tokens with prefix
+MAX_CHAR = "\U0010ffff"
+
+
+class AddressIndex:
+    """
+    Token inverted index over a list of documents (cleaned addresses), used
+    to narrow substring searches to a few candidates before verifying them.
+
+    A substring query is split into tokens. If the query occurs in a
+    document then its first token is a suffix of one of the document's
+    tokens, its last token a prefix of one, and any tokens in between match
+    exactly (a single token query just has to be inside a document token).
+    Matching query tokens against the vocabulary and intersecting the
+    posting lists gives a superset of the documents containing the query.
+    """
+
+    def __init__(self, vocab, offsets, postings, num_documents):
+        self.vocab = vocab if isinstance(vocab, StringPool) else StringPool(vocab)
+        self.offsets = offsets
+        self.postings = postings
+        self.num_documents = num_documents
+
+        # Vocabulary sorted by token and by reversed token, for prefix and
+        # suffix lookups. Built on first use.
+        self._sorted_vocab = {}
+
+    def __len__(self):
+        return self.num_documents
+
+    @staticmethod
+    def build(documents):
+        vocab = {}
+        token_ids = []
+        doc_ids = []
+        for doc_id, document in enumerate(documents):
+            if not document:
+                continue
+            for token in set(TOKEN_RE.findall(document)):
+                token_ids.append(vocab.setdefault(token, len(vocab)))
+                doc_ids.append(doc_id)
+
+        token_ids = np.array(token_ids, dtype=np.int32)
+        doc_ids = np.array(doc_ids, dtype=np.int32)
+
+        order = np.lexsort((doc_ids, token_ids))
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(token_ids, minlength=len(vocab)), out=offsets[1:])
+
+        return AddressIndex(list(vocab), offsets, doc_ids[order], len(documents))
+
+    def _postings(self, token_ids):
+        if len(token_ids) == 1:
+            token_id = token_ids[0]
+            return self.postings[self.offsets[token_id] : self.offsets[token_id + 1]]
+
+        return np.unique(
+            np.concatenate(
+                [
+                    self.postings[self.offsets[t] : self.offsets[t + 1]]
+                    for t in token_ids
+                ]
+                or [np.empty(0, dtype=np.int32)]
+            )
+        )
+
+    def _sorted(self, reverse):
+        if reverse not in self._sorted_vocab:
+            tokens = self.vocab.values
+            if reverse:
+                tokens = [token[::-1] for token in tokens]
+            order = sorted(range(len(tokens)), key=tokens.__getitem__)
+            self._sorted_vocab[reverse] = ([tokens[i] for i in order], order)
+        return self._sorted_vocab[reverse]
+
+    def _starting_with(self, prefix, reverse=False):
+        """
+        Get the ids of tokens starting with prefix, or ending with it if
+        reverse
+        """
+        tokens, order = self._sorted(reverse)
+        if reverse:
+            prefix = prefix[::-1]
+        start = bisect_left(tokens, prefix)
+        return order[start : bisect_left(tokens, prefix + MAX_CHAR, start)]
+
+    def _equal_to(self, token):
+        token_id = self.vocab.find(token)
+        return [] if token_id is None else [token_id]
+
+    def _containing(self, substr):
+        return [idx for idx, token in enumerate(self.vocab.values) if substr in token]
+
+    def candidates(self, substr):
+        """
+        Get the sorted ids of documents that may contain substr. Returns
+        None if substr has no tokens to narrow on.
+        """
+        tokens = TOKEN_RE.findall(substr)
+        if not tokens:
+            return None
+
+        if len(tokens) == 1:
+            token_ids = [self._containing(tokens[0])]
+        else:
+            token_ids = (
+                [self._starting_with(tokens[0], reverse=True)]
+                + [self._equal_to(t) for t in tokens[1:-1]]
+                + [self._starting_with(tokens[-1])]
+            )
+
+        result = None
+        for ids in token_ids:
+            postings = self._postings(ids)
+            result = (
+                postings
+                if result is None
+                else np.intersect1d(result, postings, assume_unique=True)
+            )
+            if not len(result):
+                break
+
+        return result
+
+    def search(self, substrs, get_document, num_documents=None):
+        """
+        Get the sorted ids of documents that contain every one of substrs.
+
+        get_document maps a document id to its text for verification.
+        Documents added after the index was built (ids from len(self) up to
+        num_documents) are checked directly.
+        """
+        num_documents = self.num_documents if num_documents is None else num_documents
+
+        result = None
+        for substr in substrs:
+            candidates = self.candidates(substr)
+            if candidates is None:
+                continue
+            result = (
+                candidates
+                if result is None
+                else np.intersect1d(result, candidates, assume_unique=True)
+            )
+
+        if result is None:
+            result = np.arange(self.num_documents)
+        result = np.concatenate([result, np.arange(self.num_documents, num_documents)])
+
+        return np.array(
+            [
+                doc_id
+                for doc_id in result.tolist()
+                if all(substr in (get_document(doc_id) or "") for substr in substrs)
+            ],
+            dtype=np.int64,
+        )
+
+    def save(self, location, prefix="address_index"):
+        data, vocab_offsets = self.vocab.to_buffers()
+        for name, value in [
+            ("vocab.data", data),
+            ("vocab.offsets", vocab_offsets),
+            ("offsets", self.offsets),
+            ("postings", self.postings),
+            ("num_documents", np.array([self.num_documents], dtype=np.int64)),
+        ]:
+            np.save(os.path.join(location, f"{prefix}.{name}.npy"), value)
+
+    @staticmethod
+    def load(location, prefix="address_index"):
+        def _load(name):
+            return np.load(
+                os.path.join(location, f"{prefix}.{name}.npy"), mmap_mode="r"
+            )
+
+        return AddressIndex(
+            StringPool.from_buffers(_load("vocab.data"), _load("vocab.offsets")),
+            _load("offsets"),
+            _load("postings"),
+            int(_load("num_documents")[0]),
+        )
@@ -0,0 +1,194 @@
+from contextlib import contextmanager
+from functools import reduce
+from operator import or_
+
+from peewee import EXCLUDED, OP, Expression
+
+from irish_property_analysis.utils import batched
+from irish_property_analysis.search_index import (
+    create_search_index,
+    delete_trigger_sql,
+    fts_table_name,
+    rebuild_search_index,
+    trigram_fts_available,
+)
+
+# Rows per INSERT statement, keeps within SQLite's bound parameter limit
+INSERT_STATEMENT_SIZE = 1000
+
+STAGING_SUFFIX = "__staging"
+
+# Counts the changes to each table loaded through here, for what is derived
+# from a table to tell that it has changed
+VERSIONS_TABLE = "table_versions"
+
+
+@contextmanager
+def bulk_load_pragmas(db):
+    """
+    Tune the connection for loading lots of rows. WAL lets readers carry on
+    with the last committed data while the load runs and syncing to disk is
+    skipped until the load is done.
+    """
+    db.execute_sql("PRAGMA journal_mode=WAL")
+    synchronous = db.execute_sql("PRAGMA synchronous").fetchone()[0]
+    db.execute_sql("PRAGMA synchronous=OFF")
+    db.execute_sql("PRAGMA temp_store=MEMORY")
+    try:
+        yield
+    finally:
+        db.execute_sql(f"PRAGMA synchronous={synchronous}")
+
+
+def insert_rows(model, rows):
+    """
+    Insert rows into model's table in statements of bounded size, returning
+    the number inserted
+    """
+    count = 0
+    for statement_rows in batched(rows, INSERT_STATEMENT_SIZE):
+        model.insert_many(statement_rows).execute()
+        count += len(statement_rows)
+    return count
+
+
+def _create_versions_table(db):
+    db.execute_sql(
+        f'CREATE TABLE IF NOT EXISTS "{VERSIONS_TABLE}" '
+        "(name TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+    )
+
+
+def bump_table_version(model):
+    """
+    Record that model's table changed, in the transaction changing it
+    """
+    db = model._meta.database
+    _create_versions_table(db)
+    db.execute_sql(
+        f'INSERT INTO "{VERSIONS_TABLE}" (name, version) VALUES (?, 1) '
+        "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+        (model._meta.table_name,),
+    )
+
+
+def table_versions(*models):
+    """
+    Get the version of each of models' tables, 0 for one never loaded
+    """
+    db = models[0]._meta.database
+    _create_versions_table(db)
+    versions = dict(
+        db.execute_sql(f'SELECT name, version FROM "{VERSIONS_TABLE}"').fetchall()
+    )
+    return [versions.get(model._meta.table_name, 0) for model in models]
+
+
+def _staging_model(model):
+    class Meta:
+        table_name = model._meta.table_name + STAGING_SUFFIX
+
+    return type(f"{model.__name__}Staging", (model,), {"Meta": Meta})
+
+
+def refresh_table(model, rows):
+    """
+    Replace the contents of model's table with rows.
+
+    Rows are loaded into a staging copy of the table, which has its indexes
+    built once the rows are in and is then renamed into place, all in one
+    transaction. Readers see the old rows until it commits, and the old rows
+    are kept if loading fails. Returns the number of rows loaded.
+    """
+    db = model._meta.database
+    table = model._meta.table_name
+    staging = _staging_model(model)
+    staging_table = staging._meta.table_name
+
+    (create_sql,) = db.execute_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone()
+
+    with bulk_load_pragmas(db), db.atomic():
+        db.execute_sql(f'DROP TABLE IF EXISTS "{staging_table}"')
+        db.execute_sql(create_sql.replace(f'"{table}"', f'"{staging_table}"', 1))
+
+        count = insert_rows(staging, rows)
+
+        # Keep the last of any rows sharing a listing_id, as upsert_rows
+        # would, so that the unique index can be built
+        count -= db.execute_sql(
+            f'DELETE FROM "{staging_table}" WHERE listing_id IS NOT NULL '
+            f'AND id NOT IN (SELECT max(id) FROM "{staging_table}" '
+            "GROUP BY listing_id)"
+        ).rowcount
+
+        db.execute_sql(f'DROP TABLE "{table}"')
+        db.execute_sql(f'ALTER TABLE "{staging_table}" RENAME TO "{table}"')
+
+        model._schema.create_indexes(safe=True)
+        create_search_index(model)
+        rebuild_search_index(model)
+
+        bump_table_version(model)
+
+    return count
+
+
+def delete_all(model) -> None:
+    """
+    Delete every row of model and empty its search index. The per row
+    delete trigger is dropped for the duration so this stays a bulk delete.
+    """
+    db = model._meta.database
+    table = model._meta.table_name
+
+    with db.atomic():
+        if trigram_fts_available():
+            fts_table = fts_table_name(model)
+            db.execute_sql(f"DROP TRIGGER IF EXISTS {table}_fts_ad")
+            model.delete().execute()
+            db.execute_sql(
+                f"INSERT INTO {fts_table}({fts_table}) VALUES ('delete-all')"
+            )
+            db.execute_sql(delete_trigger_sql(model))
+        else:
+            model.delete().execute()
+
+        bump_table_version(model)
+
+
+def upsert_rows(model, rows):
+    """
+    Insert rows into model's table, or update the existing row with the same
+    listing_id. Rows identical to the stored row are left alone, so the
+    search index is only touched for what changed. Returns the number of
+    rows inserted or updated.
+    """
+    db = model._meta.database
+    fields = [
+        field
+        for field in model._meta.sorted_fields
+        if field is not model._meta.primary_key and field is not model.listing_id
+    ]
+    changed = reduce(
+        or_,
+        [Expression(field, OP.IS_NOT, EXCLUDED[field.column_name]) for field in fields],
+    )
+
+    count = 0
+    with bulk_load_pragmas(db), db.atomic():
+        for statement_rows in batched(rows, INSERT_STATEMENT_SIZE):
+            count += (
+                model.insert_many(statement_rows)
+                .on_conflict(
+                    conflict_target=[model.listing_id],
+                    preserve=fields,
+                    where=changed,
+                )
+                .as_rowcount()
+                .execute()
+            )
+        if count:
+            bump_table_version(model)
+    return count
@@ -1,26 +1,23 @@
-import pandas as pd
-
 from irish_property_analysis.settings import BUS_STOP_DATA_LOCATION
-from irish_property_analysis.utils import haversine_vectorized, fast_to_dict_records
+from irish_property_analysis.utils import fast_to_dict_records, LazySingleton
+from irish_property_analysis.spatial_index import SpatialIndex
 
 
 class BusStops:
     def __init__(self):
+        import pandas as pd
+
         print("Loading Bus Stop Data")
         self.data = pd.read_csv(BUS_STOP_DATA_LOCATION)
-
-    def get_near(self, lat, lng, radius_km=1):
-        distances = haversine_vectorized(
-            lat, lng, self.data["Latitude"].values, self.data["Longitude"].values
+        self.index = SpatialIndex(
+            self.data["Latitude"].values, self.data["Longitude"].values
         )
 
-        mask = distances <= radius_km
+    def get_near(self, lat, lng, radius_km=1):
+        ids, distances = self.index.query_radius(lat, lng, radius_km)
 
         result = (
-            self.data.loc[mask]
-            .assign(distance_km=distances[mask])
-            .sort_values(by="distance_km")
-            .reset_index(drop=True)
+            self.data.iloc[ids].assign(distance_km=distances).reset_index(drop=True)
         )
 
         return fast_to_dict_records(result)
@@ -31,7 +28,20 @@ class BusStops:
 
         Only gets count now but should factor in a few other things like number of routes
         """
-        return len(self.get_near(lat, lng, radius_km=radius_km))
+        return self.index.count_radius(lat, lng, radius_km)
+
+    def get_scores(self, lats, lngs, radius_km=1):
+        """
+        get_score for many locations at once, as an array of counts
+        """
+        return self.index.count_radius_many(lats, lngs, radius_km)
+
+
+get_bus_stops = LazySingleton(BusStops, sources=[BUS_STOP_DATA_LOCATION])
 
 
-bus_stops = BusStops()
+def __getattr__(name):
+    # Module level bus_stops used to be created on import, keep it available
+    if name == "bus_stops":
+        return get_bus_stops()
+    raise AttributeError(name)
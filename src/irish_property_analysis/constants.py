@@ -3,8 +3,8 @@ PPR_URL = "https://www.propertypriceregister.ie/website/npsra/ppr/npsra-ppr.nsf/
 PPR_REPLACEMENT_HEADERS = [
     "date",
     "address",
-    "eircode",
     "county",
+    "eircode",
     "price",
     "not_full_market_price",
     "vat_exclusive",
@@ -12,6 +12,19 @@ PPR_REPLACEMENT_HEADERS = [
     "description_of_property_size",
 ]
 
+# Headers of the PPR download, less any bracketed unit, and the field of each
+PPR_CSV_HEADERS = {
+    "Date of Sale": "date",
+    "Address": "address",
+    "County": "county",
+    "Eircode": "eircode",
+    "Price": "price",
+    "Not Full Market Price": "not_full_market_price",
+    "VAT Exclusive": "vat_exclusive",
+    "Description of Property": "description_of_property",
+    "Property Size Description": "description_of_property_size",
+}
+
 LISTINGS_BASE_URL = "https://e4expolexk.execute-api.eu-west-1.amazonaws.com/api/data/"
 LISTINGS_DATA_OPTIONS = {
     "all_shares": "shares",
@@ -22,6 +35,9 @@ LISTINGS_DATA_OPTIONS = {
     #"matched_with_ppr": "matchedWithPPR",
 }
 
+# Query parameter asking the listings API for listings published after a date
+LISTINGS_SINCE_PARAM = "publishedAfter"
+
 TRICKY_STR_TABLE = str.maketrans(
     {
         "Â": "",
@@ -0,0 +1,102 @@
+from math import ceil
+
+import numpy as np
+
+from irish_property_analysis.settings import SALE_DATE_WINDOW_DAYS
+
+DAY = np.timedelta64(1, "D").astype("timedelta64[s]").astype(np.int64)
+
+# Shifts groups apart in the combined key. Seconds are offset by half of it
+# so dates either side of 1970 sort within their group.
+GROUP_STRIDE = 1 << 34
+SECONDS_OFFSET = GROUP_STRIDE // 2
+
+
+def window_bounds(window_days=SALE_DATE_WINDOW_DAYS):
+    """
+    Get (before, after) in seconds such that a date is within window_days of
+    base as is_sale_date_within_range has it, its whole days apart being
+    less than window_days, exactly when base - before < date <= base + after
+    """
+    # Largest number of whole days less than the window
+    days = ceil(window_days) - 1
+    return (days + 1) * DAY, days * DAY
+
+
+def _seconds(dates):
+    return np.asarray(dates, dtype="datetime64[s]").astype(np.int64)
+
+
+def within_window(base_dates, dates, window_days=SALE_DATE_WINDOW_DAYS):
+    """
+    Elementwise is_sale_date_within_range of two datetime64 arrays, False
+    where either is NaT
+    """
+    base_dates = np.asarray(base_dates, dtype="datetime64[s]")
+    dates = np.asarray(dates, dtype="datetime64[s]")
+    before, after = window_bounds(window_days)
+    delta = _seconds(dates) - _seconds(base_dates)
+    return (
+        (delta > -before) & (delta <= after) & ~np.isnat(base_dates) & ~np.isnat(dates)
+    )
+
+
+class DateWindowIndex:
+    """
+    Dates sorted, optionally within integer groups, so that every date
+    within a window of each of many query dates is found with two binary
+    searches per query rather than a comparison per pair.
+
+    Dates that are NaT, or whose group is negative, are never found.
+    """
+
+    def __init__(self, dates, groups=None):
+        seconds = _seconds(dates)
+        valid = ~np.isnat(np.asarray(dates, dtype="datetime64[s]"))
+        if groups is not None:
+            groups = np.asarray(groups, dtype=np.int64)
+            valid &= groups >= 0
+        valid = np.flatnonzero(valid)
+
+        keys = self._keys(seconds[valid], None if groups is None else groups[valid])
+        order = np.argsort(keys, kind="stable")
+
+        self.keys = keys[order]
+        self.ids = valid[order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _keys(seconds, groups):
+        keys = seconds + SECONDS_OFFSET
+        if groups is not None:
+            keys += groups * GROUP_STRIDE
+        return keys
+
+    def pairs(self, dates, groups=None, window_days=SALE_DATE_WINDOW_DAYS):
+        """
+        Get (query, id) pairs of each of dates, in the same group if groups
+        are given, and the id of every indexed date within window_days of
+        it, as within_window has it. Queries that are NaT or in a negative
+        group have no pairs.
+        """
+        dates = np.asarray(dates, dtype="datetime64[s]")
+        missing = np.isnat(dates)
+        if groups is not None:
+            groups = np.asarray(groups, dtype=np.int64)
+            missing |= groups < 0
+            groups = np.where(missing, 0, groups)
+
+        keys = self._keys(np.where(missing, 0, _seconds(dates)), groups)
+        before, after = window_bounds(window_days)
+        starts = np.searchsorted(self.keys, keys - before, "right")
+        ends = np.searchsorted(self.keys, keys + after, "right")
+
+        lengths = np.where(missing, 0, ends - starts)
+        total = int(lengths.sum())
+        query_ids = np.repeat(np.arange(len(dates)), lengths)
+        positions = np.repeat(
+            starts - (np.cumsum(lengths) - lengths), lengths
+        ) + np.arange(total)
+        return query_ids, self.ids[positions]
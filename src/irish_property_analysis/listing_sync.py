@@ -0,0 +1,49 @@
+from datetime import datetime
+from typing import Optional
+
+from peewee import Model, CharField, DateTimeField, SqliteDatabase
+
+from irish_property_analysis.settings import LISTING_DB_LOCATION, ensure_data_dirs
+from irish_property_analysis.utils import LazySingleton
+
+
+class SyncStateObject(Model):
+    dataset = CharField(primary_key=True)
+    # Latest published_date seen for the dataset
+    high_water_mark = CharField(null=True)
+    synced_at = DateTimeField()
+
+    class Meta:
+        database = SqliteDatabase(LISTING_DB_LOCATION)
+
+
+class SyncStateDB:
+    """
+    Where each listings dataset was last synced up to
+    """
+
+    def __init__(self) -> None:
+        self.create_connection()
+
+    def create_connection(self) -> None:
+        ensure_data_dirs()
+        db = SqliteDatabase(LISTING_DB_LOCATION)
+        db.connect()
+        db.create_tables([SyncStateObject])
+
+    def get_high_water_mark(self, dataset: str) -> Optional[str]:
+        state = SyncStateObject.get_or_none(SyncStateObject.dataset == dataset)
+        return state.high_water_mark if state else None
+
+    def set_high_water_mark(self, dataset: str, high_water_mark: Optional[str]):
+        SyncStateObject.replace(
+            dataset=dataset,
+            high_water_mark=high_water_mark,
+            synced_at=datetime.now(),
+        ).execute()
+
+    def drop_data(self) -> None:
+        SyncStateObject.delete().execute()
+
+
+get_sync_state_db = LazySingleton(SyncStateDB)
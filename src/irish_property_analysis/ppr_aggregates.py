@@ -0,0 +1,293 @@
+"""
+Price statistics of PPR sales by area, type of property and month, kept in
+a table so that the price trend of an area is a lookup rather than a pass
+over the register. Months are rebuilt only when their sales change.
+"""
+
+from itertools import product
+from typing import List
+
+import numpy as np
+from peewee import (
+    Model,
+    BigIntegerField,
+    CharField,
+    FloatField,
+    IntegerField,
+    SqliteDatabase,
+)
+
+from irish_property_analysis.settings import LISTING_DB_LOCATION, ensure_data_dirs
+from irish_property_analysis.utils import fingerprints, group_stats, LazySingleton
+from irish_property_analysis.bulk_load import bulk_load_pragmas, insert_rows
+
+# Value of a grouped column in aggregates over all of its values
+ALL = "all"
+
+# Area types and the Sales column of each
+AREA_COLUMNS = {
+    "county": "county",
+    "routing_key": "eircode_routing_key",
+}
+
+# Columns aggregates are kept both by and over all values of
+GROUPED_COLUMNS = ("description_of_property", "description_of_property_size")
+
+# Months per DELETE statement, keeps within SQLite's bound parameter limit
+DELETE_STATEMENT_SIZE = 500
+
+# Shared by the aggregate tables so that they are written in one transaction
+database = SqliteDatabase(LISTING_DB_LOCATION)
+
+
+class PriceAggregateObject(Model):
+    area_type = CharField()
+    area = CharField()
+    # ALL when aggregated over every value, None for sales without one
+    description_of_property = CharField(null=True)
+    description_of_property_size = CharField(null=True)
+    # YYYY-MM
+    month = CharField()
+    count = IntegerField()
+    mean = FloatField()
+    median = FloatField()
+    p10 = FloatField()
+    p90 = FloatField()
+
+    class Meta:
+        database = database
+        indexes = ((("area_type", "area", "month"), False),)
+
+    def serialise(self):
+        return {
+            "month": self.month,
+            "area": self.area,
+            "description_of_property": self.description_of_property,
+            "description_of_property_size": self.description_of_property_size,
+            "count": self.count,
+            "mean": self.mean,
+            "median": self.median,
+            "p10": self.p10,
+            "p90": self.p90,
+        }
+
+
+class PriceAggregateMonthObject(Model):
+    """
+    The sales a month of aggregates was built from, to tell when they change
+    """
+
+    month = CharField(primary_key=True)
+    count = IntegerField()
+    # Sum of the Sales.key_hashes of the sales, wrapping at 64 bits
+    fingerprint = BigIntegerField()
+
+    class Meta:
+        database = database
+
+
+def market_rows(sales):
+    """
+    Indices of the sales sold at full market price, those the aggregates are
+    of
+    """
+    not_market = [
+        code
+        for code, value in enumerate(sales.distinct_values("not_full_market_price"))
+        if value == "Yes"
+    ]
+    return np.flatnonzero(~np.isin(sales.column("not_full_market_price"), not_market))
+
+
+def month_fingerprints(sales, rows):
+    """
+    Get the distinct months of the sales in rows as datetime64[M], with the
+    number of sales and sum of their key hashes in each
+    """
+    return fingerprints(
+        sales.column("date")[rows].astype("datetime64[M]"), sales.key_hashes()[rows]
+    )
+
+
+def aggregate_rows(sales, rows):
+    """
+    Yield the aggregate rows of the sales in rows: per area type, for each
+    combination of GROUPED_COLUMNS kept by or over all values, per month
+    """
+    distinct_months, month_codes = np.unique(
+        sales.column("date")[rows].astype("datetime64[M]"), return_inverse=True
+    )
+    months = np.datetime_as_string(distinct_months, unit="M").tolist()
+    prices = sales.column("price")[rows]
+
+    # Codes are shifted up one so that None, -1, is 0
+    grouped_codes = [
+        sales.column(name)[rows].astype(np.int64) + 1 for name in GROUPED_COLUMNS
+    ]
+    grouped_values = [[None] + sales.distinct_values(name) for name in GROUPED_COLUMNS]
+
+    for area_type, column in AREA_COLUMNS.items():
+        area_codes = sales.column(column)[rows].astype(np.int64)
+        area_values = sales.distinct_values(column)
+        has_area = np.flatnonzero(area_codes >= 0)
+
+        for by_value in product([True, False], repeat=len(GROUPED_COLUMNS)):
+            shape = (
+                len(area_values),
+                *[len(values) for values in grouped_values],
+                len(months),
+            )
+            groups = np.ravel_multi_index(
+                (
+                    area_codes[has_area],
+                    *[
+                        codes[has_area] if by else np.zeros(len(has_area), np.int64)
+                        for codes, by in zip(grouped_codes, by_value)
+                    ],
+                    month_codes[has_area],
+                ),
+                shape,
+            )
+            keys, counts, means, percentiles = group_stats(groups, prices[has_area])
+
+            area, *grouped, month = np.unravel_index(keys, shape)
+            columns = [
+                [values[code] if by else ALL for code in codes.tolist()]
+                for values, codes, by in zip(grouped_values, grouped, by_value)
+            ]
+            for area_code, *grouped_row, month_code, count, mean, p in zip(
+                area.tolist(),
+                *columns,
+                month.tolist(),
+                counts.tolist(),
+                means.tolist(),
+                percentiles.tolist(),
+            ):
+                yield {
+                    "area_type": area_type,
+                    "area": area_values[area_code],
+                    **dict(zip(GROUPED_COLUMNS, grouped_row)),
+                    "month": months[month_code],
+                    "count": count,
+                    "mean": mean,
+                    "p10": p[0],
+                    "median": p[1],
+                    "p90": p[2],
+                }
+
+
+class PriceAggregateDB:
+    def __init__(self) -> None:
+        self.create_connection()
+
+    def __len__(self) -> int:
+        return PriceAggregateObject.select().count()
+
+    def create_connection(self) -> None:
+        ensure_data_dirs()
+        database.connect(reuse_if_open=True)
+        database.create_tables([PriceAggregateObject, PriceAggregateMonthObject])
+
+    def drop_data(self) -> None:
+        for object_class in [PriceAggregateObject, PriceAggregateMonthObject]:
+            object_class.delete().execute()
+
+    def update(self, sales, full=False) -> List[str]:
+        """
+        Rebuild the aggregates of the months whose sales differ from those
+        they were built from, including new months, and drop those of months
+        no longer in sales. Returns the months rebuilt. full rebuilds every
+        month.
+        """
+        if full:
+            self.drop_data()
+
+        rows = market_rows(sales)
+        distinct_months, counts, sums = month_fingerprints(sales, rows)
+        months = np.datetime_as_string(distinct_months, unit="M").tolist()
+
+        built = {
+            month.month: (month.count, month.fingerprint)
+            for month in PriceAggregateMonthObject.select()
+        }
+        current = {
+            month: (count, fingerprint)
+            for month, count, fingerprint in zip(months, counts.tolist(), sums.tolist())
+        }
+        changed = [month for month in months if built.get(month) != current[month]]
+        stale = changed + [month for month in built if month not in current]
+
+        changed_rows = rows[
+            np.isin(
+                sales.column("date")[rows].astype("datetime64[M]"),
+                np.array(changed, dtype="datetime64[M]"),
+            )
+        ]
+
+        with bulk_load_pragmas(database), database.atomic():
+            for start in range(0, len(stale), DELETE_STATEMENT_SIZE):
+                batch = stale[start : start + DELETE_STATEMENT_SIZE]
+                PriceAggregateObject.delete().where(
+                    PriceAggregateObject.month.in_(batch)
+                ).execute()
+                PriceAggregateMonthObject.delete().where(
+                    PriceAggregateMonthObject.month.in_(batch)
+                ).execute()
+
+            insert_rows(PriceAggregateObject, aggregate_rows(sales, changed_rows))
+            insert_rows(
+                PriceAggregateMonthObject,
+                (
+                    {
+                        "month": month,
+                        "count": current[month][0],
+                        "fingerprint": current[month][1],
+                    }
+                    for month in changed
+                ),
+            )
+        return changed
+
+    def trends(
+        self,
+        routing_key=None,
+        county=None,
+        description_of_property=ALL,
+        description_of_property_size=ALL,
+        since=None,
+        until=None,
+    ) -> List[PriceAggregateObject]:
+        """
+        Get the aggregates of an eircode routing key or a county by month,
+        oldest first. since and until are inclusive YYYY-MM months. A
+        description of None gets the sales without one.
+        """
+        if routing_key:
+            area_type, area = "routing_key", routing_key[:3].lower()
+        elif county:
+            area_type, area = "county", county.lower()
+        else:
+            raise ValueError("A routing_key or county is required")
+
+        conditions = [
+            PriceAggregateObject.area_type == area_type,
+            PriceAggregateObject.area == area,
+        ]
+        for name, value in zip(
+            GROUPED_COLUMNS, [description_of_property, description_of_property_size]
+        ):
+            field = getattr(PriceAggregateObject, name)
+            conditions.append(field.is_null() if value is None else field == value)
+        if since:
+            conditions.append(PriceAggregateObject.month >= since)
+        if until:
+            conditions.append(PriceAggregateObject.month <= until)
+
+        return list(
+            PriceAggregateObject.select()
+            .where(*conditions)
+            .order_by(PriceAggregateObject.month)
+        )
+
+
+get_price_aggregate_db = LazySingleton(PriceAggregateDB)
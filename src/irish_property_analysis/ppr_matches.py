@@ -0,0 +1,398 @@
+"""
+Links listings in the sale listings table to the PPR sales they could
+have become, kept in a table so that finding the sales of a listing is a
+lookup and later runs only match what is new.
+"""
+
+from datetime import datetime
+from itertools import chain
+from typing import List
+
+import numpy as np
+from peewee import (
+    Model,
+    BigIntegerField,
+    CharField,
+    DateTimeField,
+    FloatField,
+    IntegerField,
+    SqliteDatabase,
+)
+
+from irish_property_analysis.settings import LISTING_DB_LOCATION, ensure_data_dirs
+from irish_property_analysis.utils import (
+    batched,
+    clean_address_for_comparison,
+    stable_hash,
+    to_datetime64,
+    LazySingleton,
+)
+from irish_property_analysis.address_index import TOKEN_RE
+from irish_property_analysis.date_window import DateWindowIndex
+from irish_property_analysis.bulk_load import bulk_load_pragmas, insert_rows
+from irish_property_analysis.sales import SaleObject
+from irish_property_analysis.search_index import add_missing_columns
+from irish_property_analysis.string_pool import StringPool
+
+# Leading address tokens a listing and a sale must share, typically the
+# number and street
+BLOCK_KEY_TOKENS = 3
+
+# Fields of a listing it is matched on, a change to any has it matched again
+LISTING_MATCH_FIELDS = (
+    "county",
+    "original_address",
+    "eircode_routing_key",
+    "published_date",
+)
+
+# Listings per DELETE statement, keeps within SQLite's bound parameter limit
+DELETE_STATEMENT_SIZE = 500
+
+# Shared by the match tables so that they are written in one transaction
+database = SqliteDatabase(LISTING_DB_LOCATION)
+
+
+class PPRMatchObject(Model):
+    listing_id = CharField(index=True)
+    ppr_date = DateTimeField()
+    ppr_address = CharField()
+    ppr_county = CharField(null=True)
+    ppr_eircode = CharField(null=True)
+    ppr_price = FloatField()
+    # Days from the listing being published to the sale
+    days_to_sale = IntegerField()
+
+    class Meta:
+        database = database
+
+
+class MatchedListingObject(Model):
+    """
+    A listing that has been matched against the PPR
+    """
+
+    listing_id = CharField(primary_key=True)
+    matched_at = DateTimeField()
+    # listing_fingerprint of the listing as matched, None for listings
+    # matched before it was kept
+    fingerprint = BigIntegerField(null=True)
+
+    class Meta:
+        database = database
+
+
+class MatchedSaleObject(Model):
+    """
+    A PPR sale that listings have been matched against, by Sales.key_hashes
+    """
+
+    key_hash = BigIntegerField(primary_key=True)
+
+    class Meta:
+        database = database
+
+
+def address_block_key(address):
+    """
+    Leading tokens of an address as compared against, or None if it has
+    none. Punctuation and spacing are ignored, so "12, Oak Avenue" and
+    "12 Oak Avenue, Town" give the same key.
+    """
+    address = clean_address_for_comparison(address)
+    if not address:
+        return None
+    tokens = TOKEN_RE.findall(address)[:BLOCK_KEY_TOKENS]
+    return " ".join(tokens) if tokens else None
+
+
+def listing_fingerprint(listing):
+    """
+    Hash of the LISTING_MATCH_FIELDS of a listing, to tell when it changes
+    """
+    return stable_hash(
+        "\x1f".join(str(listing[field]) for field in LISTING_MATCH_FIELDS)
+    )
+
+
+class PPRBlocks:
+    """
+    PPR sales grouped by county and address block key, and within those by
+    eircode routing key, so that the sales a listing could be are found
+    without comparing it against every sale
+    """
+
+    def __init__(self, sales):
+        self.sales = sales
+
+        # Keys are found once per distinct address
+        self.keys = StringPool()
+        key_codes = np.array(
+            [
+                self.keys.encode(address_block_key(address))
+                for address in sales.distinct_values("search_address")
+            ]
+            + [-1],
+            dtype=np.int64,
+        )[sales.column("search_address")]
+        self.counties = sales.distinct_values("county")
+        self._county_codes = {county: code for code, county in enumerate(self.counties)}
+
+        blocks = sales.column("county").astype(np.int64) * (len(self.keys) + 1)
+        blocks += key_codes
+        # Sales without a key or county are in no block
+        blocks[(key_codes < 0) | (sales.column("county") < 0)] = -1
+
+        self._order = np.argsort(blocks, kind="stable")
+        self._blocks = blocks[self._order]
+        self._dates = DateWindowIndex(sales.column("date"), groups=blocks)
+
+        # Routing keys are shifted up one so that None, -1, is 0
+        self._routing_key_codes = {
+            key: code + 1
+            for code, key in enumerate(sales.distinct_values("eircode_routing_key"))
+        }
+        routed_blocks = self._routed_keys(
+            blocks, sales.column("eircode_routing_key").astype(np.int64) + 1
+        )
+        # Numbered densely, the combined keys being too large for group ids
+        self._routed_blocks, routed_groups = np.unique(
+            routed_blocks, return_inverse=True
+        )
+        routed_groups[routed_blocks < 0] = -1
+        self._routed_dates = DateWindowIndex(sales.column("date"), groups=routed_groups)
+
+    def _routed_keys(self, blocks, routing_key_codes):
+        routed = blocks * (len(self._routing_key_codes) + 1) + routing_key_codes
+        return np.where((blocks < 0) | (routing_key_codes < 0), -1, routed)
+
+    def _routed_groups(self, blocks, routing_key_codes):
+        """
+        Group of the sales in each of blocks with each routing key code, or
+        -1 where there are none
+        """
+        routed = self._routed_keys(blocks, routing_key_codes)
+        groups = np.searchsorted(self._routed_blocks, routed)
+        found = groups < len(self._routed_blocks)
+        found[found] = self._routed_blocks[groups[found]] == routed[found]
+        return np.where(found & (routed >= 0), groups, -1)
+
+    def _block(self, county, address):
+        """
+        Block of a listing in county at address, or -1 if no sale is in it
+        """
+        county_code = self._county_codes.get((county or "").lower())
+        key_code = self.keys.find(address_block_key(address))
+        if county_code is None or key_code is None:
+            return -1
+        return county_code * (len(self.keys) + 1) + key_code
+
+    def candidates(self, county, address):
+        """
+        Indices of the sales in the same county as the listing with the same
+        address block key
+        """
+        block = self._block(county, address)
+        if block < 0:
+            return self._order[:0]
+
+        start, end = np.searchsorted(self._blocks, [block, block + 1])
+        return self._order[start:end]
+
+    def join(self, listings):
+        """
+        Get (listing, sale) index pairs of listings and the sales each could
+        have become: a candidate sold within the sale date window of the
+        listing being published and, where both have one, in the same
+        eircode routing area
+        """
+        blocks = np.array(
+            [
+                self._block(listing["county"], listing["original_address"])
+                for listing in listings
+            ],
+            dtype=np.int64,
+        )
+        dates = to_datetime64([listing["published_date"] for listing in listings])
+
+        # 0 for no routing key, -1 for one no sale has
+        routing_key_codes = np.array(
+            [
+                self._routing_key_codes.get(key.lower(), -1) if key else 0
+                for key in (listing["eircode_routing_key"] for listing in listings)
+            ],
+            dtype=np.int64,
+        )
+        has_routing_key = routing_key_codes != 0
+
+        pairs = [
+            # Without a routing key, any sale of the block
+            self._dates.pairs(dates, groups=np.where(has_routing_key, -1, blocks)),
+        ]
+        # With one, the sales of the block with the same one or with none
+        for codes in [routing_key_codes, np.zeros_like(routing_key_codes)]:
+            groups = self._routed_groups(blocks, codes)
+            pairs.append(
+                self._routed_dates.pairs(
+                    dates, groups=np.where(has_routing_key, groups, -1)
+                )
+            )
+
+        return (
+            np.concatenate([listing_ids for listing_ids, _ in pairs]),
+            np.concatenate([sale_ids for _, sale_ids in pairs]),
+        )
+
+
+def match_rows(listings, sales, listing_ids, sale_ids):
+    published_dates = to_datetime64(
+        [listings[idx]["published_date"] for idx in listing_ids.tolist()]
+    )
+    days_to_sale = (sales.column("date")[sale_ids] - published_dates) // np.timedelta64(
+        1, "D"
+    )
+    for listing_idx, sale_idx, days in zip(
+        listing_ids.tolist(), sale_ids.tolist(), days_to_sale.tolist()
+    ):
+        sale = sales[sale_idx]
+        yield {
+            "listing_id": listings[listing_idx]["listing_id"],
+            "ppr_date": sale.date,
+            "ppr_address": sale.address,
+            "ppr_county": sale.county,
+            "ppr_eircode": sale.eircode,
+            "ppr_price": sale.price,
+            "days_to_sale": days,
+        }
+
+
+class PPRMatchDB:
+    def __init__(self) -> None:
+        self.create_connection()
+
+    def __len__(self) -> int:
+        return PPRMatchObject.select().count()
+
+    def create_connection(self) -> None:
+        ensure_data_dirs()
+        database.connect(reuse_if_open=True)
+        add_missing_columns(MatchedListingObject)
+        database.create_tables(
+            [PPRMatchObject, MatchedListingObject, MatchedSaleObject]
+        )
+
+    def drop_data(self) -> None:
+        for object_class in [PPRMatchObject, MatchedListingObject, MatchedSaleObject]:
+            object_class.delete().execute()
+
+    def match(self, sales, full=False) -> int:
+        """
+        Match sale listings against the PPR sales in sales, returning the
+        number of matches added.
+
+        Listings not matched before, or changed since they were, are matched
+        against every sale, the rest only against the sales not matched
+        against before. full drops the matches and starts over.
+        """
+        if full:
+            self.drop_data()
+
+        key_hashes = sales.key_hashes().view(np.int64)
+        matched_sales = np.fromiter(
+            (
+                key_hash
+                for (key_hash,) in MatchedSaleObject.select(
+                    MatchedSaleObject.key_hash
+                ).tuples()
+            ),
+            dtype=np.int64,
+        )
+        new_sales = np.flatnonzero(~np.isin(key_hashes, matched_sales))
+
+        matched_listings = dict(
+            MatchedListingObject.select(
+                MatchedListingObject.listing_id, MatchedListingObject.fingerprint
+            ).tuples()
+        )
+
+        listings = (
+            SaleObject.select(
+                SaleObject.listing_id,
+                *[getattr(SaleObject, field) for field in LISTING_MATCH_FIELDS],
+            )
+            .where(SaleObject.listing_id.is_null(False))
+            .dicts()
+            .iterator()
+        )
+        old_listings = []
+        new_listings = []
+        # Matched before but changed since, their matches are dropped
+        changed_listing_ids = []
+        for listing in listings:
+            listing["fingerprint"] = listing_fingerprint(listing)
+            if listing["listing_id"] not in matched_listings:
+                new_listings.append(listing)
+            elif matched_listings[listing["listing_id"]] != listing["fingerprint"]:
+                new_listings.append(listing)
+                changed_listing_ids.append(listing["listing_id"])
+            else:
+                old_listings.append(listing)
+
+        all_blocks = PPRBlocks(sales)
+        new_blocks = (
+            PPRBlocks(sales.take(new_sales))
+            if old_listings and len(new_sales)
+            else None
+        )
+        joins = [
+            (blocks, block_listings, *blocks.join(block_listings))
+            for blocks, block_listings in [
+                (all_blocks, new_listings),
+                (new_blocks, old_listings),
+            ]
+            if blocks is not None and block_listings
+        ]
+
+        matched_at = datetime.now()
+        with bulk_load_pragmas(database), database.atomic():
+            for batch in batched(changed_listing_ids, DELETE_STATEMENT_SIZE):
+                PPRMatchObject.delete().where(
+                    PPRMatchObject.listing_id.in_(batch)
+                ).execute()
+                MatchedListingObject.delete().where(
+                    MatchedListingObject.listing_id.in_(batch)
+                ).execute()
+
+            count = insert_rows(
+                PPRMatchObject,
+                chain.from_iterable(
+                    match_rows(block_listings, blocks.sales, listing_ids, sale_ids)
+                    for blocks, block_listings, listing_ids, sale_ids in joins
+                ),
+            )
+            insert_rows(
+                MatchedListingObject,
+                (
+                    {
+                        "listing_id": listing["listing_id"],
+                        "matched_at": matched_at,
+                        "fingerprint": listing["fingerprint"],
+                    }
+                    for listing in new_listings
+                ),
+            )
+            insert_rows(
+                MatchedSaleObject,
+                ({"key_hash": key_hash} for key_hash in key_hashes[new_sales].tolist()),
+            )
+        return count
+
+    def get_matches(self, listing_id: str) -> List[PPRMatchObject]:
+        return list(
+            PPRMatchObject.select()
+            .where(PPRMatchObject.listing_id == listing_id)
+            .order_by(PPRMatchObject.ppr_date)
+        )
+
+
+get_ppr_match_db = LazySingleton(PPRMatchDB)
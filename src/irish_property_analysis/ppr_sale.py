@@ -1,150 +1,624 @@
+import os
+import shutil
+import struct
+from datetime import datetime, timedelta
+
+import numpy as np
+import ujson
+
 from irish_property_analysis.utils import (
     is_nan,
     clean_address_for_comparison,
-    remove_duplicates,
+    clean_addresses_for_comparison,
     write_to_csv,
-    read_csv_to_dict,
     convert_date,
+    is_newer_than,
+    stable_hash,
 )
-from irish_property_analysis.constants import PPR_REPLACEMENT_HEADERS
+from irish_property_analysis.constants import PPR_CSV_HEADERS, PPR_REPLACEMENT_HEADERS
+from irish_property_analysis.string_pool import StringPool
+from irish_property_analysis.address_index import AddressIndex
+
+# Columns backed by typed numpy arrays
+NUMERIC_COLUMNS = {
+    "date": "datetime64[s]",
+    "price": np.float64,
+}
+
+# Columns stored as codes into a StringPool, -1 meaning None. Low cardinality
+# columns get a narrower code type.
+STRING_COLUMNS = {
+    "address": np.int32,
+    "eircode": np.int32,
+    "county": np.int16,
+    "not_full_market_price": np.int16,
+    "vat_exclusive": np.int16,
+    "description_of_property": np.int16,
+    "description_of_property_size": np.int16,
+    "eircode_routing_key": np.int16,
+    # Address as compared against, see clean_address_for_comparison
+    "search_address": np.int32,
+}
+
+COLUMN_DTYPES = {**NUMERIC_COLUMNS, **STRING_COLUMNS}
+
+# Fields identifying a sale, rows sharing them are only added once
+SALE_KEY_FIELDS = ("date", "address", "eircode", "price")
+
+# Fields a sale is written to the csv once for
+SAVE_KEY_FIELDS = ("date", "address", "price", "county")
+
+# Fields of a serialised sale, in csv column order
+SERIALISED_FIELDS = [
+    "date",
+    "address",
+    "eircode",
+    "county",
+    "price",
+    "not_full_market_price",
+    "vat_exclusive",
+    "description_of_property",
+    "description_of_property_size",
+    "eircode_routing_key",
+    "eircode_unique_id",
+]
+
+# FNV-1a parameters for combining the hashes of the fields of a key
+KEY_HASH_OFFSET = 0xCBF29CE484222325
+KEY_HASH_PRIME = 0x100000001B3
+KEY_HASH_MASK = 0xFFFFFFFFFFFFFFFF
+
+# Rows of the csv parsed at a time by Sales.read_csv
+CSV_CHUNK_SIZE = 100000
+
+# Rows decoded at a time by Sales.save
+SAVE_BLOCK_SIZE = 10000
+
+DESCRIPTION_OF_PROPERTY_REPLACEMENTS = [
+    ("Teach/Árasán Cónaithe Atháimhe", "Second-Hand Dwelling house /Apartment"),
+    ("Teach/Árasán Cónaithe Nua", "New Dwelling house /"),
+    ("Teach/?ras?n C?naithe Nua", "New Dwelling house /"),
+]
+
+DESCRIPTION_OF_PROPERTY = {
+    "Second-Hand Dwelling house /Apartment": "second_hand",
+    "New Dwelling house /Apartment": "new",
+    "New Dwelling house /": "new",
+}
+
+DESCRIPTION_OF_PROPERTY_SIZE = {
+    "greater than or equal to 38 sq metres and less than 125 sq metres": ">38sm <125sqm",
+    "greater than 125 sq metres": ">125sqm",
+    "less than 38 sq metres": "<38sqm",
+}
+
+# Bump when the layout of the on disk cache changes so old caches are ignored
+CACHE_VERSION = 4
+CACHE_META_FILENAME = "meta.json"
 
 
 class Sales:
+    """
+    Column store for PPR sales. Rows are kept in typed numpy arrays and
+    dictionary encoded string columns, and are handed out as SaleView
+    objects that read from those columns on access.
+    """
+
     def __init__(self, *args, **kwargs):
-        self._data = kwargs.get("data", [])
-        self._hashes = set()
+        self._pools = kwargs.get("pools") or {
+            name: StringPool() for name in STRING_COLUMNS
+        }
+        self._columns = kwargs.get("columns") or {
+            name: np.empty(0, dtype=dtype) for name, dtype in COLUMN_DTYPES.items()
+        }
+        self._pending = {name: [] for name in COLUMN_DTYPES}
+        self._num_pending = 0
+
+        # Built on first use for Sales created from a subset of another
+        self._hashes = kwargs.get("hashes", set())
+
+        # Index over the distinct addresses in the address pool, built on
+        # first use if not loaded from the cache
+        self._address_index = kwargs.get("address_index")
+
+        for sale in kwargs.get("data", []):
+            self.append(Sale.parse(sale))
 
     def __iter__(self):
-        return (i for i in self._data)
+        self._consolidate()
+        return (SaleView(self, idx) for idx in range(len(self)))
 
     def __len__(self):
-        return len(self._data)
+        return len(self._columns["date"]) + self._num_pending
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return SaleView(self, idx)
 
     def append(self, sale):
         if not sale in self:
-            self._data.append(sale)
+            for name in NUMERIC_COLUMNS:
+                self._pending[name].append(getattr(sale, name))
+            for name in STRING_COLUMNS:
+                self._pending[name].append(
+                    self._pools[name].encode(getattr(sale, name))
+                )
+            self._num_pending += 1
             self._hashes.add(sale.hash)
 
     def __contains__(self, sale):
+        if self._hashes is None:
+            self._hashes = set(self.key_hashes().tolist())
         if sale.hash in self._hashes:
             return True
         return False
 
+    def _consolidate(self):
+        """
+        Move rows added through append into the column arrays
+        """
+        if not self._num_pending:
+            return
+
+        for name, dtype in COLUMN_DTYPES.items():
+            self._columns[name] = np.concatenate(
+                [self._columns[name], np.array(self._pending[name], dtype=dtype)]
+            )
+            self._pending[name] = []
+        self._num_pending = 0
+
+    def column(self, name):
+        self._consolidate()
+        return self._columns[name]
+
+    def distinct_values(self, name):
+        """
+        Distinct values of string column name, indexed by the codes in
+        column(name)
+        """
+        return self._pools[name].values
+
+    def value(self, name, idx):
+        value = self.column(name)[idx]
+        if name in STRING_COLUMNS:
+            return self._pools[name].decode(value)
+        return value.item()
+
     def serialise(self):
         return [d.serialise() for d in self]
 
-    def filter(self, address=None, county=None, partial=True):
-        results = []
-        lower_county = county.lower() if county else None
-        address_for_comparison = clean_address_for_comparison(address)
-        if partial:
-            for sale in self:
-                if all(
-                    [
-                        (
-                            address_for_comparison
-                            in clean_address_for_comparison(sale.address)
-                            if address
-                            else True
-                        ),
-                        lower_county in sale.county if county else True,
-                    ]
-                ):
-                    results.append(sale)
-        else:
-            for sale in self:
-                if all(
-                    [
-                        (
-                            address_for_comparison
-                            == clean_address_for_comparison(sale.address)
-                            if address
-                            else True
-                        ),
-                        lower_county == sale.county if county else True,
-                    ]
-                ):
-                    results.append(sale)
-
-        sales_results = Sales()
-        for result in results:
-            sales_results.append(Sale.parse(result))
-
-        return sales_results
+    def key_hashes(self, fields=SALE_KEY_FIELDS):
+        """
+        64-bit hash of fields of each row, equal to Sale.key_hash of the
+        sale in that row. The hashes are the same between processes, so
+        they can be stored.
+        """
+        self._consolidate()
+        field_hashes = []
+        for name in fields:
+            if name in STRING_COLUMNS:
+                # Hashed once per distinct value, -1 (None) indexing the last
+                lookup = _value_hashes(name, self._pools[name].values + [None])
+                field_hashes.append(lookup[self._columns[name]])
+            else:
+                field_hashes.append(_value_hashes(name, self._columns[name]))
+        return _combine_hashes(field_hashes, len(self))
+
+    def first_occurrences(self, fields=SALE_KEY_FIELDS):
+        """
+        Indices, in order, of the rows that no earlier row shares fields with
+        """
+        return np.sort(np.unique(self.key_hashes(fields), return_index=True)[1])
+
+    def iter_serialised(self, indices=None, block_size=SAVE_BLOCK_SIZE):
+        """
+        Yield the serialised sales of indices, or of every row, as
+        Sale.serialise gives them. Columns are decoded a block of rows at a
+        time rather than a field at a time.
+        """
+        self._consolidate()
+        if indices is None:
+            indices = np.arange(len(self))
+
+        # Values by code, with None last for code -1
+        lookups = {
+            name: np.array(pool.values + [None], dtype=object)
+            for name, pool in self._pools.items()
+        }
+        lookups["eircode_unique_id"] = np.array(
+            [_eircode_unique_id(eircode) for eircode in lookups["eircode"]],
+            dtype=object,
+        )
+
+        for start in range(0, len(indices), block_size):
+            block = indices[start : start + block_size]
+            columns = []
+            for name in SERIALISED_FIELDS:
+                if name in NUMERIC_COLUMNS:
+                    columns.append(self._columns[name][block].tolist())
+                else:
+                    source = "eircode" if name == "eircode_unique_id" else name
+                    columns.append(lookups[name][self._columns[source][block]])
+            for row in zip(*columns):
+                yield dict(zip(SERIALISED_FIELDS, row))
+
+    def _search_address(self, code):
+        return self._pools["search_address"].decode(code)
+
+    def address_index(self):
+        """
+        Index over the distinct search addresses, documents being codes of
+        the search_address pool
+        """
+        if self._address_index is None:
+            pool = self._pools["search_address"]
+            self._address_index = AddressIndex.build(
+                [self._search_address(code) for code in range(len(pool))]
+            )
+        return self._address_index
+
+    def take(self, indices):
+        """
+        Get a new Sales of the given rows. String pools are shared rather
+        than copied.
+        """
+        self._consolidate()
+        return Sales(
+            pools=self._pools,
+            columns={name: column[indices] for name, column in self._columns.items()},
+            hashes=None,
+            address_index=self._address_index,
+        )
+
+    def filter(self, address=None, county=None, partial=True, address_substrs=None):
+        """
+        Get a view of the sales matching every one of the given conditions.
+
+        Each of address_substrs must be contained in the address. They are
+        looked up together in the address index, along with address if
+        partial.
+        """
+        mask = np.ones(len(self), dtype=bool)
+
+        substrs = [
+            clean_address_for_comparison(address_substr)
+            for address_substr in address_substrs or []
+        ]
+
+        if address:
+            address_for_comparison = clean_address_for_comparison(address)
+
+            if address_for_comparison is None:
+                mask[:] = False
+            elif partial:
+                substrs.append(address_for_comparison)
+            else:
+                code = self._pools["search_address"].find(address_for_comparison)
+                if code is None:
+                    mask[:] = False
+                else:
+                    mask &= self.column("search_address") == code
+
+        # Substrings that clean to nothing are in every address
+        substrs = [substr for substr in substrs if substr]
+        if substrs:
+            matching_codes = self.address_index().search(
+                substrs,
+                self._search_address,
+                num_documents=len(self._pools["search_address"]),
+            )
+            mask &= self._pools["search_address"].mask(
+                self.column("search_address"), matching_codes
+            )
+
+        if county:
+            lower_county = county.lower()
+            if partial:
+                predicate = lambda value: lower_county in value
+            else:
+                predicate = lambda value: lower_county == value
+            mask &= self._pools["county"].match(self.column("county"), predicate)
+
+        return self.take(np.flatnonzero(mask))
 
     def save(self, filepath):
-        data = self.serialise()
-        data_no_duplicates = remove_duplicates(
-            data, subset_fields=["date", "address", "price", "county"]
+        """
+        Write the sales to a csv, streaming the rows to it and leaving out any
+        sharing SAVE_KEY_FIELDS with an earlier row
+        """
+        write_to_csv(
+            filepath, self.iter_serialised(self.first_occurrences(SAVE_KEY_FIELDS))
         )
-        write_to_csv(filepath, data_no_duplicates)
+
+    def save_cache(self, cache_location):
+        """
+        Write the normalised columns to cache_location as memory mappable
+        .npy files. The directory is written alongside and swapped in once
+        complete so a reader never sees a partial cache.
+        """
+        self._consolidate()
+
+        tmp_location = cache_location.rstrip(os.sep) + ".tmp"
+        shutil.rmtree(tmp_location, ignore_errors=True)
+        os.makedirs(tmp_location)
+
+        for name in NUMERIC_COLUMNS:
+            np.save(os.path.join(tmp_location, f"{name}.npy"), self._columns[name])
+
+        for name in STRING_COLUMNS:
+            data, offsets = self._pools[name].to_buffers()
+            np.save(
+                os.path.join(tmp_location, f"{name}.codes.npy"), self._columns[name]
+            )
+            np.save(os.path.join(tmp_location, f"{name}.data.npy"), data)
+            np.save(os.path.join(tmp_location, f"{name}.offsets.npy"), offsets)
+
+        self.address_index().save(tmp_location)
+
+        with open(os.path.join(tmp_location, CACHE_META_FILENAME), "w") as fh:
+            fh.write(ujson.dumps({"version": CACHE_VERSION, "rows": len(self)}))
+
+        shutil.rmtree(cache_location, ignore_errors=True)
+        os.rename(tmp_location, cache_location)
 
     @staticmethod
-    def load(filepath):
+    def is_cache_fresh(cache_location, filepath):
+        meta_location = os.path.join(cache_location, CACHE_META_FILENAME)
+        if not is_newer_than(meta_location, filepath):
+            return False
+
+        with open(meta_location, "r") as fh:
+            return ujson.loads(fh.read()).get("version") == CACHE_VERSION
+
+    @staticmethod
+    def load_cache(cache_location):
+        def _load(filename):
+            return np.load(os.path.join(cache_location, filename), mmap_mode="r")
+
+        columns = {name: _load(f"{name}.npy") for name in NUMERIC_COLUMNS}
+        pools = {}
+        for name in STRING_COLUMNS:
+            columns[name] = _load(f"{name}.codes.npy")
+            pools[name] = StringPool.from_buffers(
+                _load(f"{name}.data.npy"), _load(f"{name}.offsets.npy")
+            )
+
+        return Sales(
+            pools=pools,
+            columns=columns,
+            hashes=None,
+            address_index=AddressIndex.load(cache_location),
+        )
+
+    @staticmethod
+    def load(filepath, cache_location=None):
+        """
+        Load sales from the PPR csv, or from the binary cache at
+        cache_location if one exists that is newer than the csv.
+        """
         print("Getting PPR Data")
-        sales = Sales()
 
-        for sales_dict in read_csv_to_dict(filepath, headers=PPR_REPLACEMENT_HEADERS):
-            sales.append(Sale.parse(sales_dict))
+        if cache_location and Sales.is_cache_fresh(cache_location, filepath):
+            sales = Sales.load_cache(cache_location)
+            print("Got PPR Data from cache")
+            return sales
+
+        sales = Sales.read_csv(filepath)
 
         print("Got PPR Data")
         return sales
 
+    @staticmethod
+    def read_csv(filepath, chunk_size=CSV_CHUNK_SIZE):
+        """
+        Read sales from the PPR csv a chunk at a time. Columns are dictionary
+        encoded as they are read, so each distinct value is normalised once,
+        as Sale normalises it, and rows only go through array operations.
+        Duplicate sales are dropped as append would.
+
+        Columns are found by header, either those of the PPR download or the
+        field names save writes.
+        """
+        import pandas as pd
+
+        headers = pd.read_csv(
+            filepath, encoding="ISO-8859-1", nrows=0, dtype=str
+        ).columns
+        names = [_csv_field_name(header) for header in headers]
+        missing = set(PPR_REPLACEMENT_HEADERS) - set(names)
+        if missing:
+            raise ValueError(
+                f"{filepath} has no column for {', '.join(sorted(missing))}"
+            )
+
+        parts = {name: [] for name in PPR_REPLACEMENT_HEADERS}
+        for chunk in pd.read_csv(
+            filepath,
+            encoding="ISO-8859-1",
+            header=0,
+            names=names,
+            usecols=PPR_REPLACEMENT_HEADERS,
+            dtype=str,
+            keep_default_na=False,
+            chunksize=chunk_size,
+        ):
+            for name, column_parts in parts.items():
+                column_parts.append(pd.factorize(chunk[name].to_numpy()))
+
+        pools = {}
+        columns = {}
+        for name, normalise in CSV_COLUMN_NORMALISERS.items():
+            codes, uniques = _merge_factorized(pd, parts.pop(name))
+            values = [normalise(value) for value in uniques]
+            if name in NUMERIC_COLUMNS:
+                columns[name] = np.array(values, dtype=NUMERIC_COLUMNS[name])[codes]
+            else:
+                columns[name], pools[name] = _encode_distinct(pd, codes, values)
+
+        for name, (source, derive) in CSV_DERIVED_COLUMNS.items():
+            columns[name], pools[name] = _encode_distinct(
+                pd, columns[source], derive(pools[source].values)
+            )
+
+        sales = Sales(
+            pools=pools,
+            columns={
+                name: columns[name].astype(dtype, copy=False)
+                for name, dtype in COLUMN_DTYPES.items()
+            },
+            hashes=None,
+        )
+        return sales.take(sales.first_occurrences())
+
+
+def _value_hashes(name, values):
+    """
+    int64 hash of each of values of column name. Numbers hash to their bits
+    so that the hashes can be taken straight from the column arrays.
+    """
+    if name in NUMERIC_COLUMNS:
+        return np.asarray(values, dtype=NUMERIC_COLUMNS[name]).view(np.int64)
+    return np.fromiter(
+        (stable_hash(value) for value in values), dtype=np.int64, count=len(values)
+    )
+
+
+# Hashes of a single value of the numeric columns, as _value_hashes gives
+# them: the seconds of a datetime64[s] and the bits of a float64
+SCALAR_HASHES = {
+    "date": lambda date: (date - EPOCH) // timedelta(seconds=1),
+    "price": lambda price: FLOAT_BITS.unpack(FLOAT.pack(price))[0],
+}
+EPOCH = datetime(1970, 1, 1)
+FLOAT = struct.Struct("<d")
+FLOAT_BITS = struct.Struct("<q")
+
+
+def _combine_hashes(field_hashes, count):
+    """
+    Combine int64 hashes of each field into a uint64 hash per row
+    """
+    combined = np.full(count, KEY_HASH_OFFSET, dtype=np.uint64)
+    for hashes in field_hashes:
+        # Wraps around on overflow, as intended
+        combined ^= hashes.view(np.uint64)
+        combined *= np.uint64(KEY_HASH_PRIME)
+    return combined
+
+
+def _csv_field_name(header):
+    """
+    Field of a PPR csv header, the header itself if it is already a field
+    """
+    return PPR_CSV_HEADERS.get(header.split(" (")[0].strip(), header)
+
+
+def _merge_factorized(pd, parts):
+    """
+    Codes and distinct values of a column from the pd.factorize result of
+    each of its chunks
+    """
+    if not parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=object)
+
+    codes, uniques = pd.factorize(np.concatenate([part[1] for part in parts]))
+    merged = []
+    offset = 0
+    for part_codes, part_uniques in parts:
+        merged.append(codes[offset : offset + len(part_uniques)][part_codes])
+        offset += len(part_uniques)
+    return np.concatenate(merged), uniques
+
+
+def _encode_distinct(pd, codes, values):
+    """
+    Codes into a new StringPool for rows whose value is values[code], code
+    -1 and None values being None
+    """
+    pool_codes, pool_values = pd.factorize(np.array(values + [None], dtype=object))
+    return pool_codes[codes], StringPool(pool_values.tolist())
+
+
+def _normalise_price(price):
+    return float(price.replace("\x80", "").replace(",", ""))
+
+
+def _normalise_eircode(eircode):
+    # FIXME: Below is drek. Normalize to clean strings / do better
+    if not eircode or str(eircode) == "nan":  # gross, necessary?
+        return None
+    return eircode.replace("Baile Átha Cliath", "Dublin").replace(
+        "Baile ?tha Cliath", "Dublin"
+    )
+
+
+def _normalise_description_of_property(description_of_property):
+    for old, new in DESCRIPTION_OF_PROPERTY_REPLACEMENTS:
+        description_of_property = description_of_property.replace(old, new)
+    return DESCRIPTION_OF_PROPERTY.get(description_of_property)
+
+
+def _eircode_routing_key(eircode):
+    if not is_nan(eircode):
+        return eircode[:3].lower()
+    return None
+
+
+def _eircode_unique_id(eircode):
+    if not is_nan(eircode):
+        return eircode[3:].lower()
+    return None
+
+
+# How Sale normalises each column of the csv
+CSV_COLUMN_NORMALISERS = {
+    "date": convert_date,
+    "address": str,
+    "county": str.lower,
+    "price": _normalise_price,
+    "not_full_market_price": str,
+    "vat_exclusive": str,
+    "description_of_property": _normalise_description_of_property,
+    "description_of_property_size": DESCRIPTION_OF_PROPERTY_SIZE.get,
+    "eircode": _normalise_eircode,
+}
+
+# Columns Sale derives from another column, by what derives them from the
+# distinct values of that column
+CSV_DERIVED_COLUMNS = {
+    "search_address": ("address", clean_addresses_for_comparison),
+    "eircode_routing_key": (
+        "eircode",
+        lambda eircodes: [_eircode_routing_key(eircode) for eircode in eircodes],
+    ),
+}
+
 
 class Sale:
     def __init__(self, *args, **kwargs):
         self.date = convert_date(kwargs["date"])
         self.address = kwargs["address"]
+        self.search_address = clean_address_for_comparison(self.address)
 
         self.county = kwargs["county"].lower()
-        self.price = float(kwargs["price"].replace("\x80", "").replace(",", ""))
+        self.price = _normalise_price(kwargs["price"])
 
         self.not_full_market_price = kwargs["not_full_market_price"]
         self.vat_exclusive = kwargs["vat_exclusive"]
 
-        self.description_of_property_size = kwargs["description_of_property_size"]
-
-        self.description_of_property_size = {
-            "greater than or equal to 38 sq metres and less than 125 sq metres": ">38sm <125sqm",
-            "greater than 125 sq metres": ">125sqm",
-            "less than 38 sq metres": "<38sqm",
-        }.get(self.description_of_property_size)
-
-        # FIXME: Below is drek. Normalize to clean strings / do better
+        self.description_of_property_size = DESCRIPTION_OF_PROPERTY_SIZE.get(
+            kwargs["description_of_property_size"]
+        )
 
-        self.eircode = None
-        if kwargs.get("eircode"):
-            self.eircode = (
-                kwargs["eircode"]
-                .replace("Baile Átha Cliath", "Dublin")
-                .replace("Baile ?tha Cliath", "Dublin")
-                if not str(kwargs["eircode"]) == "nan"  # gross, necessary?
-                else None
-            )
+        self.eircode = _normalise_eircode(kwargs.get("eircode"))
 
-        self.description_of_property = (
+        self.description_of_property = _normalise_description_of_property(
             kwargs["description_of_property"]
-            .replace(
-                "Teach/Árasán Cónaithe Atháimhe",
-                "Second-Hand Dwelling house /Apartment",
-            )
-            .replace("Teach/Árasán Cónaithe Nua", "New Dwelling house /")
-            .replace("Teach/?ras?n C?naithe Nua", "New Dwelling house /")
         )
 
-        if self.description_of_property not in [
-            "Second-Hand Dwelling house /Apartment",
-            "New Dwelling house /Apartment",
-            "New Dwelling house /",
-        ]:
-            self.description_of_property = None
-
-        self.description_of_property = {
-            "Second-Hand Dwelling house /Apartment": "second_hand",
-            "New Dwelling house /Apartment": "new",
-            "New Dwelling house /": "new",
-        }.get(self.description_of_property)
-
     @staticmethod
     def parse(data):
         if isinstance(data, Sale):
@@ -170,16 +644,52 @@ class Sale:
 
     @property
     def eircode_routing_key(self):
-        if not is_nan(self.eircode):
-            return self.eircode[:3].lower()
-        return None
+        return _eircode_routing_key(self.eircode)
 
     @property
     def eircode_unique_id(self):
-        if not is_nan(self.eircode):
-            return self.eircode[3:].lower()
-        return None
+        return _eircode_unique_id(self.eircode)
+
+    def key_hash(self, fields=SALE_KEY_FIELDS):
+        """
+        64-bit hash of fields, as Sales.key_hashes gives it for a row
+        """
+        combined = KEY_HASH_OFFSET
+        for name in fields:
+            value = getattr(self, name)
+            value_hash = SCALAR_HASHES.get(name, stable_hash)(value)
+            combined = (
+                (combined ^ (value_hash & KEY_HASH_MASK)) * KEY_HASH_PRIME
+            ) & KEY_HASH_MASK
+        return combined
 
     @property
     def hash(self):
-        return hash((self.date, self.address, self.eircode, self.price))
+        return self.key_hash()
+
+
+def _column_property(name):
+    return property(lambda self: self._sales.value(name, self._idx))
+
+
+class SaleView(Sale):
+    """
+    A Sale that reads its fields from a row of a Sales column store rather
+    than holding its own copies.
+    """
+
+    def __init__(self, sales, idx):
+        self._sales = sales
+        self._idx = idx
+
+    date = _column_property("date")
+    address = _column_property("address")
+    eircode = _column_property("eircode")
+    county = _column_property("county")
+    price = _column_property("price")
+    not_full_market_price = _column_property("not_full_market_price")
+    vat_exclusive = _column_property("vat_exclusive")
+    description_of_property = _column_property("description_of_property")
+    description_of_property_size = _column_property("description_of_property_size")
+    eircode_routing_key = _column_property("eircode_routing_key")
+    search_address = _column_property("search_address")
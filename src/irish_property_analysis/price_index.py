@@ -0,0 +1,450 @@
+"""
+Repeat sales price indexes by county and eircode routing key: how much the
+same properties changed in price from one month to the next, chained into a
+monthly index. Kept in a table so that an update only recomputes the months
+new or changed sales could move.
+"""
+
+from typing import List
+
+import numpy as np
+from peewee import (
+    Model,
+    BigIntegerField,
+    CharField,
+    CompositeKey,
+    FloatField,
+    IntegerField,
+    SqliteDatabase,
+)
+
+from irish_property_analysis.settings import LISTING_DB_LOCATION, ensure_data_dirs
+from irish_property_analysis.utils import fingerprints, stable_hash, LazySingleton
+from irish_property_analysis.bulk_load import bulk_load_pragmas, insert_rows
+from irish_property_analysis.ppr_aggregates import AREA_COLUMNS, market_rows
+from irish_property_analysis.sales import SaleObject
+from irish_property_analysis.string_pool import StringPool
+
+# Most months between two sales of a property for them to pair. Longer holds
+# say little about any one month and a change to a month's sales only moves
+# the index this far either side of it.
+MAX_HOLD_MONTHS = 60
+
+# Pairs whose prices differ by more than this many times are taken not to be
+# the same property, such as different units at one address
+MAX_PRICE_RATIO = 3
+
+# Level of an index in the month before its first repeat sale
+INDEX_BASE = 100.0
+
+# Where the prices come from: PPR sales or the asking prices of sale listings
+SOURCES = ("ppr", "listings")
+
+# Months per DELETE statement, keeps within SQLite's bound parameter limit
+DELETE_STATEMENT_SIZE = 500
+
+# Shared by the index tables so that they are written in one transaction
+database = SqliteDatabase(LISTING_DB_LOCATION)
+
+
+class PriceIndexObject(Model):
+    source = CharField()
+    area_type = CharField()
+    area = CharField()
+    # YYYY-MM
+    month = CharField()
+    # Repeat sale pairs that span the month
+    pairs = IntegerField()
+    # Log change in price from the month before
+    change = FloatField()
+    index = FloatField()
+
+    class Meta:
+        database = database
+        indexes = ((("source", "area_type", "area", "month"), True),)
+
+    def serialise(self):
+        return {
+            "month": self.month,
+            "area": self.area,
+            "pairs": self.pairs,
+            "change": self.change,
+            "index": self.index,
+        }
+
+
+class PriceIndexMonthObject(Model):
+    """
+    The prices a month of a source was indexed from, to tell when they change
+    """
+
+    source = CharField()
+    month = CharField()
+    count = IntegerField()
+    # Sum of the hashes of the prices, wrapping at 64 bits
+    fingerprint = BigIntegerField()
+
+    class Meta:
+        database = database
+        primary_key = CompositeKey("source", "month")
+
+
+class Prices:
+    """
+    Prices to pair up into repeat sales. Each row has a code per area type
+    into the values of that type, -1 for none, an address code, the month as
+    datetime64[M], the price and a hash that changes when the row does.
+    """
+
+    def __init__(self, areas, addresses, months, prices, hashes):
+        self.areas = areas
+        self.addresses = np.asarray(addresses, dtype=np.int64)
+        self.months = np.asarray(months, dtype="datetime64[M]").astype(np.int64)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.hashes = np.asarray(hashes, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.months)
+
+
+def ppr_prices(sales):
+    """
+    Prices of the PPR sales at full market price, paired by normalised
+    address
+    """
+    rows = market_rows(sales)
+    rows = rows[sales.column("price")[rows] > 0]
+    return Prices(
+        areas={
+            area_type: (
+                sales.column(column)[rows].astype(np.int64),
+                sales.distinct_values(column),
+            )
+            for area_type, column in AREA_COLUMNS.items()
+        },
+        addresses=sales.column("search_address")[rows],
+        months=sales.column("date")[rows].astype("datetime64[M]"),
+        prices=sales.column("price")[rows],
+        hashes=sales.key_hashes()[rows],
+    )
+
+
+def listing_prices():
+    """
+    Asking prices of the sale listings, paired by clean address
+    """
+    pools = {area_type: StringPool() for area_type in AREA_COLUMNS}
+    address_pool = StringPool()
+    areas = {area_type: [] for area_type in AREA_COLUMNS}
+    addresses = []
+    dates = []
+    prices = []
+    hashes = []
+    for listing_id, county, routing_key, address, price, published_date in (
+        SaleObject.select(
+            SaleObject.listing_id,
+            SaleObject.county,
+            SaleObject.eircode_routing_key,
+            SaleObject.clean_address,
+            SaleObject.price,
+            SaleObject.published_date,
+        )
+        .where(SaleObject.price > 0, SaleObject.published_date.is_null(False))
+        .tuples()
+        .iterator()
+    ):
+        for area_type, area in [
+            ("county", county),
+            ("routing_key", routing_key[:3] if routing_key else None),
+        ]:
+            areas[area_type].append(
+                pools[area_type].encode(area.lower() if area else None)
+            )
+        addresses.append(address_pool.encode(address))
+        dates.append(published_date)
+        prices.append(price)
+        hashes.append(stable_hash(f"{listing_id}|{address}|{price}|{published_date}"))
+
+    return Prices(
+        areas={
+            area_type: (np.array(codes, dtype=np.int64), pools[area_type].values)
+            for area_type, codes in areas.items()
+        },
+        addresses=addresses,
+        months=np.array(dates, dtype="datetime64[s]").astype("datetime64[M]"),
+        prices=prices,
+        hashes=np.array(hashes, dtype=np.int64).view(np.uint64),
+    )
+
+
+def repeat_sale_pairs(areas, addresses, months, prices):
+    """
+    Get the area, first month, second month and log change in price of each
+    pair of consecutive sales of an address in an area, at most
+    MAX_HOLD_MONTHS and MAX_PRICE_RATIO apart. Sales of an address in the
+    same month do not pair.
+    """
+    order = np.lexsort((months, addresses, areas))
+    areas, addresses, months = areas[order], addresses[order], months[order]
+    log_prices = np.log(prices[order])
+
+    spans = months[1:] - months[:-1]
+    changes = log_prices[1:] - log_prices[:-1]
+    paired = np.flatnonzero(
+        (areas[1:] == areas[:-1])
+        & (addresses[1:] == addresses[:-1])
+        & (spans > 0)
+        & (spans <= MAX_HOLD_MONTHS)
+        & (np.abs(changes) <= np.log(MAX_PRICE_RATIO))
+    )
+    return areas[paired], months[paired], months[paired + 1], changes[paired]
+
+
+def monthly_changes(areas, first_months, second_months, changes, num_areas, start, end):
+    """
+    Estimate the log change in price of each area in each month from start to
+    end, inclusive month numbers. A pair's change is spread evenly over the
+    months after its first sale up to its second, and the estimate for a
+    month is the mean of those of the pairs spanning it, weighted so that
+    each pair counts once in all. Months no pair spans do not change.
+
+    Returns (pairs, changes) arrays of (num_areas, months), pairs being the
+    number of pairs spanning each month.
+    """
+    num_months = end - start + 1
+    spans = second_months - first_months
+    weights = 1 / spans
+
+    # Each pair adds to the months from its first bound up to its second,
+    # by a difference at each bound summed along the months
+    bounds = [
+        np.clip(months + 1 - start, 0, num_months)
+        for months in [first_months, second_months]
+    ]
+    size = num_areas * (num_months + 1)
+    sums = []
+    for values in [np.ones(len(spans)), weights, weights * changes / spans]:
+        differences = np.bincount(
+            areas * (num_months + 1) + bounds[0], values, minlength=size
+        ) - np.bincount(areas * (num_months + 1) + bounds[1], values, minlength=size)
+        sums.append(
+            np.cumsum(differences.reshape(num_areas, num_months + 1), axis=1)[
+                :, :num_months
+            ]
+        )
+    pairs, total_weights, weighted_changes = sums
+
+    estimates = np.zeros((num_areas, num_months))
+    np.divide(
+        weighted_changes, total_weights, out=estimates, where=total_weights > 1e-12
+    )
+    return np.rint(pairs).astype(np.int64), estimates
+
+
+def month_names(start, end):
+    return np.datetime_as_string(
+        np.arange(start, end + 1).astype("datetime64[M]"), unit="M"
+    ).tolist()
+
+
+class PriceIndexDB:
+    def __init__(self) -> None:
+        self.create_connection()
+
+    def __len__(self) -> int:
+        return PriceIndexObject.select().count()
+
+    def create_connection(self) -> None:
+        ensure_data_dirs()
+        database.connect(reuse_if_open=True)
+        database.create_tables([PriceIndexObject, PriceIndexMonthObject])
+
+    def drop_data(self, source=None) -> None:
+        for object_class in [PriceIndexObject, PriceIndexMonthObject]:
+            query = object_class.delete()
+            if source:
+                query = query.where(object_class.source == source)
+            query.execute()
+
+    def update(self, source, prices, full=False) -> List[str]:
+        """
+        Update the indexes of source from prices, returning the months
+        recomputed. Only months within MAX_HOLD_MONTHS after the first month
+        whose prices changed since the last update are, as no pair of other
+        months can span them. full recomputes every month.
+        """
+        if full:
+            self.drop_data(source)
+
+        distinct_months, counts, sums = fingerprints(prices.months, prices.hashes)
+        current = {
+            month: (count, fingerprint)
+            for month, count, fingerprint in zip(
+                distinct_months.tolist(), counts.tolist(), sums.tolist()
+            )
+        }
+        built = {
+            np.datetime64(month.month, "M")
+            .astype(np.int64)
+            .item(): (
+                month.count,
+                month.fingerprint,
+            )
+            for month in PriceIndexMonthObject.select().where(
+                PriceIndexMonthObject.source == source
+            )
+        }
+        changed = [month for month in current if built.get(month) != current[month]]
+        stale = changed + [month for month in built if month not in current]
+        if not stale:
+            return []
+
+        start = min(stale) - MAX_HOLD_MONTHS + 1
+        end = max(current, default=start - 1)
+        # Every pair spanning a month from start on has both sales after this
+        recent = prices.months >= start - MAX_HOLD_MONTHS
+
+        rows = []
+        for area_type, (codes, values) in prices.areas.items():
+            rows.extend(
+                self._index_rows(
+                    source, area_type, values, prices, codes, recent, start, end
+                )
+            )
+
+        # Only the fingerprints of stale months, those of unchanged months in
+        # between still match their prices
+        stale_months = np.datetime_as_string(
+            np.array(stale).astype("datetime64[M]"), unit="M"
+        ).tolist()
+        with bulk_load_pragmas(database), database.atomic():
+            PriceIndexObject.delete().where(
+                PriceIndexObject.source == source,
+                PriceIndexObject.month >= month_names(start, start)[0],
+            ).execute()
+            for batch_start in range(0, len(stale_months), DELETE_STATEMENT_SIZE):
+                batch = stale_months[batch_start : batch_start + DELETE_STATEMENT_SIZE]
+                PriceIndexMonthObject.delete().where(
+                    PriceIndexMonthObject.source == source,
+                    PriceIndexMonthObject.month.in_(batch),
+                ).execute()
+
+            insert_rows(PriceIndexObject, rows)
+            insert_rows(
+                PriceIndexMonthObject,
+                (
+                    {
+                        "source": source,
+                        "month": month_names(month, month)[0],
+                        "count": current[month][0],
+                        "fingerprint": current[month][1],
+                    }
+                    for month in changed
+                ),
+            )
+        return month_names(start, end)
+
+    def _index_rows(self, source, area_type, values, prices, codes, recent, start, end):
+        """
+        Yield the rows of each area's index from start to end, carrying on
+        from its level in the month before start or starting at INDEX_BASE
+        the month before its first pair
+        """
+        rows = recent & (codes >= 0)
+        pairs, changes = monthly_changes(
+            *repeat_sale_pairs(
+                codes[rows],
+                prices.addresses[rows],
+                prices.months[rows],
+                prices.prices[rows],
+            ),
+            len(values),
+            start,
+            end,
+        )
+        log_levels = np.cumsum(changes, axis=1)
+
+        previous = {
+            area: index
+            for area, index in PriceIndexObject.select(
+                PriceIndexObject.area, PriceIndexObject.index
+            )
+            .where(
+                PriceIndexObject.source == source,
+                PriceIndexObject.area_type == area_type,
+                PriceIndexObject.month == month_names(start - 1, start - 1)[0],
+            )
+            .tuples()
+        }
+
+        # Padded with the month before start, which carries on the level
+        # from previous
+        months = month_names(start - 1, end)
+        pad = np.zeros((len(values), 1))
+        pairs = np.hstack([pad.astype(np.int64), pairs])
+        changes = np.hstack([pad, changes])
+        log_levels = np.hstack([pad, log_levels])
+
+        for code, area in enumerate(values):
+            if area in previous:
+                first = 1
+                levels = previous[area] * np.exp(log_levels[code, first:])
+            else:
+                spanned = np.flatnonzero(pairs[code])
+                if not len(spanned):
+                    continue
+                first = spanned[0] - 1
+                levels = INDEX_BASE * np.exp(
+                    log_levels[code, first:] - log_levels[code, first]
+                )
+                # Nothing to change from in the first month
+                changes[code, first] = 0.0
+
+            for month, month_pairs, change, level in zip(
+                months[first:],
+                pairs[code, first:].tolist(),
+                changes[code, first:].tolist(),
+                levels.tolist(),
+            ):
+                yield {
+                    "source": source,
+                    "area_type": area_type,
+                    "area": area,
+                    "month": month,
+                    "pairs": month_pairs,
+                    "change": change,
+                    "index": level,
+                }
+
+    def series(
+        self, source="ppr", routing_key=None, county=None, since=None, until=None
+    ) -> List[PriceIndexObject]:
+        """
+        Get the index of an eircode routing key or a county by month, oldest
+        first. since and until are inclusive YYYY-MM months.
+        """
+        if routing_key:
+            area_type, area = "routing_key", routing_key[:3].lower()
+        elif county:
+            area_type, area = "county", county.lower()
+        else:
+            raise ValueError("A routing_key or county is required")
+
+        conditions = [
+            PriceIndexObject.source == source,
+            PriceIndexObject.area_type == area_type,
+            PriceIndexObject.area == area,
+        ]
+        if since:
+            conditions.append(PriceIndexObject.month >= since)
+        if until:
+            conditions.append(PriceIndexObject.month <= until)
+
+        return list(
+            PriceIndexObject.select()
+            .where(*conditions)
+            .order_by(PriceIndexObject.month)
+        )
+
+
+get_price_index_db = LazySingleton(PriceIndexDB)
@@ -0,0 +1,226 @@
+"""
+Gross rental yields by area, from the rents of rental listings and the
+asking prices of sale listings: median rent * 12 / median price per eircode
+routing key, number of beds and property type. Kept in a table along with
+the versions of the listing tables it was computed from and recomputed once
+either is loaded again.
+"""
+
+import threading
+from typing import Optional
+
+from peewee import (
+    Model,
+    CharField,
+    FloatField,
+    IntegerField,
+    SqliteDatabase,
+)
+
+from irish_property_analysis.settings import LISTING_DB_LOCATION, ensure_data_dirs
+from irish_property_analysis.utils import group_stats, LazySingleton
+from irish_property_analysis.bulk_load import (
+    bulk_load_pragmas,
+    insert_rows,
+    table_versions,
+)
+from irish_property_analysis.rentals import RentalObject
+from irish_property_analysis.sales import SaleObject
+
+# Fewest rents and fewest prices a yield is worked out from
+MIN_LISTINGS = 5
+
+# Shared by the yield tables so that they are written in one transaction
+database = SqliteDatabase(LISTING_DB_LOCATION)
+
+
+class RentalYieldObject(Model):
+    routing_key = CharField()
+    # None for the yield over every number of beds and property type
+    beds = FloatField(null=True)
+    property_type = CharField(null=True)
+    rents = IntegerField()
+    median_rent = FloatField()
+    sales = IntegerField()
+    median_price = FloatField()
+    gross_yield = FloatField()
+
+    class Meta:
+        database = database
+        indexes = ((("routing_key", "beds", "property_type"), True),)
+
+    def serialise(self):
+        return {
+            "routing_key": self.routing_key,
+            "beds": self.beds,
+            "property_type": self.property_type,
+            "rents": self.rents,
+            "median_rent": self.median_rent,
+            "sales": self.sales,
+            "median_price": self.median_price,
+            "gross_yield": self.gross_yield,
+        }
+
+
+class RentalYieldSourceObject(Model):
+    """
+    Version of each listing table the yields were computed from
+    """
+
+    table = CharField(primary_key=True)
+    version = IntegerField()
+
+    class Meta:
+        database = database
+
+
+def area_medians(model):
+    """
+    Get the count and median price of model's listings by (routing key,
+    beds, property type), and by (routing key, None, None) over every
+    listing of the routing key, in one pass over the table
+    """
+    groups = {}
+    codes = []
+    prices = []
+    for routing_key, beds, property_type, price in (
+        model.select(
+            model.eircode_routing_key, model.beds, model.property_type, model.price
+        )
+        .where(model.price > 0, model.eircode_routing_key.is_null(False))
+        .tuples()
+        .iterator()
+    ):
+        routing_key = routing_key[:3].lower()
+        area = groups.setdefault((routing_key, None, None), len(groups))
+        prices.append(price)
+        codes.append(area)
+        if beds is not None and property_type:
+            prices.append(price)
+            codes.append(
+                groups.setdefault((routing_key, beds, property_type), len(groups))
+            )
+
+    keys, counts, _, medians = group_stats(codes, prices, percentiles=[50])
+    group_keys = list(groups)
+    return {
+        group_keys[code]: (count, median)
+        for code, count, median in zip(
+            keys.tolist(), counts.tolist(), medians[:, 0].tolist()
+        )
+    }
+
+
+def yield_rows():
+    """
+    Yield the rows of each group with at least MIN_LISTINGS of both rents
+    and prices
+    """
+    rents = area_medians(RentalObject)
+    prices = area_medians(SaleObject)
+    for key, (rent_count, median_rent) in rents.items():
+        if key not in prices:
+            continue
+        sale_count, median_price = prices[key]
+        if min(rent_count, sale_count) < MIN_LISTINGS:
+            continue
+        routing_key, beds, property_type = key
+        yield {
+            "routing_key": routing_key,
+            "beds": beds,
+            "property_type": property_type,
+            "rents": rent_count,
+            "median_rent": median_rent,
+            "sales": sale_count,
+            "median_price": median_price,
+            "gross_yield": median_rent * 12 / median_price,
+        }
+
+
+class RentalYieldDB:
+    def __init__(self) -> None:
+        self.create_connection()
+        # (versions of the listing tables, yields computed from them),
+        # replaced as a whole so readers never see one without the other
+        self._cache = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.yields())
+
+    def create_connection(self) -> None:
+        ensure_data_dirs()
+        database.connect(reuse_if_open=True)
+        database.create_tables([RentalYieldObject, RentalYieldSourceObject])
+
+    def drop_data(self) -> None:
+        for object_class in [RentalYieldObject, RentalYieldSourceObject]:
+            object_class.delete().execute()
+        self._cache = None
+
+    def yields(self):
+        """
+        Get the yields by (routing key, beds, property type), recomputing
+        them if either listing table was loaded since they were computed
+        """
+        versions = dict(
+            zip(["rentals", "sales"], table_versions(RentalObject, SaleObject))
+        )
+        cache = self._cache
+        if cache is not None and cache[0] == versions:
+            return cache[1]
+
+        with self._lock:
+            # Another caller may have loaded them while this one waited
+            cache = self._cache
+            if cache is not None and cache[0] == versions:
+                return cache[1]
+            return self._load(versions)
+
+    def _load(self, versions):
+        stored = {
+            source.table: source.version for source in RentalYieldSourceObject.select()
+        }
+        if stored != versions:
+            # Read before writing, the listing tables being on another
+            # connection
+            rows = list(yield_rows())
+            with bulk_load_pragmas(database), database.atomic():
+                RentalYieldObject.delete().execute()
+                RentalYieldSourceObject.delete().execute()
+                insert_rows(RentalYieldObject, rows)
+                insert_rows(
+                    RentalYieldSourceObject,
+                    [
+                        {"table": table, "version": version}
+                        for table, version in versions.items()
+                    ],
+                )
+
+        yields = {
+            (row.routing_key, row.beds, row.property_type): row
+            for row in RentalYieldObject.select()
+        }
+        self._cache = (versions, yields)
+        return yields
+
+    def get(
+        self, routing_key, beds=None, property_type=None, yields=None
+    ) -> Optional[RentalYieldObject]:
+        """
+        Get the yield of a routing key for the number of beds and property
+        type, or over the whole routing key where there are too few of those.
+        yields is those already got from yields(), so that looking up many
+        listings checks the table versions once.
+        """
+        if not routing_key:
+            return None
+        routing_key = routing_key[:3].lower()
+        if yields is None:
+            yields = self.yields()
+        return yields.get((routing_key, beds, property_type)) or yields.get(
+            (routing_key, None, None)
+        )
+
+
+get_rental_yield_db = LazySingleton(RentalYieldDB)
@@ -11,7 +11,21 @@ from peewee import (
     SQL,
 )
 
-from irish_property_analysis.settings import LISTING_DB_LOCATION
+from irish_property_analysis.settings import LISTING_DB_LOCATION, ensure_data_dirs
+from irish_property_analysis.utils import to_searchable_address, LazySingleton
+from irish_property_analysis.bulk_load import (
+    bump_table_version,
+    delete_all,
+    refresh_table,
+    upsert_rows,
+)
+from irish_property_analysis.search_index import (
+    add_listing_indexes,
+    add_missing_columns,
+    create_search_index,
+    where_contains,
+    where_equals,
+)
 
 
 class SaleObject(Model):
@@ -31,13 +45,24 @@ class SaleObject(Model):
     property_type = CharField(null=True)
     published_date = DateTimeField(null=True, default=None)
     searchable_address = CharField()
+    # _id of the listing in the API, or a hash of it where it has none
+    listing_id = CharField(null=True)
 
     class Meta:
         database = SqliteDatabase(LISTING_DB_LOCATION)
 
     def save(self, *args, **kwargs):
         self.searchable_address = self.compute_searchable_address()
-        return super(SaleObject, self).save(*args, **kwargs)
+        with self._meta.database.atomic():
+            saved = super(SaleObject, self).save(*args, **kwargs)
+            bump_table_version(SaleObject)
+        return saved
+
+    def delete_instance(self, *args, **kwargs):
+        with self._meta.database.atomic():
+            deleted = super(SaleObject, self).delete_instance(*args, **kwargs)
+            bump_table_version(SaleObject)
+        return deleted
 
     def __str__(self) -> str:
         return self.__repr__()
@@ -46,7 +71,7 @@ class SaleObject(Model):
         return f'ShareListingObject(original_address="{self.original_address}", clean_address="{self.clean_address}", county="{self.county}", lat="{self.lat}", lng="{self.lng}", price="{self.price}", clean_agent="{self.clean_agent}", ber="{self.ber}", eircode_routing_key="{self.eircode_routing_key}", m_squared="{self.m_squared}", constructed_date="{self.constructed_date}", beds="{self.beds}", baths="{self.baths}", property_type="{self.property_type}", published_date="{self.published_date}")'
 
     def compute_searchable_address(self) -> str:
-        return self.original_address.replace(" ", "").replace(",", "").lower()
+        return to_searchable_address(self.original_address)
 
     def serialise(self):
         return {
@@ -68,6 +93,9 @@ class SaleObject(Model):
         }
 
 
+add_listing_indexes(SaleObject)
+
+
 class SaleDB:
     def __init__(self) -> None:
         self.create_connection()
@@ -79,12 +107,21 @@ class SaleDB:
         return SaleObject.select().iterator(chunk_size=100)
 
     def drop_data(self) -> None:
-        SaleObject.delete().execute()
+        delete_all(SaleObject)
+
+    def refresh(self, rows) -> int:
+        return refresh_table(SaleObject, rows)
+
+    def upsert(self, rows) -> int:
+        return upsert_rows(SaleObject, rows)
 
     def create_connection(self) -> None:
+        ensure_data_dirs()
         db = SqliteDatabase(LISTING_DB_LOCATION)
         db.connect()
+        add_missing_columns(SaleObject)
         db.create_tables([SaleObject])
+        create_search_index(SaleObject)
 
     def filter(
         self,
@@ -120,25 +157,34 @@ class SaleDB:
                 if partial:
                     query = query.where(field_name.ilike(f"%{value}%"))
                 else:
-                    query = query.where(field_name.ilike(value))
+                    query = where_equals(query, field_name, value)
 
         if address:
-            address = address.replace(" ", "").replace(",", "").lower()
+            address = to_searchable_address(address)
             if partial:
-                query = query.where(SaleObject.searchable_address.contains(address))
+                query = where_contains(query, SaleObject, [address])
             else:
                 query = query.where(SaleObject.searchable_address == address)
 
         if address_substrs:
-            for address_substr in address_substrs:
-                if partial:
-                    query = query.where(
-                        SaleObject.searchable_address.contains(address_substr)
-                    )
-                else:
+            address_substrs = [
+                to_searchable_address(address_substr)
+                for address_substr in address_substrs
+            ]
+            if partial:
+                query = where_contains(query, SaleObject, address_substrs)
+            else:
+                for address_substr in address_substrs:
                     query = query.where(SaleObject.searchable_address == address_substr)
 
         return [obj for obj in query]
 
 
-sale_db = SaleDB()
+get_sale_db = LazySingleton(SaleDB)
+
+
+def __getattr__(name):
+    # Module level sale_db used to be created on import, keep it available
+    if name == "sale_db":
+        return get_sale_db()
+    raise AttributeError(name)
@@ -1,54 +1,113 @@
-import pandas as pd
+import os
+import re
+
+import numpy as np
 
 from irish_property_analysis.settings import (
     PRIMARY_SCHOOLS_DATA_LOCATION,
     SECONDARY_SCHOOLS_DATA_LOCATION,
+    SCHOOLS_CACHE_LOCATION,
+)
+from irish_property_analysis.utils import (
+    fast_to_dict_records,
+    is_newer_than,
+    LazySingleton,
 )
-from irish_property_analysis.utils import haversine_vectorized, fast_to_dict_records
+from irish_property_analysis.spatial_index import SpatialIndex
 
+ENROLMENT_COLUMN_RE = re.compile(r"enrol|pupils", re.IGNORECASE)
 
-class Schools:
-    def __init__(self):
-        print("Loading School Data")
-        self.primary = pd.read_csv(PRIMARY_SCHOOLS_DATA_LOCATION)
-        self.secondary = pd.read_csv(SECONDARY_SCHOOLS_DATA_LOCATION)
 
-    def get_near(self, lat, lng, radius_km=1):
-        final_data = []
-
-        for idx, data in enumerate([self.primary, self.secondary]):
-            if idx == 1:
-                # Headers are a row down
-                data.columns = data.iloc[0]
-                data = data.drop(index=0)
-                data = data.reset_index(drop=True)
-
-                data["School Latitude"] = pd.to_numeric(
-                    data["School Latitude"], errors="coerce"
-                )
-                data["School Longitude"] = pd.to_numeric(
-                    data["School Longitude"], errors="coerce"
-                )
-
-            distances = haversine_vectorized(
-                lat,
-                lng,
-                data["School Latitude"].values,
-                data["School Longitude"].values,
-            )
+def _enrolment(data):
+    """
+    Get the enrolment of each school. The sheets name this column
+    differently between releases so prefer a total enrolment / pupils
+    column and fall back to any column that looks like one.
+    """
+    import pandas as pd
+
+    columns = [
+        column
+        for column in data.columns
+        if isinstance(column, str) and ENROLMENT_COLUMN_RE.search(column)
+    ]
+    totals = [column for column in columns if "total" in column.lower()]
+    if not columns:
+        return pd.Series(np.nan, index=data.index, dtype=np.float32)
+    return pd.to_numeric(data[(totals or columns)[0]], errors="coerce").astype(
+        np.float32
+    )
+
 
-            mask = distances <= radius_km
+def normalise_schools(primary, secondary):
+    """
+    Combine the primary and secondary school sheets into one frame with
+    float32 coordinates, a School Level and an Enrolment column
+    """
+    import pandas as pd
 
-            result = (
-                data.loc[mask]
-                .assign(distance_km=distances[mask])
-                .sort_values(by="distance_km")
-                .reset_index(drop=True)
+    # Headers are a row down
+    secondary = (
+        secondary.set_axis(secondary.iloc[0], axis=1)
+        .drop(index=0)
+        .reset_index(drop=True)
+    )
+
+    frames = []
+    for level, data in [("primary", primary), ("secondary", secondary)]:
+        data = data.assign(**{"School Level": level, "Enrolment": _enrolment(data)})
+        for column in ["School Latitude", "School Longitude"]:
+            data[column] = pd.to_numeric(data[column], errors="coerce").astype(
+                np.float32
             )
+        frames.append(data)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def read_schools():
+    import pandas as pd
 
-            final_data.extend(fast_to_dict_records(result))
+    return normalise_schools(
+        pd.read_csv(PRIMARY_SCHOOLS_DATA_LOCATION),
+        pd.read_csv(SECONDARY_SCHOOLS_DATA_LOCATION),
+    )
 
-        return final_data
+
+def write_schools_cache(data):
+    tmp_location = SCHOOLS_CACHE_LOCATION + ".tmp"
+    data.to_pickle(tmp_location)
+    os.replace(tmp_location, SCHOOLS_CACHE_LOCATION)
+
+
+class Schools:
+    def __init__(self, data=None):
+        import pandas as pd
+
+        print("Loading School Data")
+        if data is not None:
+            self.data = data
+        elif is_newer_than(
+            SCHOOLS_CACHE_LOCATION,
+            PRIMARY_SCHOOLS_DATA_LOCATION,
+            SECONDARY_SCHOOLS_DATA_LOCATION,
+        ):
+            self.data = pd.read_pickle(SCHOOLS_CACHE_LOCATION)
+        else:
+            self.data = read_schools()
+
+        self.index = SpatialIndex(
+            self.data["School Latitude"].values, self.data["School Longitude"].values
+        )
+
+    def get_near(self, lat, lng, radius_km=1):
+        ids, distances = self.index.query_radius(lat, lng, radius_km)
+
+        result = (
+            self.data.iloc[ids].assign(distance_km=distances).reset_index(drop=True)
+        )
+
+        return fast_to_dict_records(result)
 
     def get_score(self, lat, lng, radius_km=1):
         """
@@ -56,7 +115,27 @@ class Schools:
 
         Only gets count now but should factor in a few other things like number of routes
         """
-        return len(self.get_near(lat, lng, radius_km=radius_km))
+        return self.index.count_radius(lat, lng, radius_km)
+
+    def get_scores(self, lats, lngs, radius_km=1):
+        """
+        get_score for many locations at once, as an array of counts
+        """
+        return self.index.count_radius_many(lats, lngs, radius_km)
+
+
+get_schools = LazySingleton(
+    Schools,
+    sources=[
+        PRIMARY_SCHOOLS_DATA_LOCATION,
+        SECONDARY_SCHOOLS_DATA_LOCATION,
+        SCHOOLS_CACHE_LOCATION,
+    ],
+)
 
 
-schools = Schools()
+def __getattr__(name):
+    # Module level schools used to be created on import, keep it available
+    if name == "schools":
+        return get_schools()
+    raise AttributeError(name)
@@ -0,0 +1,180 @@
+import sqlite3
+from functools import lru_cache
+
+from peewee import SQL, FloatField, IntegerField, DateTimeField
+from playhouse.migrate import SqliteMigrator, migrate
+
+# FTS5 only supports the trigram tokenizer from 3.34
+MIN_TRIGRAM_SQLITE_VERSION = (3, 34, 0)
+
+# The trigram tokenizer can only use the index for terms of at least 3 chars
+MIN_MATCH_LENGTH = 3
+
+# Text columns filtered on case insensitively, indexed with NOCASE collation
+NOCASE_INDEXED_FIELDS = ["county", "eircode_routing_key", "property_type"]
+
+INDEXED_FIELDS = ["published_date", "price"]
+
+
+@lru_cache(maxsize=1)
+def trigram_fts_available() -> bool:
+    if sqlite3.sqlite_version_info < MIN_TRIGRAM_SQLITE_VERSION:
+        return False
+
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(a, tokenize='trigram')")
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+    return True
+
+
+def add_listing_indexes(model) -> None:
+    """
+    Declare the B-tree indexes of a listing table. They are created by
+    create_tables, which also adds any that are missing to an existing
+    database.
+    """
+    table = model._meta.table_name
+    for name in NOCASE_INDEXED_FIELDS:
+        model.add_index(
+            model.index(
+                getattr(model, name).collate("NOCASE"), name=f"{table}_{name}_nocase"
+            )
+        )
+    for name in INDEXED_FIELDS:
+        model.add_index(getattr(model, name))
+    model.add_index(model.lat, model.lng)
+    model.add_index(model.listing_id, unique=True)
+
+
+def add_missing_columns(model) -> None:
+    """
+    Add columns declared on model but missing from its table, for databases
+    created before they were added. Does nothing if there is no table yet.
+    """
+    db = model._meta.database
+    table = model._meta.table_name
+    if table not in db.get_tables():
+        return
+
+    existing = {column.name for column in db.get_columns(table)}
+    missing = [
+        field
+        for field in model._meta.sorted_fields
+        if field.column_name not in existing
+    ]
+    if missing:
+        migrator = SqliteMigrator(db)
+        migrate(
+            *[migrator.add_column(table, field.column_name, field) for field in missing]
+        )
+
+
+def where_equals(query, field, value):
+    """
+    Restrict query to rows where field equals value, ignoring case for text
+    fields. Written so that the indexes from add_listing_indexes apply.
+    """
+    if isinstance(field, (FloatField, IntegerField, DateTimeField)):
+        return query.where(field == value)
+    return query.where(field.collate("NOCASE") == value)
+
+
+def fts_table_name(model) -> str:
+    return f"{model._meta.table_name}_fts"
+
+
+def delete_trigger_sql(model) -> str:
+    table = model._meta.table_name
+    fts_table = fts_table_name(model)
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts_table}({fts_table}, rowid, searchable_address) "
+        f"VALUES ('delete', old.id, old.searchable_address); END"
+    )
+
+
+def create_search_index(model) -> None:
+    """
+    Create an FTS5 trigram table mirroring the searchable_address column of
+    model, along with triggers that keep it in sync on insert, update and
+    delete. An index created for a table that already has rows is populated
+    from it.
+    """
+    if not trigram_fts_available():
+        return
+
+    db = model._meta.database
+    table = model._meta.table_name
+    fts_table = fts_table_name(model)
+
+    exists = fts_table in db.get_tables()
+
+    with db.atomic():
+        db.execute_sql(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+            f"searchable_address, content='{table}', content_rowid='id', "
+            "tokenize='trigram')"
+        )
+        db.execute_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts_table}(rowid, searchable_address) "
+            "VALUES (new.id, new.searchable_address); END"
+        )
+        db.execute_sql(delete_trigger_sql(model))
+        db.execute_sql(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_fts_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts_table}({fts_table}, rowid, searchable_address) "
+            "VALUES ('delete', old.id, old.searchable_address); "
+            f"INSERT INTO {fts_table}(rowid, searchable_address) "
+            "VALUES (new.id, new.searchable_address); END"
+        )
+
+        if not exists:
+            rebuild_search_index(model)
+
+
+def rebuild_search_index(model) -> None:
+    if not trigram_fts_available():
+        return
+
+    fts_table = fts_table_name(model)
+    model._meta.database.execute_sql(
+        f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"
+    )
+
+
+def _match_phrase(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+
+def where_contains(query, model, substrs):
+    """
+    Restrict query to rows whose searchable_address contains every one of
+    substrs. Substrings long enough for the trigram index are answered from
+    it; anything shorter falls back to LIKE.
+    """
+    substrs = [substr for substr in substrs if substr]
+
+    indexed = []
+    for substr in substrs:
+        if trigram_fts_available() and len(substr) >= MIN_MATCH_LENGTH:
+            indexed.append(substr)
+        else:
+            query = query.where(model.searchable_address.contains(substr))
+
+    if indexed:
+        fts_table = fts_table_name(model)
+        query = query.where(
+            model.id.in_(
+                SQL(
+                    f"(SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)",
+                    (" AND ".join(_match_phrase(substr) for substr in indexed),),
+                )
+            )
+        )
+
+    return query
@@ -1,7 +1,6 @@
 import os
 import sys
 
-
 TEST_ENV = False
 if "pytest" in sys.modules:
     TEST_ENV = True
@@ -14,19 +13,31 @@ LISTINGS_DATA_LOCATION = (
 )
 
 PPR_LOCATION = os.path.join(LISTINGS_DATA_LOCATION, "ppr.csv")
+PPR_CACHE_LOCATION = os.path.join(LISTINGS_DATA_LOCATION, "ppr_cache")
 
 LISTING_DB_LOCATION = os.path.join(LISTINGS_DATA_LOCATION, "db.sqlite3")
 
 SCHOOLS_DIR_LOCATION = os.path.join(LISTINGS_DATA_LOCATION, "schools")
 PRIMARY_SCHOOLS_DATA_LOCATION = os.path.join(SCHOOLS_DIR_LOCATION, "primary.csv")
 SECONDARY_SCHOOLS_DATA_LOCATION = os.path.join(SCHOOLS_DIR_LOCATION, "secondary.csv")
+SCHOOLS_CACHE_LOCATION = os.path.join(SCHOOLS_DIR_LOCATION, "schools.pkl")
 
 BUS_STOP_DIR_LOCATION = os.path.join(LISTINGS_DATA_LOCATION, "bus_stops")
 BUS_STOP_DATA_LOCATION = os.path.join(BUS_STOP_DIR_LOCATION, "bus_stops.csv")
 
-os.makedirs(LISTINGS_DATA_LOCATION, exist_ok=True)
-os.makedirs(SCHOOLS_DIR_LOCATION, exist_ok=True)
-os.makedirs(BUS_STOP_DIR_LOCATION, exist_ok=True)
+
+def ensure_data_dirs():
+    for location in [
+        LISTINGS_DATA_LOCATION,
+        SCHOOLS_DIR_LOCATION,
+        BUS_STOP_DIR_LOCATION,
+    ]:
+        os.makedirs(location, exist_ok=True)
+
+
+# Days either side of a listing being published that a sale of the same
+# property can be, see is_sale_date_within_range
+SALE_DATE_WINDOW_DAYS = 365 / 2
 
 # Attributes that if they are different on a listing merge attempt we should see at the properties not being mergable
 BAD_MERGE_ATTRS = [
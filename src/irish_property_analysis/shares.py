@@ -11,7 +11,21 @@ from peewee import (
     SQL,
 )
 
-from irish_property_analysis.settings import LISTING_DB_LOCATION
+from irish_property_analysis.settings import LISTING_DB_LOCATION, ensure_data_dirs
+from irish_property_analysis.utils import to_searchable_address, LazySingleton
+from irish_property_analysis.bulk_load import (
+    bump_table_version,
+    delete_all,
+    refresh_table,
+    upsert_rows,
+)
+from irish_property_analysis.search_index import (
+    add_listing_indexes,
+    add_missing_columns,
+    create_search_index,
+    where_contains,
+    where_equals,
+)
 
 
 class ShareObject(Model):
@@ -31,13 +45,24 @@ class ShareObject(Model):
     property_type = CharField(null=True)
     published_date = DateTimeField(null=True, default=None)
     searchable_address = CharField()
+    # _id of the listing in the API, or a hash of it where it has none
+    listing_id = CharField(null=True)
 
     class Meta:
         database = SqliteDatabase(LISTING_DB_LOCATION)
 
     def save(self, *args, **kwargs):
         self.searchable_address = self.compute_searchable_address()
-        return super(SaleObject, self).save(*args, **kwargs)
+        with self._meta.database.atomic():
+            saved = super(ShareObject, self).save(*args, **kwargs)
+            bump_table_version(ShareObject)
+        return saved
+
+    def delete_instance(self, *args, **kwargs):
+        with self._meta.database.atomic():
+            deleted = super(ShareObject, self).delete_instance(*args, **kwargs)
+            bump_table_version(ShareObject)
+        return deleted
 
     def __str__(self) -> str:
         return self.__repr__()
@@ -45,6 +70,9 @@ class ShareObject(Model):
     def __repr__(self) -> str:
         return f'ShareObject(original_address="{self.original_address}", clean_address="{self.clean_address}", county="{self.county}", lat="{self.lat}", lng="{self.lng}", price="{self.price}", clean_agent="{self.clean_agent}", ber="{self.ber}", eircode_routing_key="{self.eircode_routing_key}", m_squared="{self.m_squared}", constructed_date="{self.constructed_date}", beds="{self.beds}", baths="{self.baths}", property_type="{self.property_type}", published_date="{self.published_date}")'
 
+    def compute_searchable_address(self) -> str:
+        return to_searchable_address(self.original_address)
+
     def serialise(self):
         return {
             "original_address": self.original_address,
@@ -65,6 +93,9 @@ class ShareObject(Model):
         }
 
 
+add_listing_indexes(ShareObject)
+
+
 class ShareDB:
     def __init__(self) -> None:
         self.create_connection()
@@ -76,12 +107,21 @@ class ShareDB:
         return ShareObject.select().iterator(chunk_size=100)
 
     def drop_data(self) -> None:
-        ShareObject.delete().execute()
+        delete_all(ShareObject)
+
+    def refresh(self, rows) -> int:
+        return refresh_table(ShareObject, rows)
+
+    def upsert(self, rows) -> int:
+        return upsert_rows(ShareObject, rows)
 
     def create_connection(self) -> None:
+        ensure_data_dirs()
         db = SqliteDatabase(LISTING_DB_LOCATION)
         db.connect()
+        add_missing_columns(ShareObject)
         db.create_tables([ShareObject])
+        create_search_index(ShareObject)
 
     def filter(
         self,
@@ -117,22 +157,24 @@ class ShareDB:
                 if partial:
                     query = query.where(field_name.ilike(f"%{value}%"))
                 else:
-                    query = query.where(field_name.ilike(value))
+                    query = where_equals(query, field_name, value)
 
         if address:
-            address = address.replace(" ", "").replace(",", "").lower()
+            address = to_searchable_address(address)
             if partial:
-                query = query.where(ShareObject.searchable_address.contains(address))
+                query = where_contains(query, ShareObject, [address])
             else:
                 query = query.where(ShareObject.searchable_address == address)
 
         if address_substrs:
-            for address_substr in address_substrs:
-                if partial:
-                    query = query.where(
-                        ShareObject.searchable_address.contains(address_substr)
-                    )
-                else:
+            address_substrs = [
+                to_searchable_address(address_substr)
+                for address_substr in address_substrs
+            ]
+            if partial:
+                query = where_contains(query, ShareObject, address_substrs)
+            else:
+                for address_substr in address_substrs:
                     query = query.where(
                         ShareObject.searchable_address == address_substr
                     )
@@ -140,4 +182,11 @@ class ShareDB:
         return [obj for obj in query]
 
 
-share_db = ShareDB()
+get_share_db = LazySingleton(ShareDB)
+
+
+def __getattr__(name):
+    # Module level share_db used to be created on import, keep it available
+    if name == "share_db":
+        return get_share_db()
+    raise AttributeError(name)
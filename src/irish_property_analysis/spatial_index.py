@@ -0,0 +1,164 @@
+from math import degrees, floor
+
+import numpy as np
+
+from irish_property_analysis.constants import EARTH_RADIUS
+from irish_property_analysis.utils import haversine_vectorized
+
+# Shifts cell rows apart in the combined cell key, wider than any column
+CELL_ROW_STRIDE = 1 << 32
+
+# Number of query points handled at once by the batch queries
+QUERY_CHUNK_SIZE = 50000
+
+
+class SpatialIndex:
+    """
+    Grid index over lat / lng points for radius queries.
+
+    Points are bucketed into cells of cell_km of latitude by the equivalent
+    angle of longitude and sorted by cell, so that each row of cells a query
+    covers is one contiguous slice. Only the points in those slices have
+    their distance computed.
+    """
+
+    def __init__(self, lats, lngs, cell_km=1.0):
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+
+        self.cell_deg = degrees(cell_km / EARTH_RADIUS)
+
+        # Points without coordinates can never be near anything
+        valid = np.flatnonzero(~(np.isnan(lats) | np.isnan(lngs)))
+
+        keys = self._keys(lats[valid], lngs[valid])
+        order = np.argsort(keys, kind="stable")
+
+        self.keys = keys[order]
+        self.ids = valid[order]
+        self.lats = lats[self.ids]
+        self.lngs = lngs[self.ids]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _cell(self, value):
+        return np.floor(np.asarray(value) / self.cell_deg).astype(np.int64)
+
+    def _keys(self, lats, lngs):
+        return self._cell(lats) * CELL_ROW_STRIDE + self._cell(lngs)
+
+    def _bounds(self, lats, radius_km):
+        """
+        Get the lat and lng half widths, in degrees, of boxes around points
+        at lats that contain every point within radius_km of them
+        """
+        angle = radius_km / EARTH_RADIUS
+        dlat = degrees(angle)
+
+        ratio = np.sin(min(angle, np.pi / 2)) / np.maximum(
+            np.cos(np.radians(lats)), 1e-12
+        )
+        dlng = np.where(ratio >= 1, 180.0, np.degrees(np.arcsin(np.minimum(ratio, 1))))
+        return dlat, dlng
+
+    def _candidates(self, lat, lng, radius_km):
+        dlat, dlng = self._bounds(lat, radius_km)
+
+        lng_lo = floor((lng - dlng) / self.cell_deg)
+        lng_hi = floor((lng + dlng) / self.cell_deg)
+
+        slices = []
+        for row in range(
+            floor((lat - dlat) / self.cell_deg), floor((lat + dlat) / self.cell_deg) + 1
+        ):
+            start = np.searchsorted(self.keys, row * CELL_ROW_STRIDE + lng_lo, "left")
+            end = np.searchsorted(self.keys, row * CELL_ROW_STRIDE + lng_hi, "right")
+            if end > start:
+                slices.append(np.arange(start, end))
+
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(slices)
+
+    def query_radius(self, lat, lng, radius_km):
+        """
+        Get the ids of the points within radius_km of lat, lng along with
+        their distances, nearest first
+        """
+        candidates = self._candidates(lat, lng, radius_km)
+        distances = haversine_vectorized(
+            lat, lng, self.lats[candidates], self.lngs[candidates]
+        )
+
+        mask = distances <= radius_km
+        order = np.argsort(distances[mask], kind="stable")
+        return self.ids[candidates[mask][order]], distances[mask][order]
+
+    def _candidate_pairs(self, lats, lngs, radius_km):
+        """
+        Get (query, position) pairs of every point in the cells covered by
+        each query point, for many query points at once
+        """
+        missing = np.isnan(lats) | np.isnan(lngs)
+        lats = np.where(missing, 0.0, lats)
+        lngs = np.where(missing, 0.0, lngs)
+
+        dlat, dlng = self._bounds(lats, radius_km)
+        row_lo = self._cell(lats - dlat)
+        row_hi = np.where(missing, row_lo - 1, self._cell(lats + dlat))
+        lng_lo = self._cell(lngs - dlng)
+        lng_hi = self._cell(lngs + dlng)
+
+        query_ids = []
+        positions = []
+        for offset in range(int(np.max(row_hi - row_lo, initial=-1)) + 1):
+            rows = row_lo + offset
+            active = np.flatnonzero(rows <= row_hi)
+            row_keys = rows[active] * CELL_ROW_STRIDE
+            starts = np.searchsorted(self.keys, row_keys + lng_lo[active], "left")
+            ends = np.searchsorted(self.keys, row_keys + lng_hi[active], "right")
+
+            lengths = np.maximum(ends - starts, 0)
+            total = int(lengths.sum())
+            query_ids.append(np.repeat(active, lengths))
+            positions.append(
+                np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+                + np.arange(total)
+            )
+
+        if not query_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(query_ids), np.concatenate(positions)
+
+    def count_radius_many(self, lats, lngs, radius_km):
+        """
+        Get, for each of the points lats, lngs, the number of indexed points
+        within radius_km of it. Points without coordinates get 0.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lngs = np.asarray(lngs, dtype=np.float64)
+
+        counts = np.zeros(len(lats), dtype=np.int64)
+        for chunk_start in range(0, len(lats), QUERY_CHUNK_SIZE):
+            chunk = slice(chunk_start, chunk_start + QUERY_CHUNK_SIZE)
+            query_ids, positions = self._candidate_pairs(
+                lats[chunk], lngs[chunk], radius_km
+            )
+            distances = haversine_vectorized(
+                lats[chunk][query_ids],
+                lngs[chunk][query_ids],
+                self.lats[positions],
+                self.lngs[positions],
+            )
+            counts[chunk] = np.bincount(
+                query_ids[distances <= radius_km], minlength=len(lats[chunk])
+            )
+        return counts
+
+    def count_radius(self, lat, lng, radius_km):
+        candidates = self._candidates(lat, lng, radius_km)
+        distances = haversine_vectorized(
+            lat, lng, self.lats[candidates], self.lngs[candidates]
+        )
+        return int(np.count_nonzero(distances <= radius_km))
@@ -0,0 +1,101 @@
+import numpy as np
+
+
+class StringPool:
+    """
+    Dictionary encoding for a string column. Each distinct value is stored
+    once and rows refer to it by code.
+
+    A pool can also be backed by a utf-8 buffer and offsets, as written to
+    the on disk cache, in which case values are only decoded when needed.
+    """
+
+    def __init__(self, values=None):
+        self._values = list(values) if values else []
+        self._codes = None
+        self._data = None
+        self._offsets = None
+
+    @staticmethod
+    def from_buffers(data, offsets):
+        pool = StringPool()
+        pool._values = None
+        pool._data = data
+        pool._offsets = offsets
+        return pool
+
+    def to_buffers(self):
+        encoded = [value.encode("utf-8") for value in self.values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return data, offsets
+
+    @property
+    def values(self):
+        if self._values is None:
+            data = self._data.tobytes()
+            offsets = self._offsets.tolist()
+            self._values = [
+                data[start:end].decode("utf-8")
+                for start, end in zip(offsets[:-1], offsets[1:])
+            ]
+        return self._values
+
+    def __len__(self):
+        if self._values is None:
+            return len(self._offsets) - 1
+        return len(self._values)
+
+    def _code_lookup(self):
+        if self._codes is None:
+            self._codes = {value: code for code, value in enumerate(self.values)}
+        return self._codes
+
+    def find(self, value):
+        """
+        Get the code of value, or None if it is not in the pool
+        """
+        return self._code_lookup().get(value)
+
+    def encode(self, value):
+        if value is None:
+            return -1
+
+        code = self._code_lookup().get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+    def decode(self, code):
+        if code < 0:
+            return None
+        if self._values is None:
+            start, end = self._offsets[code], self._offsets[code + 1]
+            return self._data[start:end].tobytes().decode("utf-8")
+        return self._values[code]
+
+    def match(self, codes, predicate):
+        """
+        Evaluate predicate once per distinct value and broadcast the result
+        to every row in codes. None values never match.
+        """
+        lookup = np.fromiter(
+            (predicate(value) for value in self.values),
+            dtype=bool,
+            count=len(self),
+        )
+        # Trailing False so that code -1 (None) indexes to no match
+        lookup = np.append(lookup, False)
+        return lookup[codes]
+
+    def mask(self, codes, matching_codes):
+        """
+        Get a boolean mask over codes of rows whose value is one of
+        matching_codes
+        """
+        lookup = np.zeros(len(self) + 1, dtype=bool)
+        lookup[matching_codes] = True
+        return lookup[codes]
@@ -1,47 +1,104 @@
 import csv
+import hashlib
 import os
 import ujson
-import requests
 import zipfile
 import shutil
+import threading
 from datetime import datetime
 from functools import lru_cache
+from itertools import islice
 from math import radians, sin, cos, asin, sqrt, isnan
 
 import numpy as np
 
-from irish_property_analysis.settings import LISTINGS_DATA_LOCATION, BAD_MERGE_ATTRS
+from irish_property_analysis.settings import (
+    LISTINGS_DATA_LOCATION,
+    BAD_MERGE_ATTRS,
+    SALE_DATE_WINDOW_DAYS,
+)
 from irish_property_analysis.constants import PPR_URL, TRICKY_STR_TABLE, EARTH_RADIUS
 
 
-def remove_duplicates(data, subset_fields=None):
+class LazySingleton:
     """
-    If subset_fields is None then all fields will be used to deduplicate.
+    Thread safe accessor for an object that is expensive to create, such as
+    one that loads a dataset. The object is created by factory on the first
+    call and the same one returned after that until reset.
+
+    sources are the files the object is created from, for reset_if_stale to
+    notice when they change.
     """
-    seen = set()
-    unique_data = []
-    for row in data:
-        if subset_fields:
-            key = tuple(row[field] for field in subset_fields)
-        else:
-            key = row.values()
 
-        if key not in seen:
-            unique_data.append(row)
-            seen.add(key)
-    return unique_data
+    def __init__(self, factory, sources=()):
+        self.factory = factory
+        self.sources = list(sources)
+        self._instance = None
+        self._mtimes = None
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    # Taken first so changes made while loading are noticed
+                    self._mtimes = self._source_mtimes()
+                    self._instance = self.factory()
+        return self._instance
+
+    def _source_mtimes(self):
+        return [
+            os.path.getmtime(source) if os.path.exists(source) else None
+            for source in self.sources
+        ]
+
+    def reset(self):
+        with self._lock:
+            self._instance = None
+
+    def reset_if_stale(self) -> bool:
+        """
+        Reset if any of sources has changed since the object was created,
+        returning whether it was
+        """
+        if self._instance is None or self._source_mtimes() == self._mtimes:
+            return False
+        self.reset()
+        return True
+
+
+def is_newer_than(filepath, *source_filepaths):
+    """
+    Whether filepath exists and was modified after every one of
+    source_filepaths that exists
+    """
+    if not os.path.exists(filepath):
+        return False
+
+    modified = os.path.getmtime(filepath)
+    return all(
+        modified >= os.path.getmtime(source_filepath)
+        for source_filepath in source_filepaths
+        if os.path.exists(source_filepath)
+    )
 
 
 def write_to_csv(filepath, data):
-    if not data:
+    """
+    Write rows, a list or any iterable of dicts, to a csv. Rows are written
+    as they are taken from data.
+    """
+    rows = iter(data)
+    first = next(rows, None)
+    if first is None:
         print(f"No data to write to: {filepath}")
         return
 
-    fieldnames = data[0].keys()
     with open(filepath, mode="w", newline="", encoding="ISO-8859-1") as file:
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer = csv.DictWriter(file, fieldnames=first.keys())
         writer.writeheader()
-        writer.writerows(data)
+        writer.writerow(first)
+        writer.writerows(rows)
 
 
 def read_csv_to_dict(filepath, headers=None):
@@ -66,6 +123,36 @@ def clean_address_for_comparison(address):
     return address.lower()
 
 
+# Joins addresses cleaned together, not a character any address has
+ADDRESS_SEPARATOR = "\0"
+
+
+def clean_addresses_for_comparison(addresses):
+    """
+    clean_address_for_comparison of each of addresses. They are cleaned as
+    one joined string, which is much quicker than cleaning each one.
+    """
+    addresses = list(addresses)
+    try:
+        joined = ADDRESS_SEPARATOR.join(addresses)
+    except TypeError:
+        joined = None
+
+    if (
+        not addresses
+        or joined is None
+        or joined.count(ADDRESS_SEPARATOR) != len(addresses) - 1
+    ):
+        return [clean_address_for_comparison(address) for address in addresses]
+
+    return [
+        address.strip() or None
+        for address in joined.translate(TRICKY_STR_TABLE)
+        .lower()
+        .split(ADDRESS_SEPARATOR)
+    ]
+
+
 def clean_address(address):
     # TODO: in here do a clean_string which is a more basic version of clean_address, not taking into account road->rd etc.
 
@@ -75,6 +162,14 @@ def clean_address(address):
     return address.translate(TRICKY_STR_TABLE).strip()
 
 
+def to_searchable_address(address):
+    """
+    Normalise an address or address substring for comparison against the
+    searchable_address column of the listing tables
+    """
+    return address.replace(" ", "").replace(",", "").lower()
+
+
 def mean_data(data: list, attr: str) -> list:
     for item in data:
         if isinstance(item[attr], list):
@@ -117,9 +212,31 @@ def is_nan(value):
 
 
 def is_sale_date_within_range(base_date: str | datetime, cmp_date: str | datetime):
-    return abs((convert_date(base_date) - convert_date(cmp_date)).days) < (
-        365 / 2
-    )  # TODO: to settings
+    """
+    Whether cmp_date is within SALE_DATE_WINDOW_DAYS of base_date. For many
+    pairs see date_window, which does not parse the dates each time.
+    """
+    return (
+        abs((convert_date(base_date) - convert_date(cmp_date)).days)
+        < SALE_DATE_WINDOW_DAYS
+    )
+
+
+def to_datetime64(values):
+    """
+    Get values, datetimes or date strings as convert_date takes, as a
+    datetime64[s] array. Each distinct string is parsed once and missing
+    values are NaT.
+    """
+    parsed = {}
+    converted = []
+    for value in values:
+        if isinstance(value, str):
+            if value not in parsed:
+                parsed[value] = convert_date(value)
+            value = parsed[value]
+        converted.append(value)
+    return np.array(converted, dtype="datetime64[s]")
 
 
 def get_all_historical_listings() -> list:
@@ -146,6 +263,9 @@ def get_rentals() -> list:
 
 
 def download_ppr_zip(filename):
+    # Only needed when downloading so kept out of the import of utils
+    import requests
+
     req = requests.get(PPR_URL, verify=False)
     with open(filename, "wb") as output_file:
         output_file.write(req.content)
@@ -186,6 +306,57 @@ def haversine_vectorized(lat1, lon1, lat2, lon2):
     return c * EARTH_RADIUS
 
 
+def group_stats(groups, values, percentiles=(10, 50, 90)):
+    """
+    Summarise values by the integer group each is in, without a loop over
+    the groups. Returns the distinct groups, sorted, along with the count
+    and mean of each and a (groups, percentiles) array of the percentiles
+    of each, interpolated as np.percentile does.
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+
+    order = np.lexsort((values, groups))
+    values = values[order]
+    keys, starts, counts = np.unique(
+        groups[order], return_index=True, return_counts=True
+    )
+    means = np.add.reduceat(values, starts) / counts if len(keys) else values[:0]
+
+    positions = (counts - 1)[:, None] * (np.asarray(percentiles) / 100)[None, :]
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, (counts - 1)[:, None])
+    below = values[starts[:, None] + lower]
+    above = values[starts[:, None] + upper]
+    return keys, counts, means, below + (above - below) * (positions - lower)
+
+
+def stable_hash(value):
+    """
+    int64 hash of a string or None. Unlike hash this does not change
+    between processes.
+    """
+    if value is None:
+        return 0
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def fingerprints(keys, hashes):
+    """
+    Get the distinct keys, sorted, with the number of rows of each and the
+    sum of the uint64 hashes of its rows, wrapping at 64 bits, as int64. A
+    key's fingerprint changes when any of its rows do.
+    """
+    order = np.argsort(keys, kind="stable")
+    distinct, starts, counts = np.unique(
+        np.asarray(keys)[order], return_index=True, return_counts=True
+    )
+    hashes = np.asarray(hashes, dtype=np.uint64)[order]
+    sums = np.add.reduceat(hashes, starts) if len(distinct) else hashes[:0]
+    return distinct, counts, sums.view(np.int64)
+
+
 def fast_to_dict_records(df):
     data = df.values.tolist()
     columns = df.columns.tolist()
@@ -194,3 +365,13 @@ def fast_to_dict_records(df):
 
 def chunks(lst, x):
     return [lst[i : i + x] for i in range(0, len(lst), x)]
+
+
+def batched(iterable, x):
+    """
+    Lazily split iterable into lists of up to x items, without needing the
+    whole of it in memory like chunks does
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, x)):
+        yield batch
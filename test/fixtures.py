@@ -0,0 +1,44 @@
+from irish_property_analysis.ppr_sale import Sale
+from irish_property_analysis.utils import to_searchable_address
+
+
+def ppr_sale(
+    address,
+    date,
+    price="300,000",
+    county="Dublin",
+    eircode=None,
+    description="Second-Hand Dwelling house /Apartment",
+    not_full_market_price="No",
+):
+    return Sale(
+        date=date,
+        address=address,
+        eircode=eircode,
+        county=county,
+        price=price,
+        not_full_market_price=not_full_market_price,
+        vat_exclusive="No",
+        description_of_property=description,
+        description_of_property_size="",
+    )
+
+
+def listing(address, county="dublin", **fields):
+    """
+    A row of a listing table. Every row has the same fields, as insert_many
+    takes the columns from the first row.
+    """
+    return {
+        "original_address": address,
+        "clean_address": address,
+        "searchable_address": to_searchable_address(address),
+        "county": county,
+        "eircode_routing_key": None,
+        "property_type": None,
+        "beds": None,
+        "price": None,
+        "published_date": None,
+        "listing_id": None,
+        **fields,
+    }
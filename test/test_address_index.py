@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+import tempfile
+
+from irish_property_analysis.address_index import AddressIndex
+
+
+class AddressIndexTest(TestCase):
+    def setUp(self):
+        self.documents = [
+            "13 grand canal street, dublin 2",
+            "113 grand canal view, dublin 4",
+            "13 main street, cork",
+            None,
+            "apartment 13a, grand canal dock, dublin 2",
+        ]
+        self.index = AddressIndex.build(self.documents)
+
+    def search(self, substrs, index=None, documents=None):
+        documents = documents or self.documents
+        return (
+            (index or self.index)
+            .search(
+                substrs, lambda doc_id: documents[doc_id], num_documents=len(documents)
+            )
+            .tolist()
+        )
+
+    def test_search_single(self):
+        self.assertEqual(self.search(["grand canal"]), [0, 1, 4])
+        self.assertEqual(self.search(["13"]), [0, 1, 2, 4])
+        self.assertEqual(self.search(["and can"]), [0, 1, 4])
+        self.assertEqual(self.search(["street, d"]), [0])
+        self.assertEqual(self.search(["nonexist"]), [])
+
+    def test_search_multiple(self):
+        self.assertEqual(self.search(["13 ", "grand canal"]), [0, 1])
+        self.assertEqual(self.search(["13", "cork"]), [2])
+
+    def test_search_no_tokens(self):
+        self.assertEqual(self.search([", "]), [0, 1, 2, 4])
+        self.assertEqual(self.search([]), [0, 1, 2, 3, 4])
+
+    def test_search_unindexed_documents(self):
+        documents = self.documents + ["13 grand canal square"]
+        self.assertEqual(
+            self.search(["grand canal"], documents=documents), [0, 1, 4, 5]
+        )
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.index.save(tmp_dir)
+            loaded = AddressIndex.load(tmp_dir)
+            self.assertEqual(len(loaded), len(self.documents))
+            self.assertEqual(self.search(["grand canal"], index=loaded), [0, 1, 4])
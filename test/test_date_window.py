@@ -0,0 +1,89 @@
+from unittest import TestCase
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from irish_property_analysis.date_window import DateWindowIndex, within_window
+from irish_property_analysis.utils import is_sale_date_within_range
+
+
+class DateWindowTest(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        start = datetime(2020, 1, 1)
+        self.dates = [
+            start + timedelta(seconds=int(seconds))
+            for seconds in rng.integers(0, 3 * 365 * 86400, 2000)
+        ]
+        self.groups = rng.integers(0, 3, 2000)
+        self.queries = [
+            start + timedelta(seconds=int(seconds))
+            for seconds in rng.integers(0, 3 * 365 * 86400, 50)
+        ]
+        # Exactly on the edges of the window
+        self.queries += [
+            self.dates[0] + timedelta(days=182),
+            self.dates[0] + timedelta(days=183),
+            self.dates[0] - timedelta(days=182, seconds=1),
+            self.dates[0] - timedelta(days=183),
+        ]
+        self.query_groups = rng.integers(0, 3, len(self.queries))
+        self.query_groups[-4:] = self.groups[0]
+
+    def brute_force(self, groups=True):
+        return sorted(
+            (query_id, idx)
+            for query_id, query in enumerate(self.queries)
+            for idx, date in enumerate(self.dates)
+            if is_sale_date_within_range(query, date)
+            and (not groups or self.query_groups[query_id] == self.groups[idx])
+        )
+
+    def test_pairs(self):
+        index = DateWindowIndex(np.array(self.dates, dtype="datetime64[s]"))
+        query_ids, ids = index.pairs(np.array(self.queries, dtype="datetime64[s]"))
+        self.assertEqual(
+            sorted(zip(query_ids.tolist(), ids.tolist())), self.brute_force(False)
+        )
+
+    def test_pairs_in_groups(self):
+        index = DateWindowIndex(
+            np.array(self.dates, dtype="datetime64[s]"), groups=self.groups
+        )
+        query_ids, ids = index.pairs(
+            np.array(self.queries, dtype="datetime64[s]"), groups=self.query_groups
+        )
+        self.assertEqual(
+            sorted(zip(query_ids.tolist(), ids.tolist())), self.brute_force()
+        )
+
+    def test_missing(self):
+        index = DateWindowIndex(
+            np.array(
+                [datetime(2020, 1, 1), None, datetime(2020, 1, 2)],
+                dtype="datetime64[s]",
+            ),
+            groups=[0, 0, -1],
+        )
+        self.assertEqual(len(index), 1)
+        query_ids, ids = index.pairs(
+            np.array(
+                [None, datetime(2020, 1, 1), datetime(2020, 1, 1)],
+                dtype="datetime64[s]",
+            ),
+            groups=[0, -1, 0],
+        )
+        self.assertEqual(query_ids.tolist(), [2])
+        self.assertEqual(ids.tolist(), [0])
+
+    def test_within_window(self):
+        dates = np.array(self.dates, dtype="datetime64[s]")
+        bases = np.array(self.queries[:1] * len(dates), dtype="datetime64[s]")
+        self.assertEqual(
+            within_window(bases, dates).tolist(),
+            [is_sale_date_within_range(self.queries[0], date) for date in self.dates],
+        )
+        self.assertFalse(
+            within_window(np.array([None], dtype="datetime64[s]"), dates[:1]).any()
+        )
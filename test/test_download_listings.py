@@ -0,0 +1,183 @@
+import threading
+from unittest import TestCase
+from urllib.parse import parse_qs, urlparse
+from unittest.mock import patch
+
+import requests
+
+from benchmarks.stub_listings_api import StubListingsAPI, make_listing
+from scripts import download_listings
+from irish_property_analysis import bulk_load
+from irish_property_analysis.sales import get_sale_db, SaleObject
+from irish_property_analysis.rentals import get_rental_db, RentalObject
+from irish_property_analysis.shares import get_share_db, ShareObject
+from irish_property_analysis.listing_sync import get_sync_state_db
+
+
+class DownloadListingsTest(TestCase):
+    def setUp(self):
+        self.dbs = [get_sale_db(), get_rental_db(), get_share_db()]
+
+    def tearDown(self):
+        for db in self.dbs:
+            db.drop_data()
+        get_sync_state_db().drop_data()
+
+    def download(self, api, *argv):
+        with patch.object(
+            download_listings, "LISTINGS_BASE_URL", api.url
+        ), patch.object(download_listings, "PAGE_SIZE", 50):
+            download_listings.main(list(argv))
+
+    def test_main(self):
+        rows_per_option = {"allHistoricalListings": 250, "rentals": 120, "shares": 7}
+        with StubListingsAPI(rows_per_option=rows_per_option) as api:
+            with patch.object(
+                download_listings, "LISTINGS_BASE_URL", api.url
+            ), patch.object(download_listings, "PAGE_SIZE", 50), patch.object(
+                bulk_load, "INSERT_STATEMENT_SIZE", 15
+            ):
+                download_listings.main([])
+
+        self.assertEqual(SaleObject.select().count(), 250)
+        self.assertEqual(RentalObject.select().count(), 120)
+        self.assertEqual(ShareObject.select().count(), 7)
+        # 5 + 3 + 1 pages
+        self.assertEqual(len(api.requests), 9)
+
+        sale = SaleObject.select().order_by(SaleObject.id).first()
+        self.assertIsNotNone(sale.lat)
+        self.assertEqual(
+            sale.searchable_address,
+            sale.original_address.replace(" ", "").replace(",", "").lower(),
+        )
+        self.assertEqual(
+            len(get_sale_db().filter(address=sale.original_address, partial=True)), 1
+        )
+
+    def test_incremental(self):
+        rows_per_option = {"allHistoricalListings": 100, "rentals": 10, "shares": 10}
+        with StubListingsAPI(rows_per_option=rows_per_option) as api:
+            self.download(api)
+            first = SaleObject.get(
+                SaleObject.listing_id == "allHistoricalListings-00000010"
+            )
+
+            # New listings plus one relisted at a new price
+            api.rows_per_option["allHistoricalListings"] = 110
+            api.updates[("allHistoricalListings", 10)] = {
+                "price": 1.0,
+                "published_date": "2030-01-01 00:00:00",
+            }
+            api.requests.clear()
+            self.download(api, "--incremental")
+
+        # Only listings published since the last sync are fetched
+        self.assertTrue(all("publishedAfter" in path for path in api.requests))
+        self.assertEqual(len(api.requests), 3)
+
+        self.assertEqual(SaleObject.select().count(), 110)
+        relisted = SaleObject.get(
+            SaleObject.listing_id == "allHistoricalListings-00000010"
+        )
+        self.assertEqual(relisted.id, first.id)
+        self.assertEqual(relisted.price, 1.0)
+        self.assertEqual(
+            get_sync_state_db().get_high_water_mark("allHistoricalListings"),
+            "2030-01-01 00:00:00",
+        )
+
+    def test_listing_id_without_id(self):
+        listing = make_listing("rentals", 1)
+        listing.pop("_id")
+        other = dict(listing, price=listing["price"] + 1)
+        self.assertEqual(
+            download_listings.listing_id(listing), download_listings.listing_id(listing)
+        )
+        self.assertNotEqual(
+            download_listings.listing_id(listing), download_listings.listing_id(other)
+        )
+
+    def test_datasets_fetched_concurrently(self):
+        rows_per_option = {"allHistoricalListings": 1000, "rentals": 50, "shares": 50}
+        with StubListingsAPI(rows_per_option=rows_per_option) as api:
+            self.download(api)
+
+        self.assertEqual(SaleObject.select().count(), 1000)
+        self.assertEqual(RentalObject.select().count(), 50)
+        self.assertEqual(ShareObject.select().count(), 50)
+
+        datasets = [
+            parse_qs(urlparse(path).query)["dataOption"][0] for path in api.requests
+        ]
+        # Shares come first, sales are still being fetched when the others are
+        last_sales = len(datasets) - datasets[::-1].index("allHistoricalListings")
+        self.assertLess(datasets.index("rentals"), last_sales)
+
+    def test_pages_held_bounded(self):
+        peaks = []
+
+        class RecordingBudget(download_listings.PageBudget):
+            def acquire(self, owner, stop):
+                acquired = super().acquire(owner, stop)
+                peaks.append(self.held)
+                return acquired
+
+        rows_per_option = {"allHistoricalListings": 500, "rentals": 500, "shares": 500}
+        with StubListingsAPI(rows_per_option=rows_per_option) as api:
+            with patch.object(download_listings, "PageBudget", RecordingBudget):
+                self.download(api)
+
+        self.assertEqual(SaleObject.select().count(), 500)
+        self.assertEqual(ShareObject.select().count(), 500)
+        # 10 pages and the end of each dataset
+        self.assertEqual(len(peaks), 33)
+        self.assertLessEqual(max(peaks), download_listings.PREFETCH_PAGES)
+
+    def test_budget_keeps_last_slot_for_active(self):
+        budget = download_listings.PageBudget(2)
+        stop = threading.Event()
+        active, other = object(), object()
+
+        self.assertTrue(budget.acquire(other, stop))
+        # Only the dataset being consumed may take the last slot, others
+        # wait until stopped
+        threading.Timer(0.2, stop.set).start()
+        self.assertFalse(budget.acquire(other, stop))
+        stop.clear()
+        budget.activate(active)
+        self.assertTrue(budget.acquire(active, stop))
+        self.assertEqual(budget.held, 2)
+
+        budget.release()
+        self.assertTrue(budget.acquire(active, stop))
+
+    def test_retries(self):
+        with StubListingsAPI(rows=120) as api:
+            api.failures = 2
+            with patch.object(download_listings, "RETRY_BACKOFF_FACTOR", 0):
+                self.download(api)
+
+        self.assertEqual(SaleObject.select().count(), 120)
+        self.assertEqual(RentalObject.select().count(), 120)
+        self.assertEqual(ShareObject.select().count(), 120)
+
+    def test_fetch_error_keeps_listings(self):
+        with StubListingsAPI(rows=120) as api:
+            self.download(api)
+            api.rows = 200
+            api.failures = 1000
+            with patch.object(
+                download_listings, "RETRY_BACKOFF_FACTOR", 0
+            ), self.assertRaises(requests.exceptions.RetryError):
+                self.download(api)
+
+        self.assertEqual(SaleObject.select().count(), 120)
+
+    def test_fetch_listings_is_lazy(self):
+        with StubListingsAPI(rows=100) as api:
+            listings = download_listings.fetch_listings(
+                f"{api.url}?pageSize=10&dataOption=rentals"
+            )
+            next(listings)
+            self.assertEqual(len(api.requests), 1)
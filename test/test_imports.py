@@ -0,0 +1,43 @@
+from unittest import TestCase
+
+import os
+import subprocess
+import sys
+import tempfile
+
+MODULES = [
+    "irish_property_analysis.settings",
+    "irish_property_analysis.ppr_sale",
+    "irish_property_analysis.schools",
+    "irish_property_analysis.bus_stops",
+    "irish_property_analysis.sales",
+    "irish_property_analysis.rentals",
+    "irish_property_analysis.shares",
+]
+
+
+class ImportTest(TestCase):
+    def test_import_has_no_side_effects(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            data_location = os.path.join(tmp_dir, "data")
+            result = subprocess.run(
+                [
+                    sys.executable,
+                    "-c",
+                    "import sys\n"
+                    + "".join(f"import {module}\n" for module in MODULES)
+                    + "print('pandas' in sys.modules)",
+                ],
+                env={
+                    **os.environ,
+                    "PYTHONPATH": os.pathsep.join(sys.path),
+                    "PROPERTY_ANALYSIS_DATA_LOCATION": data_location,
+                },
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+
+            # Nothing loaded, no pandas import and no data dirs / databases
+            self.assertEqual(result.stdout.strip(), "False")
+            self.assertFalse(os.path.exists(data_location))
@@ -0,0 +1,202 @@
+import sqlite3
+from unittest import TestCase
+
+from peewee import SqliteDatabase
+
+from irish_property_analysis.sales import get_sale_db, SaleObject
+from irish_property_analysis.rentals import get_rental_db, RentalObject
+from irish_property_analysis.shares import get_share_db, ShareObject
+from irish_property_analysis.settings import LISTING_DB_LOCATION
+from irish_property_analysis.bulk_load import table_versions
+from irish_property_analysis.search_index import (
+    NOCASE_INDEXED_FIELDS,
+    add_missing_columns,
+)
+
+from fixtures import listing
+
+
+def db_indexes(object_class):
+    return object_class._meta.database.execute_sql(
+        f"PRAGMA index_list({object_class._meta.table_name})"
+    ).fetchall()
+
+
+class ListingDBTest(TestCase):
+    def setUp(self):
+        self.dbs = [
+            (get_sale_db(), SaleObject),
+            (get_rental_db(), RentalObject),
+            (get_share_db(), ShareObject),
+        ]
+        for db, object_class in self.dbs:
+            db.drop_data()
+            object_class.insert_many(
+                [
+                    listing("13 Grand Canal Street, Dublin 2"),
+                    listing("87 Some Avenue, Dublin 8"),
+                    listing(
+                        "1 Main Street, Cork",
+                        county="cork",
+                        property_type="House",
+                        beds=3,
+                    ),
+                ]
+            ).execute()
+
+    def tearDown(self):
+        for db, _ in self.dbs:
+            db.drop_data()
+
+    def addresses(self, results):
+        return sorted(obj.original_address for obj in results)
+
+    def test_filter_partial(self):
+        for db, _ in self.dbs:
+            self.assertEqual(
+                self.addresses(
+                    db.filter(address_substrs=["grand canal"], partial=True)
+                ),
+                ["13 Grand Canal Street, Dublin 2"],
+            )
+            self.assertEqual(
+                self.addresses(
+                    db.filter(address_substrs=["87", "avenue"], partial=True)
+                ),
+                ["87 Some Avenue, Dublin 8"],
+            )
+            self.assertEqual(
+                len(db.filter(address_substrs=["street"], partial=True)), 2
+            )
+            self.assertEqual(
+                len(db.filter(address_substrs=["street"], county="cork", partial=True)),
+                1,
+            )
+            self.assertEqual(len(db.filter(address="nonexist", partial=True)), 0)
+
+    def test_search_index_synced(self):
+        for db, object_class in self.dbs:
+            obj = object_class.get(
+                object_class.original_address == "1 Main Street, Cork"
+            )
+            obj.original_address = "1 Other Road, Cork"
+            obj.save()
+            self.assertEqual(len(db.filter(address="main street", partial=True)), 0)
+            self.assertEqual(len(db.filter(address="other road", partial=True)), 1)
+
+            obj.delete_instance()
+            self.assertEqual(len(db.filter(address="other road", partial=True)), 0)
+
+            db.drop_data()
+            self.assertEqual(len(db.filter(address="street", partial=True)), 0)
+            object_class.insert_many([listing("2 Main Street, Cork")]).execute()
+            self.assertEqual(len(db.filter(address="main street", partial=True)), 1)
+
+    def test_filter_exact(self):
+        for db, _ in self.dbs:
+            self.assertEqual(len(db.filter(county="Cork")), 1)
+            self.assertEqual(len(db.filter(county="cor")), 0)
+            self.assertEqual(len(db.filter(property_type="house", beds=3)), 1)
+            self.assertEqual(len(db.filter(property_type="house", beds=2)), 0)
+
+    def test_exact_filter_uses_index(self):
+        for _, object_class in self.dbs:
+            for name in NOCASE_INDEXED_FIELDS:
+                query = object_class.select()
+                query = query.where(
+                    getattr(object_class, name).collate("NOCASE") == "x"
+                )
+                sql, params = query.sql()
+                plan = object_class._meta.database.execute_sql(
+                    f"EXPLAIN QUERY PLAN {sql}", params
+                ).fetchall()
+                self.assertIn(f"{name}_nocase", plan[0][-1])
+
+    def test_refresh(self):
+        for db, object_class in self.dbs:
+            reader = sqlite3.connect(LISTING_DB_LOCATION)
+            table = object_class._meta.table_name
+            seen_during_load = []
+
+            def rows():
+                yield listing("5 New Road, Galway", county="galway")
+                seen_during_load.append(
+                    reader.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+                )
+                yield listing("6 New Road, Galway", county="galway")
+
+            (version,) = table_versions(object_class)
+            self.assertEqual(db.refresh(rows()), 2)
+            reader.close()
+            self.assertEqual(table_versions(object_class), [version + 1])
+
+            self.assertEqual(seen_during_load, [3])
+            self.assertEqual(len(db), 2)
+            self.assertEqual(len(db.filter(address="new road", partial=True)), 2)
+            self.assertEqual(len(db.filter(address="street", partial=True)), 0)
+            self.assertEqual(len(db.filter(county="Galway")), 2)
+
+            # Indexes and search index triggers are back on the new table
+            indexes = {row[1] for row in db_indexes(object_class)}
+            self.assertIn(f"{table}_county_nocase", indexes)
+            object_class.insert_many([listing("7 New Road, Galway")]).execute()
+            self.assertEqual(len(db.filter(address="new road", partial=True)), 3)
+
+    def test_refresh_failure_keeps_rows(self):
+        for db, _ in self.dbs:
+
+            def rows():
+                yield listing("5 New Road, Galway")
+                raise ConnectionError()
+
+            with self.assertRaises(ConnectionError):
+                db.refresh(rows())
+
+            self.assertEqual(len(db), 3)
+            self.assertEqual(len(db.filter(address="street", partial=True)), 2)
+            self.assertEqual(len(db.filter(address="new road", partial=True)), 0)
+
+    def test_upsert(self):
+        for db, object_class in self.dbs:
+            rows = [
+                dict(listing("5 New Road, Galway"), listing_id="a"),
+                dict(listing("6 New Road, Galway"), listing_id="b"),
+            ]
+            (version,) = table_versions(object_class)
+            self.assertEqual(db.upsert(rows), 2)
+            self.assertEqual(db.upsert(rows), 0)
+            # Only when something changed
+            self.assertEqual(table_versions(object_class), [version + 1])
+
+            rows[1] = dict(listing("6 Old Road, Galway"), listing_id="b")
+            self.assertEqual(db.upsert(rows), 1)
+
+            self.assertEqual(len(db), 5)
+            self.assertEqual(len(db.filter(address="new road", partial=True)), 1)
+            self.assertEqual(len(db.filter(address="old road", partial=True)), 1)
+
+    def test_versions_bumped_on_row_changes(self):
+        for db, object_class in self.dbs:
+            (version,) = table_versions(object_class)
+            row = object_class.create(**listing("5 New Road, Galway"))
+            self.assertEqual(table_versions(object_class), [version + 1])
+
+            row.delete_instance()
+            self.assertEqual(table_versions(object_class), [version + 2])
+
+            db.drop_data()
+            self.assertEqual(table_versions(object_class), [version + 3])
+
+    def test_add_missing_columns(self):
+        memory_db = SqliteDatabase(":memory:")
+        with SaleObject.bind_ctx(memory_db):
+            memory_db.execute_sql(
+                "CREATE TABLE saleobject (id INTEGER PRIMARY KEY, "
+                "original_address VARCHAR(255) NOT NULL, "
+                "clean_address VARCHAR(255) NOT NULL, "
+                "searchable_address VARCHAR(255) NOT NULL)"
+            )
+            add_missing_columns(SaleObject)
+            columns = {column.name for column in memory_db.get_columns("saleobject")}
+        self.assertIn("listing_id", columns)
+        self.assertIn("county", columns)
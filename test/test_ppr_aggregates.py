@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+import numpy as np
+
+from irish_property_analysis.ppr_sale import Sales
+from irish_property_analysis.ppr_aggregates import ALL, get_price_aggregate_db
+
+from fixtures import ppr_sale
+
+
+class PriceAggregateTest(TestCase):
+    def setUp(self):
+        self.db = get_price_aggregate_db()
+        self.db.drop_data()
+
+        self.sales = Sales()
+        for sale in [
+            ppr_sale("1 Main Street", "01/01/2020", "100,000", eircode="D08X001"),
+            ppr_sale("2 Main Street", "02/01/2020", "200,000", eircode="D08X002"),
+            ppr_sale("3 Main Street", "03/01/2020", "300,000"),
+            ppr_sale("4 Main Street", "04/01/2020", "400,000", eircode="D08X003"),
+            ppr_sale(
+                "5 Main Street",
+                "05/01/2020",
+                "500,000",
+                description="New Dwelling house /Apartment",
+            ),
+            # Not a market price
+            ppr_sale(
+                "6 Main Street", "06/01/2020", "1,000", not_full_market_price="Yes"
+            ),
+            ppr_sale("7 Main Street", "01/02/2020", "250,000", county="Cork"),
+        ]:
+            self.sales.append(sale)
+
+    def tearDown(self):
+        self.db.drop_data()
+
+    def test_trends(self):
+        self.assertEqual(self.db.update(self.sales), ["2020-01", "2020-02"])
+
+        (january,) = self.db.trends(county="dublin")
+        self.assertEqual(january.month, "2020-01")
+        self.assertEqual(january.count, 5)
+        self.assertEqual(january.mean, 300000)
+        self.assertEqual(january.median, 300000)
+        self.assertEqual(january.p10, np.percentile([1, 2, 3, 4, 5], 10) * 100000)
+
+        (routing_key,) = self.db.trends(routing_key="D08")
+        self.assertEqual(routing_key.count, 3)
+        self.assertEqual(routing_key.median, 200000)
+
+        (new,) = self.db.trends(county="dublin", description_of_property="new")
+        self.assertEqual(new.median, 500000)
+        self.assertEqual(new.description_of_property_size, ALL)
+
+        (unknown_size,) = self.db.trends(
+            county="dublin", description_of_property_size=None
+        )
+        self.assertEqual(unknown_size.count, 5)
+
+        self.assertEqual(
+            [aggregate.month for aggregate in self.db.trends(county="cork")],
+            ["2020-02"],
+        )
+        self.assertEqual(self.db.trends(county="cork", until="2020-01"), [])
+
+        with self.assertRaises(ValueError):
+            self.db.trends()
+
+    def test_update_changed_months(self):
+        self.db.update(self.sales)
+        count = len(self.db)
+
+        self.assertEqual(self.db.update(self.sales), [])
+        self.assertEqual(len(self.db), count)
+
+        self.sales.append(ppr_sale("8 Main Street", "10/02/2020", "350,000"))
+        self.sales.append(ppr_sale("9 Main Street", "10/03/2020", "150,000"))
+        self.assertEqual(self.db.update(self.sales), ["2020-02", "2020-03"])
+
+        (february,) = self.db.trends(county="dublin", since="2020-02", until="2020-02")
+        self.assertEqual(february.count, 1)
+        self.assertEqual(len(self.db.trends(county="dublin")), 3)
+
+        # Months no longer in the sales are dropped
+        self.assertEqual(self.db.update(self.sales.take(np.arange(7))), ["2020-02"])
+        self.assertEqual(len(self.db.trends(county="dublin")), 1)
+
+        self.assertEqual(
+            self.db.update(self.sales, full=True), ["2020-01", "2020-02", "2020-03"]
+        )
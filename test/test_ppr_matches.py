@@ -0,0 +1,152 @@
+from unittest import TestCase
+
+from datetime import datetime
+
+from irish_property_analysis.ppr_sale import Sales
+from irish_property_analysis.ppr_matches import (
+    address_block_key,
+    get_ppr_match_db,
+    PPRBlocks,
+)
+from irish_property_analysis.sales import get_sale_db, SaleObject
+
+from fixtures import listing, ppr_sale
+
+
+class PPRMatchTest(TestCase):
+    def setUp(self):
+        self.db = get_ppr_match_db()
+        self.db.drop_data()
+        get_sale_db().drop_data()
+
+        self.sales = Sales()
+        for sale in [
+            ppr_sale("12 Oak Avenue, Town, Co. Dublin", "01/03/2020"),
+            # Too long after the listing
+            ppr_sale("12 Oak Avenue, Town, Co. Dublin", "01/03/2022"),
+            ppr_sale("12 Oak Avenue, Cork", "01/03/2020", county="Cork"),
+            ppr_sale("13 Oak Avenue, Town, Co. Dublin", "01/03/2020"),
+            ppr_sale("1 Main Street, Dublin 8", "01/02/2020", eircode="D08X123"),
+        ]:
+            self.sales.append(sale)
+
+        SaleObject.insert_many(
+            [
+                listing(
+                    "12, Oak Avenue, Town, Dublin",
+                    listing_id="a",
+                    published_date=datetime(2020, 1, 1),
+                ),
+                listing(
+                    "1 Main Street, Dublin",
+                    listing_id="b",
+                    published_date=datetime(2020, 1, 1),
+                    eircode_routing_key="D02",
+                ),
+                listing(
+                    "99 Nowhere Road",
+                    listing_id="c",
+                    published_date=datetime(2020, 1, 1),
+                ),
+            ]
+        ).execute()
+
+    def tearDown(self):
+        self.db.drop_data()
+        get_sale_db().drop_data()
+
+    def matched_dates(self, listing_id):
+        return [match.ppr_date for match in self.db.get_matches(listing_id)]
+
+    def test_address_block_key(self):
+        self.assertEqual(address_block_key("12, Oak Avenue, Town"), "12 oak avenue")
+        self.assertEqual(address_block_key("12 Oak Avenue"), "12 oak avenue")
+        self.assertIsNone(address_block_key(" , "))
+
+    def test_candidates(self):
+        blocks = PPRBlocks(self.sales)
+        self.assertEqual(
+            blocks.candidates("Dublin", "12 Oak Avenue, Town").tolist(), [0, 1]
+        )
+        self.assertEqual(blocks.candidates("cork", "12 Oak Avenue").tolist(), [2])
+        self.assertEqual(len(blocks.candidates("kerry", "12 Oak Avenue")), 0)
+
+    def test_match(self):
+        self.assertEqual(self.db.match(self.sales), 1)
+        self.assertEqual(self.matched_dates("a"), [datetime(2020, 3, 1)])
+        self.assertEqual(self.db.get_matches("a")[0].days_to_sale, 60)
+        # Routing keys differ
+        self.assertEqual(self.matched_dates("b"), [])
+        self.assertEqual(self.matched_dates("c"), [])
+
+    def test_match_only_new(self):
+        self.db.match(self.sales)
+
+        # Nothing new
+        self.assertEqual(self.db.match(self.sales), 0)
+
+        self.sales.append(ppr_sale("12 Oak Avenue, Town, Co. Dublin", "01/05/2020"))
+        SaleObject.insert_many(
+            [
+                listing(
+                    "13 Oak Avenue, Town",
+                    listing_id="d",
+                    published_date=datetime(2020, 2, 1),
+                )
+            ]
+        ).execute()
+
+        # The new sale for a and the earlier sale for the new listing d
+        self.assertEqual(self.db.match(self.sales), 2)
+        self.assertEqual(
+            self.matched_dates("a"), [datetime(2020, 3, 1), datetime(2020, 5, 1)]
+        )
+        self.assertEqual(self.matched_dates("d"), [datetime(2020, 3, 1)])
+
+        self.assertEqual(self.db.match(self.sales, full=True), 3)
+        self.assertEqual(len(self.db), 3)
+
+    def test_match_routing_keys(self):
+        SaleObject.insert_many(
+            [
+                listing(
+                    "1 Main Street",
+                    listing_id=listing_id,
+                    published_date=datetime(2020, 1, 1),
+                    eircode_routing_key=routing_key,
+                )
+                for listing_id, routing_key in [("d08", "D08"), ("none", None)]
+            ]
+            + [
+                # The sale has no eircode, so any routing key is compatible
+                listing(
+                    "13 Oak Avenue",
+                    listing_id="oak",
+                    published_date=datetime(2020, 1, 1),
+                    eircode_routing_key="D02",
+                )
+            ]
+        ).execute()
+
+        self.db.match(self.sales)
+        self.assertEqual(self.matched_dates("d08"), [datetime(2020, 2, 1)])
+        self.assertEqual(self.matched_dates("none"), [datetime(2020, 2, 1)])
+        self.assertEqual(self.matched_dates("oak"), [datetime(2020, 3, 1)])
+        self.assertEqual(self.matched_dates("b"), [])
+
+    def test_match_changed_listings(self):
+        self.db.match(self.sales)
+
+        # c now has the address of a sale made before the last match, and a
+        # no longer has that of its sale
+        SaleObject.update(original_address="13 Oak Avenue, Town").where(
+            SaleObject.listing_id == "c"
+        ).execute()
+        SaleObject.update(original_address="99 Nowhere Road").where(
+            SaleObject.listing_id == "a"
+        ).execute()
+
+        self.assertEqual(self.db.match(self.sales), 1)
+        self.assertEqual(self.matched_dates("c"), [datetime(2020, 3, 1)])
+        self.assertEqual(self.matched_dates("a"), [])
+        self.assertEqual(self.db.match(self.sales), 0)
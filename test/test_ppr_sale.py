@@ -1,8 +1,37 @@
 from unittest import TestCase
 
+import os
+import time
 import datetime
+import tempfile
 
-from irish_property_analysis.ppr_sale import Sale, Sales
+from irish_property_analysis.constants import PPR_REPLACEMENT_HEADERS
+from irish_property_analysis.ppr_sale import (
+    Sale,
+    Sales,
+    SAVE_KEY_FIELDS,
+    SERIALISED_FIELDS,
+)
+from irish_property_analysis.utils import read_csv_to_dict
+
+# As in the csv from the PPR download, latin-1 with the euro sign as \x80
+PPR_CSV = (
+    '"Date of Sale (dd/mm/yyyy)","Address","County","Eircode","Price (\x80)",'
+    '"Not Full Market Price","VAT Exclusive","Description of Property",'
+    '"Property Size Description"\n'
+    '"01/01/2010","1 Main Street, Dublin 2","Dublin","D02X285","\x80343,000.00",'
+    '"No","No","Second-Hand Dwelling house /Apartment",'
+    '"greater than or equal to 38 sq metres and less than 125 sq metres"\n'
+    '"03/01/2010","Ãpt 4, Â Sráid Mhór ","Baile Átha Cliath","","\x80185,000.00",'
+    '"No","No","Teach/Árasán Cónaithe Atháimhe",""\n'
+    '"04/01/2010","5 New Road","Cork","T12AB34","\x80438,500.00",'
+    '"Yes","Yes","Teach/Árasán Cónaithe Nua","less than 38 sq metres"\n'
+    '"05/01/2010","6 New Road","Cork","","\x80400,000.00",'
+    '"No","Yes","New Dwelling house /Apartment","greater than 125 sq metres"\n'
+    '"06/01/2010","   ","Cork","","\x80400,000.00","No","No","Other",""\n'
+    '"01/01/2010","1 Main Street, Dublin 2","Dublin","D02X285","\x80343,000.00",'
+    '"No","No","Second-Hand Dwelling house /Apartment",""\n'
+)
 
 
 class PPRSalesTest(TestCase):
@@ -250,3 +279,189 @@ class PPRSaleTest(TestCase):
             ).eircode_unique_id,
             None,
         )
+
+
+class PPRSalesColumnsTest(TestCase):
+    def setUp(self):
+        self.sales = Sales()
+        for address, county, date in [
+            ("1 main street", "Dublin", "01/01/2010"),
+            ("2 main street", "Cork", "01/06/2012"),
+            ("3 other road", "Dublin", "01/01/2020"),
+        ]:
+            self.sales.append(
+                Sale(
+                    date=date,
+                    address=address,
+                    eircode=None,
+                    county=county,
+                    price="100,000",
+                    not_full_market_price="No",
+                    vat_exclusive="No",
+                    description_of_property="Second-Hand Dwelling house /Apartment",
+                    description_of_property_size="less than 38 sq metres",
+                )
+            )
+
+    def test_append_duplicate(self):
+        self.sales.append(list(self.sales)[0])
+        self.assertEqual(len(self.sales), 3)
+
+    def test_iter_views(self):
+        sales = list(self.sales)
+        self.assertEqual(
+            [s.address for s in sales],
+            ["1 main street", "2 main street", "3 other road"],
+        )
+        self.assertEqual(sales[1].date, datetime.datetime(2012, 6, 1))
+        self.assertEqual(sales[1].price, 100000.0)
+        self.assertEqual(sales[1].county, "cork")
+        self.assertIsNone(sales[1].eircode)
+        self.assertIsNone(sales[1].eircode_routing_key)
+        self.assertEqual(sales[1].description_of_property_size, "<38sqm")
+
+    def test_filter_views(self):
+        results = self.sales.filter(address="main street", county="dublin")
+        self.assertEqual([s.address for s in results], ["1 main street"])
+        self.assertTrue(list(results)[0] in self.sales)
+        self.assertEqual(len(self.sales.filter(address="main street")), 2)
+        self.assertEqual(
+            len(self.sales.filter(address="1 main street", partial=False)), 1
+        )
+        self.assertEqual(len(self.sales.filter(address="main", partial=False)), 0)
+
+    def test_filter_address_substrs(self):
+        self.assertEqual(
+            [s.address for s in self.sales.filter(address_substrs=["2", "main"])],
+            ["2 main street"],
+        )
+        self.assertEqual(
+            len(self.sales.filter(address_substrs=["main", "street"], county="cork")),
+            1,
+        )
+        self.assertEqual(len(self.sales.filter(address_substrs=["main", "road"])), 0)
+        self.assertEqual(
+            len(self.sales.filter(address="street", address_substrs=["1 main"])), 1
+        )
+        self.assertEqual(len(self.sales.filter(address_substrs=["", "main"])), 2)
+
+    def test_search_address(self):
+        sale = Sale(
+            date="01/01/2010",
+            address="  1 MAIN Street ",
+            eircode="",
+            county="Dublin",
+            price="1,000",
+            not_full_market_price="No",
+            vat_exclusive="No",
+            description_of_property="Second-Hand Dwelling house /Apartment",
+            description_of_property_size="",
+        )
+        self.assertEqual(sale.search_address, "1 main street")
+
+        self.sales.append(sale)
+        self.assertEqual(list(self.sales)[3].search_address, "1 main street")
+        self.assertEqual(
+            [
+                s.address
+                for s in self.sales.filter(address="1 Main Street", partial=False)
+            ],
+            ["1 main street", "  1 MAIN Street "],
+        )
+
+    def assert_csv_parity(self, csv_location, headers=None):
+        expected = Sales(data=read_csv_to_dict(csv_location, headers=headers))
+        actual = Sales.read_csv(csv_location, chunk_size=2)
+
+        self.assertEqual(actual.serialise(), expected.serialise())
+        self.assertEqual(
+            [sale.search_address for sale in actual],
+            [sale.search_address for sale in expected],
+        )
+
+    def test_read_csv_parity(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_location = os.path.join(tmp_dir, "ppr.csv")
+            with open(csv_location, "w", encoding="ISO-8859-1") as fh:
+                fh.write(PPR_CSV)
+            self.assert_csv_parity(csv_location, headers=PPR_REPLACEMENT_HEADERS)
+            sales = Sales.read_csv(csv_location)
+            self.assertEqual(len(sales), 5)
+            first = list(sales)[0]
+            self.assertEqual(first.county, "dublin")
+            self.assertEqual(first.eircode, "D02X285")
+            self.assertEqual(first.eircode_routing_key, "d02")
+
+            # And the csv as rewritten by save, whose columns are in another
+            # order
+            sales.save(csv_location)
+            self.assert_csv_parity(csv_location)
+            first = list(Sales.read_csv(csv_location))[0]
+            self.assertEqual(first.county, "dublin")
+            self.assertEqual(first.eircode_routing_key, "d02")
+
+    def test_cache_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_location = os.path.join(tmp_dir, "ppr_cache")
+            self.sales.save_cache(cache_location)
+
+            cached = Sales.load_cache(cache_location)
+            self.assertEqual(cached.serialise(), self.sales.serialise())
+            self.assertEqual(len(cached.filter(address="main street")), 2)
+            self.assertTrue(list(self.sales)[0] in cached)
+
+    def test_cache_freshness(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_location = os.path.join(tmp_dir, "ppr.csv")
+            cache_location = os.path.join(tmp_dir, "ppr_cache")
+
+            self.assertFalse(Sales.is_cache_fresh(cache_location, csv_location))
+
+            self.sales.save(csv_location)
+            self.sales.save_cache(cache_location)
+            self.assertTrue(Sales.is_cache_fresh(cache_location, csv_location))
+
+            later = time.time() + 10
+            os.utime(csv_location, (later, later))
+            self.assertFalse(Sales.is_cache_fresh(cache_location, csv_location))
+
+    def test_key_hashes(self):
+        self.assertEqual(
+            self.sales.key_hashes().tolist(), [sale.hash for sale in self.sales]
+        )
+        self.assertEqual(
+            self.sales.key_hashes(SAVE_KEY_FIELDS).tolist(),
+            [sale.key_hash(SAVE_KEY_FIELDS) for sale in self.sales],
+        )
+        self.assertEqual(len(set(self.sales.key_hashes().tolist())), 3)
+
+    def test_save_drops_duplicates(self):
+        # Same date, address, price and county as the first, another eircode
+        self.sales.append(
+            Sale(
+                date="01/01/2010",
+                address="1 main street",
+                eircode="D02X285",
+                county="Dublin",
+                price="100,000",
+                not_full_market_price="No",
+                vat_exclusive="No",
+                description_of_property="Second-Hand Dwelling house /Apartment",
+                description_of_property_size="less than 38 sq metres",
+            )
+        )
+        self.assertEqual(len(self.sales), 4)
+        self.assertEqual(list(self.sales.iter_serialised()), self.sales.serialise())
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_location = os.path.join(tmp_dir, "ppr.csv")
+            self.sales.save(csv_location)
+            saved = read_csv_to_dict(csv_location)
+
+        self.assertEqual(list(saved[0].keys()), SERIALISED_FIELDS)
+        self.assertEqual(
+            [(row["address"], row["eircode"]) for row in saved],
+            [("1 main street", ""), ("2 main street", ""), ("3 other road", "")],
+        )
+        self.assertEqual(saved[0]["date"], "2010-01-01 00:00:00")
+        self.assertEqual(saved[0]["price"], "100000.0")
@@ -0,0 +1,166 @@
+from unittest import TestCase
+
+from datetime import datetime
+
+import numpy as np
+
+from irish_property_analysis.ppr_sale import Sales
+from irish_property_analysis.price_index import (
+    INDEX_BASE,
+    get_price_index_db,
+    listing_prices,
+    monthly_changes,
+    ppr_prices,
+    repeat_sale_pairs,
+)
+from irish_property_analysis.sales import get_sale_db, SaleObject
+
+from fixtures import ppr_sale
+
+
+class RepeatSalesTest(TestCase):
+    def test_repeat_sale_pairs(self):
+        areas, first, second, changes = repeat_sale_pairs(
+            np.array([0, 0, 0, 1, 0, 0]),
+            np.array([5, 5, 5, 5, 6, 6]),
+            np.array([10, 20, 20, 30, 10, 100]),
+            np.array([100.0, 200.0, 210.0, 300.0, 100.0, 200.0]),
+        )
+        # Not across areas, nor within a month, nor too far apart
+        self.assertEqual(areas.tolist(), [0])
+        self.assertEqual(first.tolist(), [10])
+        self.assertEqual(second.tolist(), [20])
+        self.assertAlmostEqual(changes[0], np.log(2))
+
+    def test_monthly_changes(self):
+        pairs, changes = monthly_changes(
+            np.array([0, 0, 1]),
+            np.array([0, 1, 0]),
+            np.array([2, 2, 1]),
+            np.array([0.2, 0.3, 0.1]),
+            num_areas=2,
+            start=0,
+            end=3,
+        )
+        self.assertEqual(pairs.tolist(), [[0, 1, 2, 0], [0, 1, 0, 0]])
+        # Month 1 only has the first pair, month 2 both, weighted by 1 / span
+        self.assertAlmostEqual(changes[0, 1], 0.1)
+        self.assertAlmostEqual(changes[0, 2], (0.5 * 0.1 + 1 * 0.3) / 1.5)
+        self.assertEqual(changes[0, 3], 0)
+        self.assertAlmostEqual(changes[1, 1], 0.1)
+
+
+class PriceIndexTest(TestCase):
+    def setUp(self):
+        self.db = get_price_index_db()
+        self.db.drop_data()
+        get_sale_db().drop_data()
+
+        self.sales = Sales()
+        for sale in [
+            ppr_sale("1 Main Street", "01/01/2020", "100,000", eircode="D08X001"),
+            ppr_sale("1 Main Street", "01/03/2020", "121,000", eircode="D08X001"),
+            ppr_sale("2 Main Street", "15/02/2020", "200,000"),
+            ppr_sale("2 Main Street", "15/03/2020", "220,000"),
+            ppr_sale("1 Main Street", "01/03/2020", "500,000", county="Cork"),
+        ]:
+            self.sales.append(sale)
+
+    def tearDown(self):
+        self.db.drop_data()
+        get_sale_db().drop_data()
+
+    def indexes(self, **kwargs):
+        return [
+            (row.month, row.pairs, round(row.index, 4))
+            for row in self.db.series(**kwargs)
+        ]
+
+    def test_update(self):
+        months = self.db.update("ppr", ppr_prices(self.sales))
+        self.assertEqual(months[-1], "2020-03")
+
+        # 10% a month for the first pair, both pairs in March
+        march = np.exp((0.5 * np.log(1.21) / 2 + np.log(1.1)) / 1.5)
+        self.assertEqual(
+            self.indexes(county="dublin"),
+            [
+                ("2020-01", 0, INDEX_BASE),
+                ("2020-02", 1, round(INDEX_BASE * 1.1, 4)),
+                ("2020-03", 2, round(INDEX_BASE * 1.1 * march, 4)),
+            ],
+        )
+        self.assertEqual(
+            self.indexes(routing_key="D08X001"),
+            [
+                ("2020-01", 0, INDEX_BASE),
+                ("2020-02", 1, round(INDEX_BASE * 1.1, 4)),
+                ("2020-03", 1, round(INDEX_BASE * 1.21, 4)),
+            ],
+        )
+        self.assertEqual(self.indexes(county="cork"), [])
+
+        with self.assertRaises(ValueError):
+            self.db.series()
+
+    def test_update_incremental(self):
+        self.db.update("ppr", ppr_prices(self.sales))
+        full = self.indexes(county="dublin")
+
+        self.assertEqual(self.db.update("ppr", ppr_prices(self.sales)), [])
+
+        # A month on, the months before are unchanged and the level carries
+        self.sales.append(ppr_sale("3 Main Street", "01/04/2020", "100,000"))
+        self.sales.append(ppr_sale("3 Main Street", "01/05/2020", "90,000"))
+        months = self.db.update("ppr", ppr_prices(self.sales))
+        self.assertEqual(months[-1], "2020-05")
+        # Pairs ending in April can span back MAX_HOLD_MONTHS - 1 months
+        self.assertEqual(len(months), 61)
+
+        indexes = self.indexes(county="dublin")
+        self.assertEqual(indexes[:3], full)
+        self.assertEqual(indexes[3], ("2020-04", 0, full[-1][2]))
+        self.assertEqual(indexes[4], ("2020-05", 1, round(full[-1][2] * 0.9, 4)))
+
+        self.db.update("ppr", ppr_prices(self.sales), full=True)
+        self.assertEqual(self.indexes(county="dublin"), indexes)
+
+    def test_update_distant_changes(self):
+        self.db.update("ppr", ppr_prices(self.sales))
+
+        # Changes to two months years apart leave the months between built
+        self.sales.append(ppr_sale("4 Main Street", "20/01/2020", "150,000"))
+        self.sales.append(ppr_sale("4 Main Street", "20/01/2024", "180,000"))
+        months = self.db.update("ppr", ppr_prices(self.sales))
+        self.assertEqual(months[-1], "2024-01")
+
+        indexes = self.indexes(county="dublin")
+        self.assertEqual(self.db.update("ppr", ppr_prices(self.sales)), [])
+        self.assertEqual(self.indexes(county="dublin"), indexes)
+
+    def test_listing_prices(self):
+        SaleObject.insert_many(
+            [
+                {
+                    "original_address": "1 Main Street",
+                    "clean_address": "1 main street",
+                    "searchable_address": "1 main street",
+                    "county": "Dublin",
+                    "eircode_routing_key": "D08",
+                    "price": price,
+                    "published_date": published_date,
+                    "listing_id": listing_id,
+                }
+                for listing_id, price, published_date in [
+                    ("a", 100000, datetime(2020, 1, 5)),
+                    ("b", 110000, datetime(2020, 2, 5)),
+                    ("c", None, datetime(2020, 3, 5)),
+                ]
+            ]
+        ).execute()
+
+        self.db.update("listings", listing_prices())
+        self.assertEqual(
+            self.indexes(source="listings", routing_key="d08"),
+            [("2020-01", 0, INDEX_BASE), ("2020-02", 1, round(INDEX_BASE * 1.1, 4))],
+        )
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+from unittest import TestCase
+from unittest.mock import patch
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from irish_property_analysis.utils import LazySingleton
+
+# get_property_details needs rtb-scraper, which is only installed from git
+pytest.importorskip("rtb_scraper")
+
+from scripts import (  # noqa: E402
+    get_property_details,
+    property_details_client,
+    property_details_server,
+)
+from scripts.property_details_client import query_details  # noqa: E402
+
+
+class QueryArgsTest(TestCase):
+    def test_query_args(self):
+        args = property_details_server.query_args(
+            {
+                "address_substr_csv": "87,Avenue",
+                "county": "dublin",
+                "bus_stop_radius_km": 2,
+            }
+        )
+        self.assertEqual(args.address_substr_csv, ["87", "avenue"])
+        self.assertEqual(args.county, "dublin")
+        self.assertEqual(args.bus_stop_radius_km, 2.0)
+        # Defaults as get_property_details has them
+        self.assertEqual(args.school_radius_km, 1)
+
+        args = property_details_server.query_args({"county": None})
+        self.assertEqual(args.address_substr_csv, [])
+        self.assertIsNone(args.county)
+
+    def test_query_args_bad(self):
+        with self.assertRaises(argparse.ArgumentError):
+            property_details_server.query_args({"school_radius_km": "far"})
+
+
+class ClientTest(TestCase):
+    def test_unreachable_server(self):
+        # Nothing listens on port 1
+        argv = ["property_details_client", "--server-url", "http://127.0.0.1:1"]
+        with patch("sys.argv", argv), self.assertRaises(SystemExit) as raised:
+            property_details_client.main()
+        self.assertIn("Could not reach", str(raised.exception.code))
+
+
+class HandlerTest(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp_dir.name, "dataset.txt")
+        self.write_source("first")
+
+        def read_source():
+            with open(self.source) as fh:
+                return fh.read()
+
+        self.dataset = LazySingleton(read_source, sources=[self.source])
+
+        def section(args):
+            return [{"county": args.county, "dataset": self.dataset()}]
+
+        self.patches = [
+            patch.object(property_details_server, "DATASETS", [self.dataset]),
+            patch.object(get_property_details, "SECTIONS", [("Section", section)] * 2),
+        ]
+        for p in self.patches:
+            p.start()
+
+        # Port 0 picks a free port
+        self.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), property_details_server.Handler
+        )
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        for p in self.patches:
+            p.stop()
+        self.tmp_dir.cleanup()
+
+    def write_source(self, content, mtime=None):
+        with open(self.source, "w") as fh:
+            fh.write(content)
+        if mtime is not None:
+            os.utime(self.source, (mtime, mtime))
+
+    def post(self, body):
+        request = Request(f"{self.url}/details", data=body)
+        with urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_round_trip(self):
+        result = query_details(self.url, {"county": "cork"})
+        self.assertEqual(
+            [(section["title"], section["records"]) for section in result["sections"]],
+            [("Section", [{"county": "cork", "dataset": "first"}])] * 2,
+        )
+        self.assertTrue(all(section["seconds"] >= 0 for section in result["sections"]))
+
+        with urlopen(f"{self.url}/health") as response:
+            self.assertEqual(json.loads(response.read()), {"status": "ok"})
+
+    def test_bad_query(self):
+        for body in [b"not json", b"[]", b'{"school_radius_km": "far"}']:
+            with self.assertRaises(HTTPError) as raised:
+                self.post(body)
+            self.assertEqual(raised.exception.code, 400)
+            self.assertIn("bad query", json.loads(raised.exception.read())["error"])
+
+        with self.assertRaises(HTTPError) as raised:
+            urlopen(f"{self.url}/nowhere")
+        self.assertEqual(raised.exception.code, 404)
+
+    def test_reloads_changed_data(self):
+        self.assertEqual(
+            query_details(self.url, {})["sections"][0]["records"][0]["dataset"],
+            "first",
+        )
+
+        # Written again, with a later modification time
+        self.write_source("second", mtime=os.path.getmtime(self.source) + 10)
+        self.assertEqual(
+            query_details(self.url, {})["sections"][0]["records"][0]["dataset"],
+            "second",
+        )
@@ -0,0 +1,114 @@
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from irish_property_analysis import rental_yields
+from irish_property_analysis.rental_yields import MIN_LISTINGS, get_rental_yield_db
+from irish_property_analysis.rentals import get_rental_db, RentalObject
+from irish_property_analysis.sales import get_sale_db
+
+from fixtures import listing
+
+
+def area_listing(price, routing_key="D08", beds=2.0, property_type="apartment"):
+    return listing(
+        f"{price} Main Street",
+        eircode_routing_key=routing_key,
+        beds=beds,
+        property_type=property_type,
+        price=price,
+    )
+
+
+class RentalYieldTest(TestCase):
+    def setUp(self):
+        self.db = get_rental_yield_db()
+        self.db.drop_data()
+
+        get_rental_db().refresh(
+            [area_listing(1000 + i * 100) for i in range(MIN_LISTINGS)]
+            + [area_listing(3000, beds=4.0, property_type="house")]
+            + [area_listing(2000, routing_key="D02") for _ in range(MIN_LISTINGS)]
+        )
+        get_sale_db().refresh(
+            [area_listing(200000 + i * 10000) for i in range(MIN_LISTINGS)]
+            + [area_listing(500000, beds=4.0, property_type="house")]
+            + [area_listing(None, routing_key="D02") for _ in range(MIN_LISTINGS)]
+        )
+
+    def tearDown(self):
+        self.db.drop_data()
+        get_rental_db().drop_data()
+        get_sale_db().drop_data()
+
+    def test_get(self):
+        apartment = self.db.get("D08", 2.0, "apartment")
+        self.assertEqual(apartment.median_rent, 1200)
+        self.assertEqual(apartment.median_price, 220000)
+        self.assertEqual(apartment.gross_yield, 1200 * 12 / 220000)
+
+        # Too few houses, so over the whole routing key
+        house = self.db.get("d08x123", 4.0, "house")
+        self.assertIsNone(house.beds)
+        self.assertEqual(house.rents, MIN_LISTINGS + 1)
+        self.assertEqual(house.median_price, 225000)
+
+        # No prices
+        self.assertIsNone(self.db.get("D02"))
+        self.assertIsNone(self.db.get(None))
+
+    def test_get_prefetched(self):
+        yields = self.db.yields()
+        with patch.object(rental_yields, "table_versions") as table_versions:
+            apartment = self.db.get("D08", 2.0, "apartment", yields=yields)
+            house = self.db.get("D08", 4.0, "house", yields=yields)
+        table_versions.assert_not_called()
+        self.assertEqual(apartment.median_rent, 1200)
+        self.assertIsNone(house.beds)
+
+    def test_recomputed_on_refresh(self):
+        self.assertEqual(self.db.get("D08", 2.0, "apartment").median_rent, 1200)
+        self.assertEqual(len(self.db), 2)
+
+        get_rental_db().refresh([area_listing(1500) for _ in range(MIN_LISTINGS)])
+        self.assertEqual(self.db.get("D08", 2.0, "apartment").median_rent, 1500)
+
+        # And when listings are upserted
+        get_sale_db().upsert(
+            [
+                dict(area_listing(100000), listing_id=str(i))
+                for i in range(MIN_LISTINGS * 3)
+            ]
+        )
+        self.assertEqual(self.db.get("D08", 2.0, "apartment").median_price, 100000)
+
+    def test_recomputed_on_row_changes(self):
+        self.assertEqual(self.db.get("D08", 2.0, "apartment").median_rent, 1200)
+
+        get_rental_db().drop_data()
+        self.assertIsNone(self.db.get("D08", 2.0, "apartment"))
+
+        for _ in range(MIN_LISTINGS):
+            RentalObject.create(**area_listing(1800))
+        self.assertEqual(self.db.get("D08", 2.0, "apartment").median_rent, 1800)
+
+    def test_loaded_once_by_concurrent_callers(self):
+        loads = []
+        load = self.db._load
+        barrier = threading.Barrier(4)
+
+        def counted_load(versions):
+            loads.append(versions)
+            return load(versions)
+
+        def get():
+            barrier.wait()
+            self.db.yields()
+
+        with patch.object(self.db, "_load", counted_load):
+            threads = [threading.Thread(target=get) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(loads), 1)
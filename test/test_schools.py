@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from irish_property_analysis.schools import normalise_schools, Schools
+
+
+class SchoolsTest(TestCase):
+    def setUp(self):
+        primary = pd.DataFrame(
+            {
+                "Official School Name": ["a", "b"],
+                "School Latitude": [53.35, 53.5],
+                "School Longitude": [-6.26, -6.25],
+                "Total Pupils": [100, 200],
+            }
+        )
+        # Secondary sheet has its headers a row down
+        secondary = pd.DataFrame(
+            [
+                [
+                    "Official School Name",
+                    "School Latitude",
+                    "School Longitude",
+                    "Total Enrolment",
+                ],
+                ["c", "53.351", "-6.261", "500"],
+                ["d", "not a number", "-6.2", "x"],
+            ],
+            columns=["Unnamed: 0", "Unnamed: 1", "Unnamed: 2", "Unnamed: 3"],
+        )
+        self.sheets = (primary, secondary)
+        self.unchanged_sheets = (primary.copy(), secondary.copy())
+        self.data = normalise_schools(primary, secondary)
+
+    def test_normalise_schools(self):
+        self.assertEqual(
+            self.data["School Level"].tolist(),
+            ["primary", "primary", "secondary", "secondary"],
+        )
+        self.assertEqual(self.data["School Latitude"].dtype, np.float32)
+        self.assertEqual(self.data["Enrolment"].tolist()[:3], [100, 200, 500])
+        self.assertTrue(np.isnan(self.data["School Latitude"].iloc[3]))
+
+    def test_normalise_schools_leaves_sheets(self):
+        for sheet, unchanged in zip(self.sheets, self.unchanged_sheets):
+            pd.testing.assert_frame_equal(sheet, unchanged)
+        pd.testing.assert_frame_equal(normalise_schools(*self.sheets), self.data)
+
+    def test_scores(self):
+        schools = Schools(data=self.data)
+        self.assertEqual(schools.get_score(53.35, -6.26), 2)
+        self.assertEqual(
+            [s["Official School Name"] for s in schools.get_near(53.35, -6.26)],
+            ["a", "c"],
+        )
+        self.assertEqual(
+            schools.get_scores([53.35, 53.5, np.nan], [-6.26, -6.25, 0]).tolist(),
+            [2, 1, 0],
+        )
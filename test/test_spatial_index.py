@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+import numpy as np
+
+from irish_property_analysis.spatial_index import SpatialIndex
+from irish_property_analysis.utils import haversine_vectorized
+
+
+class SpatialIndexTest(TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.lats = rng.uniform(53.2, 53.5, 5000)
+        self.lngs = rng.uniform(-6.5, -6.0, 5000)
+        self.lats[10] = np.nan
+        self.index = SpatialIndex(self.lats, self.lngs)
+
+    def brute_force(self, lat, lng, radius_km):
+        distances = haversine_vectorized(lat, lng, self.lats, self.lngs)
+        return np.flatnonzero(distances <= radius_km)
+
+    def test_query_radius(self):
+        for lat, lng, radius_km in [
+            (53.35, -6.26, 1),
+            (53.35, -6.26, 0.25),
+            (53.2, -6.5, 3),
+            (53.4, -6.1, 10),
+            (52.0, -8.0, 1),
+        ]:
+            expected = self.brute_force(lat, lng, radius_km)
+            ids, distances = self.index.query_radius(lat, lng, radius_km)
+            self.assertEqual(sorted(ids.tolist()), expected.tolist())
+            self.assertTrue(np.all(np.diff(distances) >= 0))
+            self.assertEqual(
+                self.index.count_radius(lat, lng, radius_km), len(expected)
+            )
+
+    def test_ignores_missing_coordinates(self):
+        self.assertEqual(len(self.index), 4999)
+
+    def test_count_radius_many(self):
+        lats = np.array([53.35, 53.2, 53.4, 52.0, np.nan, 53.3])
+        lngs = np.array([-6.26, -6.5, -6.1, -8.0, -6.2, np.nan])
+        for radius_km in [0.5, 1, 5]:
+            self.assertEqual(
+                self.index.count_radius_many(lats, lngs, radius_km).tolist(),
+                [
+                    (
+                        len(self.brute_force(lat, lng, radius_km))
+                        if not np.isnan(lat) and not np.isnan(lng)
+                        else 0
+                    )
+                    for lat, lng in zip(lats, lngs)
+                ],
+            )
+        self.assertEqual(self.index.count_radius_many([], [], 1).tolist(), [])
@@ -0,0 +1,87 @@
+from unittest import TestCase
+
+import os
+import tempfile
+
+import pandas as pd
+
+from benchmarks.hot_paths import check_speedups, compare
+from benchmarks.synthetic_data import (
+    write_ppr_csv,
+    write_bus_stops_csv,
+    write_schools_csvs,
+)
+from irish_property_analysis.ppr_sale import Sales
+from irish_property_analysis.schools import normalise_schools
+from irish_property_analysis.spatial_index import SpatialIndex
+
+
+class SyntheticDataTest(TestCase):
+    def test_ppr_csv(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_location = os.path.join(tmp_dir, "ppr.csv")
+            write_ppr_csv(csv_location, 2000)
+            sales = Sales.read_csv(csv_location)
+
+        # Some rows repeat earlier ones
+        self.assertLess(len(sales), 2000)
+        self.assertGreater(len(sales), 1900)
+        self.assertTrue(all(sale.price >= 50000 for sale in sales))
+        self.assertEqual(
+            {sale.description_of_property for sale in sales}, {"second_hand", "new"}
+        )
+
+    def test_bus_stops_and_schools_csvs(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            bus_stops_location = os.path.join(tmp_dir, "bus_stops.csv")
+            primary_location = os.path.join(tmp_dir, "primary.csv")
+            secondary_location = os.path.join(tmp_dir, "secondary.csv")
+            write_bus_stops_csv(bus_stops_location, 100)
+            write_schools_csvs(primary_location, secondary_location, 100)
+
+            bus_stops = pd.read_csv(bus_stops_location)
+            schools = normalise_schools(
+                pd.read_csv(primary_location), pd.read_csv(secondary_location)
+            )
+
+        self.assertEqual(len(bus_stops), 100)
+        SpatialIndex(bus_stops["Latitude"].values, bus_stops["Longitude"].values)
+
+        self.assertEqual(len(schools), 100)
+        self.assertEqual((schools["School Level"] == "secondary").sum(), 20)
+        self.assertFalse(schools["Enrolment"].isna().any())
+
+    def test_compare(self):
+        def result(seconds):
+            return {
+                "commit": "abc",
+                "sizes": {},
+                "cases": {
+                    name: {"min_seconds": value} for name, value in seconds.items()
+                },
+            }
+
+        self.assertEqual(
+            compare(
+                result({"fast": 1.0, "slow": 1.0}),
+                result({"fast": 0.5, "slow": 2.0, "new": 1.0}),
+            ),
+            ["slow"],
+        )
+
+        # Held to a speedup over a reference case of the same run
+        min_speedups = {"fast": ("slow", 4.0)}
+        self.assertEqual(
+            check_speedups(result({"fast": 0.5, "slow": 2.0}), min_speedups), []
+        )
+        self.assertEqual(
+            check_speedups(result({"fast": 1.0, "slow": 2.0}), min_speedups), ["fast"]
+        )
+        self.assertEqual(check_speedups(result({"fast": 1.0}), min_speedups), [])
+        self.assertEqual(
+            compare(
+                result({"Sales.load csv": 1.0, "Sales rows csv": 2.0}),
+                result({"Sales.load csv": 1.0, "Sales rows csv": 2.0}),
+            ),
+            ["Sales.load csv"],
+        )
@@ -5,12 +5,19 @@ import math
 import datetime
 import random
 
+import numpy as np
+
 from irish_property_analysis.utils import (
     read_json,
     mean_data,
     convert_date,
     is_nan,
     is_sale_date_within_range,
+    to_datetime64,
+    group_stats,
+    clean_address_for_comparison,
+    clean_addresses_for_comparison,
+    LazySingleton,
 )
 
 
@@ -36,6 +43,29 @@ class UtilsTest(TestCase):
             datetime.datetime(2025, 1, 1),
         )
 
+    def test_to_datetime64(self):
+        self.assertEqual(
+            to_datetime64(
+                [datetime.datetime(2025, 1, 1, 12), "01/02/2025", None]
+            ).tolist(),
+            [datetime.datetime(2025, 1, 1, 12), datetime.datetime(2025, 2, 1), None],
+        )
+
+    def test_group_stats(self):
+        groups = [2, 0, 2, 2, 0, 5]
+        values = [3.0, 10.0, 1.0, 2.0, 20.0, 7.0]
+        keys, counts, means, percentiles = group_stats(groups, values, [10, 50])
+        self.assertEqual(keys.tolist(), [0, 2, 5])
+        self.assertEqual(counts.tolist(), [2, 3, 1])
+        self.assertEqual(means.tolist(), [15.0, 2.0, 7.0])
+        for idx, group in enumerate([0, 2, 5]):
+            self.assertEqual(
+                percentiles[idx].tolist(),
+                np.percentile(
+                    [v for g, v in zip(groups, values) if g == group], [10, 50]
+                ).tolist(),
+            )
+
     def test_is_nan(self):
         self.assertTrue(is_nan(None))
         self.assertTrue(is_nan(math.nan))
@@ -53,3 +83,38 @@ class UtilsTest(TestCase):
                 datetime.datetime(2000, 1, 1), datetime.datetime(2025, 2, 1)
             )
         )
+
+    def test_clean_addresses_for_comparison(self):
+        addresses = ["Ãpt 4, Â Main St ", "", "  ", "1 Main St", "a\0b", None]
+        self.assertEqual(
+            clean_addresses_for_comparison(addresses),
+            [clean_address_for_comparison(address) for address in addresses],
+        )
+        self.assertEqual(
+            clean_addresses_for_comparison(addresses[:4]),
+            ["pt 4,  main st", None, None, "1 main st"],
+        )
+        self.assertEqual(clean_addresses_for_comparison([]), [])
+
+    def test_lazy_singleton_reset_if_stale(self):
+        source = f"/tmp/{random.random()}"
+        with open(source, "w") as fh:
+            fh.write("1")
+
+        def load():
+            with open(source) as fh:
+                return fh.read()
+
+        get = LazySingleton(load, sources=[source])
+        self.assertFalse(get.reset_if_stale())
+        self.assertEqual(get(), "1")
+        self.assertFalse(get.reset_if_stale())
+
+        with open(source, "w") as fh:
+            fh.write("2")
+        os.utime(source, (0, 0))
+        self.assertTrue(get.reset_if_stale())
+        self.assertEqual(get(), "2")
+
+        os.remove(source)
+        self.assertTrue(get.reset_if_stale())